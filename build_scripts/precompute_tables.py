@@ -0,0 +1,92 @@
+"""
+Precompute the results of the calculator pages for the default inputs in variables.toml.
+
+The results are saved as memory-mappable .npy files in the PRECOMPUTED_DIR of the [cache]
+section, and are pinned in the shared scenario cache when the app starts, so the first
+request with the default inputs is served without calculating anything. Run this as a
+build step whenever the calculations or the defaults change:
+
+    python build_scripts/precompute_tables.py
+"""
+
+import time
+import toml
+from pathlib import Path
+import sys
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from functions.cached_calcs import (  # noqa: E402
+    calculate_interest_rate_sensitivity,
+    calculate_electricity_costs,
+    calculate_scenarios,
+)
+from functions.precompute_funcs import save_precomputed_tables  # noqa: E402
+
+
+def default_calls(variables: dict) -> list[tuple]:
+    """Return the (cached function, arguments) of each page for its default inputs."""
+    electricity = variables["electricity"]
+    fixed_costs = variables["fixed_costs"]
+
+    return [
+        (
+            calculate_interest_rate_sensitivity,
+            (
+                variables["loan_calculator"]["LOAN_AMOUNT_DEFAULT"],
+                variables["loan_calculator"]["INTEREST_RATE_MIN_DEFAULT"],
+                variables["loan_calculator"]["INTEREST_RATE_MAX_DEFAULT"],
+                variables["loan_calculator"]["INTEREST_RATE_STEP_DEFAULT"],
+                variables["loan"]["AMMORTISATION_PERIOD_DEFAULT"],
+            ),
+        ),
+        (
+            calculate_electricity_costs,
+            (
+                tuple(electricity["KWH_USAGE_RANGE_DEFAULT"]),
+                tuple(electricity["KWH_PRICE_RANGE_DEFAULT"]),
+                electricity["MARKUP_NOK_DEFAULT"],
+                electricity["FIXED_COST_ELECTRICITY_DEFAULT"],
+            ),
+        ),
+        (
+            calculate_scenarios,
+            (
+                tuple(variables["house_price"]["HOUSEPRICE_DEFAULT"]),
+                tuple(variables["interest_rate"]["INTEREST_RATE_DEFAULT"]),
+                fixed_costs["FIXED_COST_HOUSE_DEFAULT"],
+                electricity["KWH_USAGE_RANGE_DEFAULT"][0],
+                electricity["KWH_PRICE_RANGE_DEFAULT"][0],
+                electricity["MARKUP_NOK_DEFAULT"],
+                electricity["FIXED_COST_ELECTRICITY_DEFAULT"],
+                variables["loan"]["AMMORTISATION_PERIOD_DEFAULT"],
+                fixed_costs["PERSON_A_FIXED_COSTS_DEFAULT"],
+                fixed_costs["PERSON_B_FIXED_COSTS_DEFAULT"],
+                variables["transaction_costs"]["TRANSACTION_COSTS_DEFAULT"],
+                variables["loan"]["EK_DEFAULT"],
+                variables["ownership"]["OWNERSHIP_FRAQ_DEFAULT"],
+            ),
+        ),
+    ]
+
+
+def precompute_tables():
+    variables = toml.load(project_root.joinpath("variables.toml"))
+
+    tables = []
+    for func, args in default_calls(variables):
+        start = time.perf_counter()
+        key, args, kwargs = func.cache_key(*args)
+        tables.append((key, func.__wrapped__(*args, **kwargs)))
+        print(f"Calculated {func.__name__} in {time.perf_counter() - start:.3f} seconds")
+
+    manifest = save_precomputed_tables(
+        tables, project_root.joinpath(variables["cache"]["PRECOMPUTED_DIR"])
+    )
+    print(f"Saved {len(tables)} tables to {manifest.parent}")
+
+
+if __name__ == "__main__":
+    precompute_tables()
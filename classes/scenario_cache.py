@@ -0,0 +1,354 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+import pandas as pd
+import numpy as np
+
+
+def sizeof(value: Any) -> int:
+    """
+    Estimate the number of bytes used by a cached value.
+
+    DataFrames, Series and arrays report their own memory use, and tuples, lists and
+    dicts are summed over their items. Anything else is measured by its pickled size.
+
+    Parameters
+    ----------
+    value : Any
+        The value to measure.
+
+    Returns
+    -------
+    int
+        The estimated size of the value in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sum(sizeof(item) for item in value.values())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ScenarioCache:
+    """
+    A thread-safe LRU cache for calculated scenarios, bounded by the total size of its values.
+
+    The cache is meant to be shared by all sessions of the app. When the values in
+    memory exceed max_bytes, the least recently used values are evicted. If a disk
+    directory is given, values are also written there, so values evicted from memory
+    and values calculated by other processes can be loaded instead of recalculated.
+
+    Values can also be pinned, e.g. results precomputed at build time. Pinned values
+    are never evicted and do not count towards max_bytes.
+
+    Values are returned as stored, so callers must not modify them.
+
+    Attributes
+    ----------
+    max_bytes : int
+        the maximum total size of the values kept in memory
+    disk_dir : Optional[Path]
+        the directory of the on-disk tier, None if disabled
+    max_disk_bytes : Optional[int]
+        the maximum total size of the files in disk_dir, None if unbounded
+    hits : int
+        the number of lookups served from memory
+    disk_hits : int
+        the number of lookups served from disk
+    misses : int
+        the number of lookups that had to be calculated
+    evictions : int
+        the number of values evicted from memory
+
+    Methods
+    -------
+    get(key, default=None)
+        Returns the cached value for key, or default if not cached
+    put(key, value)
+        Stores a value in the cache
+    pin(key, value)
+        Stores a value in the cache that is never evicted
+    get_or_compute(key, func, *args, **kwargs)
+        Returns the cached value for key, calculating and storing it if not cached
+    clear()
+        Removes all values from memory
+    stats()
+        Returns the hit and miss counters and the current size of the cache
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        disk_dir: Optional[str | Path] = None,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._pinned: dict[Hashable, Any] = {}
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        # Locks of the keys being calculated by get_or_compute, with their number of users
+        self._key_locks: dict[Hashable, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries or key in self._pinned
+
+    @property
+    def nbytes(self) -> int:
+        """The total size of the values kept in memory."""
+        return self._nbytes
+
+    def _disk_path(self, key: Hashable) -> Path:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.disk_dir / f"{digest}.pkl"
+
+    def _store(self, key: Hashable, value: Any, nbytes: int):
+        """Store a value in memory and evict the least recently used values if full."""
+        if key in self._entries:
+            self._nbytes -= self._entries.pop(key)[1]
+
+        # Values larger than the whole cache are not kept in memory
+        if nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = (value, nbytes)
+        self._nbytes += nbytes
+        while self._nbytes > self.max_bytes:
+            _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= evicted_nbytes
+            self.evictions += 1
+
+    def _read_disk(self, key: Hashable) -> tuple[bool, Any]:
+        if self.disk_dir is None:
+            return False, None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+
+        # Touch the file so that pruning removes the least recently used files first
+        os.utime(path)
+        return True, value
+
+    def _write_disk(self, key: Hashable, value: Any):
+        if self.disk_dir is None:
+            return
+
+        # Write to a temporary file first, so other processes never read partial files. The
+        # disk tier is best effort, so a full disk or a value that cannot be pickled only
+        # leaves the value out of it
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=self.disk_dir, suffix=".tmp", delete=False) as file:
+                temp_path = file.name
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._disk_path(key))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            if temp_path is not None:
+                Path(temp_path).unlink(missing_ok=True)
+            return
+
+        if self.max_disk_bytes is not None:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove the least recently used files until the disk tier is within max_disk_bytes."""
+        files = []
+        for path in self.disk_dir.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _lookup(self, key: Hashable) -> tuple[Optional[str], Any]:
+        """Return where the value of key was found, 'memory', 'disk' or None, and the value."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return "memory", self._entries[key][0]
+
+            if key in self._pinned:
+                return "memory", self._pinned[key]
+
+        # The disk is read without holding the lock, so other lookups are not blocked
+        found, value = self._read_disk(key)
+        if found:
+            nbytes = sizeof(value)
+            with self._lock:
+                self._store(key, value, nbytes)
+            return "disk", value
+        return None, None
+
+    def _count(self, source: Optional[str]):
+        """Count a lookup in the hit and miss counters."""
+        with self._lock:
+            if source == "memory":
+                self.hits += 1
+            elif source == "disk":
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value for key, or default if not cached.
+
+        Parameters
+        ----------
+        key : Hashable
+            the key of the value
+        default : Any, optional
+            the value to return if key is not cached, by default None
+
+        Returns
+        -------
+        Any
+            the cached value or default
+        """
+        source, value = self._lookup(key)
+        self._count(source)
+        return default if source is None else value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Stores a value in the cache.
+
+        Parameters
+        ----------
+        key : Hashable
+            the key of the value
+        value : Any
+            the value to store
+        """
+        nbytes = sizeof(value)
+        with self._lock:
+            self._store(key, value, nbytes)
+        # The value is pickled to disk without holding the lock, so other lookups are not blocked
+        self._write_disk(key, value)
+
+    def pin(self, key: Hashable, value: Any):
+        """
+        Stores a value in the cache that is never evicted and does not count towards max_bytes.
+
+        Parameters
+        ----------
+        key : Hashable
+            the key of the value
+        value : Any
+            the value to store
+        """
+        with self._lock:
+            self._pinned[key] = value
+
+    def get_or_compute(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+        Returns the cached value for key, calculating and storing it if not cached.
+
+        The value of a key is only calculated once at a time: concurrent callers that
+        miss on the same key wait for the first one and are served its value.
+
+        Parameters
+        ----------
+        key : Hashable
+            the key of the value, which should identify func and its arguments
+        func : Callable
+            the function that calculates the value
+        *args, **kwargs
+            the arguments of func
+
+        Returns
+        -------
+        Any
+            the cached or calculated value
+        """
+        source, value = self._lookup(key)
+        if source is not None:
+            self._count(source)
+            return value
+
+        # Share one lock per key between the callers that are calculating it
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = [threading.Lock(), 0]
+            key_lock[1] += 1
+
+        try:
+            with key_lock[0]:
+                source, value = self._lookup(key)
+                if source is None:
+                    value = func(*args, **kwargs)
+                    self.put(key, value)
+                self._count(source)
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+        return value
+
+    def clear(self):
+        """Removes all values from memory. Pinned values and files in the disk tier are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Returns the hit and miss counters and the current size of the cache.
+
+        Returns
+        -------
+        dict[str, int | float]
+            the counters, the number of entries and bytes in memory, and the hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return dict(
+                hits=self.hits,
+                disk_hits=self.disk_hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                entries=len(self._entries),
+                pinned=len(self._pinned),
+                nbytes=self._nbytes,
+                hit_rate=(self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            )
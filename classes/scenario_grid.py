@@ -0,0 +1,282 @@
+from dataclasses import dataclass, field
+import pandas as pd
+import numpy as np
+
+
+@dataclass
+class ScenarioGrid:
+    """
+    A compact representation of the results of a scenario sweep.
+
+    The input values along each axis of the grid are stored once as coordinate arrays,
+    and only the computed results are stored densely, with one dimension per axis. This
+    takes a fraction of the memory of the equivalent long-form DataFrame, where every
+    input value is repeated on every row.
+
+    Attributes
+    ----------
+    coords : dict[str, np.ndarray]
+        the values along each axis of the grid, in axis order
+    data : dict[str, np.ndarray]
+        the computed results, each with shape equal to the grid shape
+    columns : tuple[str, ...]
+        the column order of the long-form DataFrame, defaults to coords followed by data
+
+    Methods
+    -------
+    isel(**indexers)
+        Selects a sub-grid by position along one or more axes
+    sel(**indexers)
+        Selects a sub-grid by coordinate value along one or more axes
+    surface(variable, x, y, **indexers)
+        Selects a 2-D surface of one result, e.g. for a heatmap
+    to_frame(categorical=False)
+        Converts the grid to a long-form DataFrame with one row per scenario
+    to_xarray()
+        Converts the grid to an xarray Dataset
+    """
+
+    coords: dict[str, np.ndarray]
+    data: dict[str, np.ndarray]
+    columns: tuple[str, ...] = field(default=())
+    _positions: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.coords = {name: np.asarray(values) for name, values in self.coords.items()}
+        if not self.columns:
+            self.columns = tuple(self.coords) + tuple(self.data)
+
+        for name, values in self.data.items():
+            if values.shape != self.shape:
+                raise ValueError(
+                    f"Shape of {name} {values.shape} does not match the grid shape {self.shape}"
+                )
+
+    @property
+    def dims(self) -> tuple[str, ...]:
+        """The names of the grid axes, in axis order."""
+        return tuple(self.coords)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """The number of values along each axis of the grid."""
+        return tuple(len(values) for values in self.coords.values())
+
+    @property
+    def size(self) -> int:
+        """The number of scenarios in the grid."""
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used by the coordinates and results."""
+        return sum(values.nbytes for values in self.coords.values()) + sum(
+            values.nbytes for values in self.data.values()
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def position(self, dim: str, value) -> int:
+        """
+        Find the position of a coordinate value along an axis.
+
+        Values are looked up in a hash table that is built the first time the axis is
+        used. Float values that are not found exactly are matched to the closest
+        coordinate if it is equal within floating point tolerance.
+
+        Parameters
+        ----------
+        dim : str
+            The name of the axis.
+        value : float or int
+            The coordinate value to look up.
+
+        Returns
+        -------
+        int
+            The position of the value along the axis.
+        """
+        if dim not in self.coords:
+            raise KeyError(f"{dim} is not an axis of the grid, expected one of {self.dims}")
+
+        if dim not in self._positions:
+            # Keep the first position of any repeated value
+            positions = {}
+            for i, coord in enumerate(self.coords[dim].tolist()):
+                positions.setdefault(coord, i)
+            self._positions[dim] = positions
+
+        try:
+            return self._positions[dim][value]
+        except (KeyError, TypeError):
+            pass
+
+        coords = self.coords[dim]
+        if np.issubdtype(coords.dtype, np.number) and len(coords):
+            closest = int(np.argmin(np.abs(coords - value)))
+            if np.isclose(coords[closest], value, rtol=1e-9, atol=1e-12):
+                return closest
+
+        raise KeyError(f"{value} is not a coordinate of {dim}")
+
+    def isel(self, **indexers: int | slice) -> "ScenarioGrid":
+        """
+        Select a sub-grid by position along one or more axes.
+
+        Selecting a single position keeps the axis with length one, so the result can
+        still be converted to a DataFrame with every column. The results of the sub-grid
+        are views of the results of this grid, so no data is copied.
+
+        Parameters
+        ----------
+        **indexers : int or slice
+            The position or slice of positions to select along each named axis.
+
+        Returns
+        -------
+        ScenarioGrid
+            The selected sub-grid.
+        """
+        index = [slice(None)] * len(self.coords)
+        for dim, indexer in indexers.items():
+            if dim not in self.coords:
+                raise KeyError(f"{dim} is not an axis of the grid, expected one of {self.dims}")
+            if not isinstance(indexer, slice):
+                indexer = int(indexer)
+                if indexer < 0:
+                    indexer += len(self.coords[dim])
+                if not 0 <= indexer < len(self.coords[dim]):
+                    raise IndexError(f"Position {indexer} is out of bounds for {dim}")
+                indexer = slice(indexer, indexer + 1)
+            index[self.dims.index(dim)] = indexer
+
+        return ScenarioGrid(
+            coords={
+                dim: values[indexer]
+                for (dim, values), indexer in zip(self.coords.items(), index)
+            },
+            data={name: values[tuple(index)] for name, values in self.data.items()},
+            columns=self.columns,
+        )
+
+    def sel(self, **indexers) -> "ScenarioGrid":
+        """
+        Select a sub-grid by coordinate value along one or more axes.
+
+        Each value is found in constant time with ``position``, so selecting a single
+        scenario does not scan the grid.
+
+        Parameters
+        ----------
+        **indexers : float or int
+            The coordinate value to select along each named axis.
+
+        Returns
+        -------
+        ScenarioGrid
+            The selected sub-grid, with length one along each of the named axes.
+        """
+        return self.isel(
+            **{dim: self.position(dim, value) for dim, value in indexers.items()}
+        )
+
+    def surface(self, variable: str, x: str, y: str, **indexers) -> np.ndarray:
+        """
+        Select a 2-D surface of one result, with one row per y value and one column per x value.
+
+        Every axis other than x and y must either have length one or be fixed to a single
+        coordinate value in ``indexers``. The surface is a view of the grid's results.
+
+        Parameters
+        ----------
+        variable : str
+            The name of the result to select.
+        x : str
+            The name of the axis along the columns of the surface.
+        y : str
+            The name of the axis along the rows of the surface.
+        **indexers : float or int
+            The coordinate value to select along each of the other axes.
+
+        Returns
+        -------
+        np.ndarray
+            An array of shape (len(coords[y]), len(coords[x])).
+        """
+        grid = self.sel(**indexers)
+        index = []
+        for dim, values in grid.coords.items():
+            if dim in (x, y):
+                index.append(slice(None))
+            elif len(values) == 1:
+                index.append(0)
+            else:
+                raise ValueError(f"A single value must be selected for {dim}")
+
+        values = grid.data[variable][tuple(index)]
+        # The remaining dimensions are in axis order, so transpose if y comes after x
+        if self.dims.index(x) < self.dims.index(y):
+            values = values.T
+        return values
+
+    def to_frame(self, categorical: bool = False) -> pd.DataFrame:
+        """
+        Convert the grid to a long-form DataFrame with one row per scenario.
+
+        Rows are ordered like ``itertools.product`` over the coordinates, so the last
+        axis varies fastest.
+
+        Parameters
+        ----------
+        categorical : bool, optional
+            Whether to store the coordinate columns as pandas Categoricals, which only
+            store one small integer code per row, by default False.
+
+        Returns
+        -------
+        pd.DataFrame
+            A DataFrame with one column per coordinate and result, in the order of columns.
+        """
+        shape = self.shape
+        columns = {}
+
+        for axis, (name, values) in enumerate(self.coords.items()):
+            # Each coordinate repeats in blocks of the size of the axes after it, and the
+            # blocks tile for every combination of the axes before it
+            axis_shape = [1] * len(shape)
+            axis_shape[axis] = len(values)
+
+            if categorical and len(pd.unique(values)) == len(values):
+                codes = np.broadcast_to(
+                    np.arange(len(values), dtype=np.int32).reshape(axis_shape), shape
+                )
+                columns[name] = pd.Categorical.from_codes(codes.ravel(), categories=values)
+            else:
+                columns[name] = np.broadcast_to(values.reshape(axis_shape), shape).ravel()
+
+        for name, values in self.data.items():
+            columns[name] = values.ravel()
+
+        return pd.DataFrame({name: columns[name] for name in self.columns})
+
+    def to_xarray(self):
+        """
+        Convert the grid to an xarray Dataset, with one data variable per result.
+
+        Requires the optional xarray package.
+
+        Returns
+        -------
+        xarray.Dataset
+            A Dataset with one dimension per axis of the grid.
+        """
+        try:
+            import xarray as xr
+        except ImportError as err:
+            raise ImportError("to_xarray requires the xarray package to be installed") from err
+
+        return xr.Dataset(
+            data_vars={name: (self.dims, values) for name, values in self.data.items()},
+            coords=self.coords,
+        )
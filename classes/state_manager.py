@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field, validate_call
+from dataclasses import dataclass, field
+from numbers import Real
+from pydantic import validate_call
 from typing import Optional, Union
 import pandas as pd
 import numpy as np
@@ -14,7 +16,37 @@ sys.path.append(str(project_root))
 from functions.calc_funcs import calculate_amortization_schedule  # noqa: E402
 
 
-class ScenarioState(BaseModel):
+Number = Union[float, int, np.floating, np.integer]
+
+# Allowed (lower, upper) bounds of the numeric fields of ScenarioState, None if unbounded
+FIELD_BOUNDS = {
+    "selected_house_price": (0, None),
+    "selected_interest_rate": (0, 1),
+    "total_loan": (0, None),
+    "monthly_payment": (0, None),
+    "total_interest": (0, None),
+    "loan_to_value": (0, 100),
+    "total_cost_a": (0, None),
+    "total_cost_b": (0, None),
+    "loan_amount": (0, None),
+    "ownership_fraq": (0, 1),
+    "loan_amount_a": (0, None),
+    "loan_amount_b": (0, None),
+}
+
+
+@validate_call(config=dict(arbitrary_types_allowed=True))
+def _validate_update_args(
+    filtered_df: pd.DataFrame,
+    selected_house_price: float | int,
+    ek: float | int,
+    ammortisation_periods: int | float,
+):
+    """Validate the arguments of ScenarioState.update, raising a ValidationError if invalid."""
+
+
+@dataclass(slots=True)
+class ScenarioState:
     """
     A class used to represent the state of the scenario builder page.
 
@@ -49,43 +81,182 @@ class ScenarioState(BaseModel):
     loan_amount_b : Union[float, int, np.floating, np.integer]
         the amount of the loan for scenario B
     schedule_a : Optional[pd.DataFrame]
-        the amortization schedule for scenario A
+        the amortization schedule for scenario A, recalculated only when its inputs change
     schedule_b : Optional[pd.DataFrame]
-        the amortization schedule for scenario B
+        the amortization schedule for scenario B, recalculated only when its inputs change
     calculation_done : bool
         a flag indicating whether the calculations have been done
+    debug : bool
+        a flag enabling validation of the arguments and fields on every update, which is
+        otherwise only done when the state is created
+
+    house_prices : np.ndarray
+        the sorted unique house prices in df
+    interest_rates : np.ndarray
+        the sorted unique interest rates in df
 
     Methods
     -------
+    select(house_price, interest_rate)
+        Selects the scenario rows for a house price and interest rate
     update(filtered_df, selected_house_price, ek, ammortisation_periods)
         Updates the state of the scenario based on new data
+    validate()
+        Checks the types and bounds of the fields
     """
 
-    class Config:
-        arbitrary_types_allowed = True
-
     df: Optional[pd.DataFrame] = None
-    selected_house_price: Optional[Union[float, int, np.floating, np.integer]] = Field(
-        None, ge=0
-    )
-    selected_interest_rate: Optional[Union[float, int, np.floating, np.integer]] = (
-        Field(None, ge=0, le=1)
-    )
-    total_loan: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
-    monthly_payment: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
-    total_interest: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
-    loan_to_value: Union[float, int, np.floating, np.integer] = Field(0, ge=0, le=100)
-    total_cost_a: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
-    total_cost_b: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
-    loan_amount: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
-    ownership_fraq: Union[float, int, np.floating, np.integer] = Field(0, ge=0, le=1)
-    loan_amount_a: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
-    loan_amount_b: Union[float, int, np.floating, np.integer] = Field(0, ge=0)
+    selected_house_price: Optional[Number] = None
+    selected_interest_rate: Optional[Number] = None
+    total_loan: Number = 0
+    monthly_payment: Number = 0
+    total_interest: Number = 0
+    loan_to_value: Number = 0
+    total_cost_a: Number = 0
+    total_cost_b: Number = 0
+    loan_amount: Number = 0
+    ownership_fraq: Number = 0
+    loan_amount_a: Number = 0
+    loan_amount_b: Number = 0
     schedule_a: Optional[pd.DataFrame] = None
     schedule_b: Optional[pd.DataFrame] = None
     calculation_done: bool = False
+    debug: bool = False
+
+    # Inputs that each amortization schedule was last calculated from
+    _schedule_inputs: dict = field(default_factory=dict, init=False, repr=False)
+
+    # Index over (house_price, interest_rate) and the df it was built for
+    _index: Optional[dict] = field(default=None, init=False, repr=False)
+    _indexed_df: Optional[pd.DataFrame] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.validate()
+
+    def validate(self):
+        """
+        Checks the types and bounds of the fields.
+
+        Raises
+        ------
+        ValueError
+            If a field has the wrong type or is outside its bounds (see FIELD_BOUNDS)
+        """
+        for name in ("df", "schedule_a", "schedule_b"):
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, pd.DataFrame):
+                raise ValueError(f"{name} must be a pandas DataFrame or None")
+
+        for name, (lower, upper) in FIELD_BOUNDS.items():
+            value = getattr(self, name)
+            if value is None and name.startswith("selected_"):
+                continue
+            if not isinstance(value, Real):
+                raise ValueError(f"{name} must be a number, got {value!r}")
+            if (lower is not None and value < lower) or (upper is not None and value > upper):
+                raise ValueError(f"{name} must be within [{lower}, {upper}], got {value}")
+
+    def _scenario_index(self) -> dict:
+        """
+        Return the index over (house_price, interest_rate), building it if df has changed.
+
+        The rows of df are sorted by house price and interest rate once, so the rows for
+        any pair are a contiguous block whose bounds can be looked up directly.
+        """
+        if self.df is None:
+            raise ValueError("Scenarios must be calculated before they can be selected")
+
+        if self._index is None or self._indexed_df is not self.df:
+            house_prices, house_codes = np.unique(
+                self.df["house_price"].to_numpy(), return_inverse=True
+            )
+            interest_rates, rate_codes = np.unique(
+                self.df["interest_rate"].to_numpy(), return_inverse=True
+            )
+            keys = house_codes * len(interest_rates) + rate_codes
+            order = np.argsort(keys, kind="stable")
+            bounds = np.searchsorted(
+                keys[order], np.arange(len(house_prices) * len(interest_rates) + 1)
+            )
+
+            self._index = dict(
+                house_prices=house_prices,
+                interest_rates=interest_rates,
+                order=order,
+                bounds=bounds,
+            )
+            self._indexed_df = self.df
+
+        return self._index
+
+    @staticmethod
+    def _snap(values: np.ndarray, value: float, name: str) -> int:
+        """
+        Return the position of the sorted grid value closest to value.
+
+        Values between two grid values always snap to the closer one, while values
+        outside the grid only snap to its first or last value if they are within half a
+        grid step of it, or equal within floating point tolerance for a single value.
+        """
+        i = int(np.argmin(np.abs(values - value)))
+        if np.isclose(values[i], value, rtol=1e-9, atol=1e-12):
+            return i
+
+        if values[0] <= value <= values[-1]:
+            return i
+        if len(values) > 1:
+            step = values[1] - values[0] if value < values[0] else values[-1] - values[-2]
+            if abs(value - values[i]) <= step / 2:
+                return i
+        raise KeyError(f"{value} is outside the {name} grid [{values[0]}, {values[-1]}]")
+
+    @property
+    def house_prices(self) -> np.ndarray:
+        """The sorted unique house prices in df."""
+        return self._scenario_index()["house_prices"]
+
+    @property
+    def interest_rates(self) -> np.ndarray:
+        """The sorted unique interest rates in df."""
+        return self._scenario_index()["interest_rates"]
+
+    def select(
+        self,
+        house_price: float | int,
+        interest_rate: float | int,
+    ) -> pd.DataFrame:
+        """
+        Selects the scenario rows for a house price and interest rate.
+
+        The values are snapped to the closest house price and interest rate in df, so
+        rates that differ from the grid by floating point noise still match. The
+        snapped values are stored as the selected house price and interest rate.
+        Values more than half a grid step outside the range of df raise a KeyError.
+
+        Parameters
+        ----------
+        house_price : float
+            the house price to select
+        interest_rate : float
+            the interest rate to select
+
+        Returns
+        -------
+        pd.DataFrame
+            the rows of df for the selected house price and interest rate
+        """
+        index = self._scenario_index()
+        if len(index["house_prices"]) == 0:
+            raise ValueError("There are no scenarios in df to select from")
+        i = self._snap(index["house_prices"], house_price, "house price")
+        j = self._snap(index["interest_rates"], interest_rate, "interest rate")
+
+        self.selected_house_price = index["house_prices"][i]
+        self.selected_interest_rate = index["interest_rates"][j]
+
+        k = i * len(index["interest_rates"]) + j
+        return self.df.iloc[index["order"][index["bounds"][k] : index["bounds"][k + 1]]]
 
-    @validate_call(config=dict(arbitrary_types_allowed=True))
     def update(
         self,
         filtered_df: pd.DataFrame,
@@ -96,6 +267,10 @@ class ScenarioState(BaseModel):
         """
         Updates the state of the scenario based on new data.
 
+        The amortization schedules are only recalculated if the loan amount, interest
+        rate or amortisation period they depend on has changed since the last update.
+        Arguments and fields are only validated if debug is enabled.
+
         Parameters
         ----------
         filtered_df : pd.DataFrame
@@ -108,27 +283,43 @@ class ScenarioState(BaseModel):
             the number of periods over which the loan will be amortized
         """
 
+        if self.debug:
+            _validate_update_args(
+                filtered_df, selected_house_price, ek, ammortisation_periods
+            )
+
         if not self.selected_interest_rate:
             raise ValueError("Interest rate must be provided to update the scenario")
 
         self.total_loan = selected_house_price - ek
-        self.monthly_payment = filtered_df["monthly_loan_payment"].iloc[0]
+        self.monthly_payment = filtered_df.at[filtered_df.index[0], "monthly_loan_payment"]
         self.total_interest = (
             self.monthly_payment * ammortisation_periods - self.total_loan
         )
         self.loan_to_value = (self.total_loan / selected_house_price) * 100
-        self.total_cost_a = filtered_df["a_total"].iloc[0]
-        self.total_cost_b = filtered_df["b_total"].iloc[0]
+        self.total_cost_a = filtered_df.at[filtered_df.index[0], "a_total"]
+        self.total_cost_b = filtered_df.at[filtered_df.index[0], "b_total"]
         self.loan_amount = selected_house_price - ek
-        self.ownership_fraq = filtered_df["ownership_fraq"].iloc[0]
+        self.ownership_fraq = filtered_df.at[filtered_df.index[0], "ownership_fraq"]
         self.loan_amount_a = self.loan_amount * self.ownership_fraq
         self.loan_amount_b = self.loan_amount * (1 - self.ownership_fraq)
 
-        # Assume calculate_amortization_schedule is imported or defined elsewhere
-        self.schedule_a = calculate_amortization_schedule(
-            self.loan_amount_a, self.selected_interest_rate, ammortisation_periods
-        )
-        self.schedule_b = calculate_amortization_schedule(
-            self.loan_amount_b, self.selected_interest_rate, ammortisation_periods
-        )
+        # Only recalculate the amortization schedules whose inputs have changed, as the
+        # page calls update on every rerun
+        for name, loan_amount in (
+            ("schedule_a", self.loan_amount_a),
+            ("schedule_b", self.loan_amount_b),
+        ):
+            inputs = (
+                float(loan_amount),
+                float(self.selected_interest_rate),
+                int(ammortisation_periods),
+            )
+            if self._schedule_inputs.get(name) != inputs:
+                setattr(self, name, calculate_amortization_schedule(*inputs))
+                self._schedule_inputs[name] = inputs
+
         self.calculation_done = True
+
+        if self.debug:
+            self.validate()
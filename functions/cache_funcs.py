@@ -0,0 +1,222 @@
+from decimal import Decimal
+import functools
+import hashlib
+import inspect
+
+import pandas as pd
+import numpy as np
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from classes.scenario_cache import ScenarioCache  # noqa: E402
+from functions.precompute_funcs import load_precomputed_tables  # noqa: E402
+
+
+# Floats in cache keys are rounded to this many decimals, so values that only differ by
+# floating point noise, e.g. 0.1 + 0.2 and 0.3, share a cache entry
+KEY_DECIMALS = 10
+
+
+def quantize(value, step: float | int):
+    """
+    Rounds a value to the closest multiple of step, e.g. the step of the slider it came from.
+
+    The result is rounded to the number of decimals of step, so every value on the grid
+    has a single float representation. Integer values stay integers if step is an integer.
+
+    Parameters
+    ----------
+    value : float, int, tuple, list or np.ndarray
+        The value to round. Tuples, lists and arrays are rounded element-wise.
+    step : float or int
+        The step size of the grid.
+
+    Returns
+    -------
+    float, int, tuple, list or np.ndarray
+        The rounded value, of the same type as value.
+
+    Examples
+    --------
+    >>> quantize((0.1 + 0.2, 2.0), 0.1)
+    (0.3, 2.0)
+    """
+    if isinstance(value, (list, tuple)):
+        return type(value)(quantize(item, step) for item in value)
+
+    decimals = max(0, -Decimal(str(step)).normalize().as_tuple().exponent)
+    quantized = np.round(np.round(np.asarray(value, dtype=np.float64) / step) * step, decimals)
+
+    is_integer = isinstance(value, (int, np.integer)) or (
+        isinstance(value, np.ndarray) and np.issubdtype(value.dtype, np.integer)
+    )
+    if is_integer and float(step).is_integer():
+        quantized = quantized.astype(np.asarray(value).dtype)
+
+    if isinstance(value, np.ndarray):
+        return quantized
+    return quantized.item()
+
+
+def normalize_cache_key(value):
+    """
+    Converts a function argument to a hashable value that identifies it in a cache key.
+
+    Numpy arrays are identified by their dtype, shape and a digest of their contents,
+    DataFrames and Series by their columns, dtypes and a digest of their rows, numpy
+    scalars are converted to Python scalars and lists, tuples and dicts are normalized
+    recursively. Floats are rounded to KEY_DECIMALS decimals.
+
+    Parameters
+    ----------
+    value : Any
+        The argument to normalize.
+
+    Returns
+    -------
+    Hashable
+        The normalized argument.
+    """
+    if isinstance(value, np.ndarray):
+        if np.issubdtype(value.dtype, np.floating):
+            value = np.round(value, KEY_DECIMALS) + 0.0  # Adding 0.0 turns -0.0 into 0.0
+        digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return ("ndarray", str(value.dtype), value.shape, digest)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        row_hashes = pd.util.hash_pandas_object(value, index=True).to_numpy()
+        digest = hashlib.sha256(row_hashes.tobytes()).hexdigest()
+        if isinstance(value, pd.Series):
+            return ("Series", value.name, str(value.dtype), digest)
+        return ("DataFrame", tuple(value.columns), tuple(map(str, value.dtypes)), digest)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, KEY_DECIMALS) + 0.0
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_cache_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, normalize_cache_key(item)) for key, item in value.items()))
+    return value
+
+
+def scenario_cache_from_config(variables: dict) -> ScenarioCache:
+    """
+    Creates a scenario cache configured from the [cache] section of variables.toml.
+
+    The results precomputed at build time are pinned in the cache, memory mapped from
+    PRECOMPUTED_DIR.
+
+    Parameters
+    ----------
+    variables : dict
+        The [cache] section of variables.toml.
+
+    Returns
+    -------
+    ScenarioCache
+        The scenario cache.
+    """
+    disk_dir = variables["DISK_DIR"]
+    cache = ScenarioCache(
+        max_bytes=variables["MAX_MEMORY_MB"] * 1024**2,
+        disk_dir=project_root.joinpath(disk_dir) if disk_dir else None,
+        max_disk_bytes=variables["MAX_DISK_MB"] * 1024**2,
+    )
+
+    for key, value in load_precomputed_tables(project_root.joinpath(variables["PRECOMPUTED_DIR"])):
+        cache.pin(key, value)
+    return cache
+
+
+def figure_cache_from_config(variables: dict) -> ScenarioCache:
+    """
+    Creates a figure cache bounded by FIGURE_MAX_MEMORY_MB in the [cache] section of
+    variables.toml.
+
+    Parameters
+    ----------
+    variables : dict
+        The [cache] section of variables.toml.
+
+    Returns
+    -------
+    ScenarioCache
+        The figure cache, see plot_funcs.build_figures.
+    """
+    return ScenarioCache(max_bytes=variables["FIGURE_MAX_MEMORY_MB"] * 1024**2)
+
+
+def _shared_scenario_cache() -> ScenarioCache:
+    # Imported here, so only the app imports streamlit
+    from functions.cache_resources import get_scenario_cache
+
+    return get_scenario_cache()
+
+
+def scenario_cached(func=None, *, steps: dict[str, float | int] | None = None):
+    """
+    Decorator that caches the results of a calculation in the scenario cache shared by
+    all sessions of the app, see cache_resources.get_scenario_cache.
+
+    Arguments named in steps are quantized to their step size before the cache key is
+    built, and the quantized values are also passed to the function, so inputs that
+    only differ by floating point noise share both the cache entry and the result.
+
+    The decorated function has a cache_key(*args, **kwargs) attribute, which returns the
+    cache key and the quantized positional and keyword arguments of a call.
+
+    Unlike st.cache_data, results are returned without being copied, so the caller must
+    not modify them.
+
+    Parameters
+    ----------
+    func : Callable
+        The function to cache, whose arguments identify its result.
+    steps : dict[str, float | int], optional
+        The step size of each argument that should be quantized, by default None.
+
+    Returns
+    -------
+    Callable
+        The cached function.
+
+    Examples
+    --------
+    >>> @scenario_cached(steps={"kwh_price_range": 0.1})
+    ... def calculate(kwh_price_range):
+    ...     ...
+    """
+    if func is None:
+        return functools.partial(scenario_cached, steps=steps)
+
+    namespace = f"{func.__module__}.{func.__qualname__}"
+    signature = inspect.signature(func)
+
+    def cache_key(*args, **kwargs):
+        # Bind the arguments, so positional and keyword calls give the same key
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        for name, step in (steps or {}).items():
+            if name in bound.arguments:
+                bound.arguments[name] = quantize(bound.arguments[name], step)
+
+        key = (
+            namespace,
+            normalize_cache_key(bound.args),
+            normalize_cache_key(bound.kwargs),
+        )
+        return key, bound.args, bound.kwargs
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key, args, kwargs = cache_key(*args, **kwargs)
+        return _shared_scenario_cache().get_or_compute(key, func, *args, **kwargs)
+
+    # Expose the key, e.g. for precomputing results of the function
+    wrapper.cache_key = cache_key
+    return wrapper
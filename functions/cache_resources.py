@@ -0,0 +1,50 @@
+"""
+Caches shared by all sessions of the Streamlit app.
+
+This is the only cache module that imports streamlit, so the calculation, plotting and
+command-line code can use cache_funcs without it.
+"""
+
+import streamlit as st
+import toml
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from classes.scenario_cache import ScenarioCache  # noqa: E402
+from functions.cache_funcs import figure_cache_from_config, scenario_cache_from_config  # noqa: E402
+
+
+@st.cache_resource
+def get_scenario_cache() -> ScenarioCache:
+    """
+    Returns the scenario cache shared by all sessions, configured from the [cache] section
+    of variables.toml, see cache_funcs.scenario_cache_from_config.
+
+    Returns
+    -------
+    ScenarioCache
+        The shared scenario cache.
+    """
+    return scenario_cache_from_config(toml.load(project_root.joinpath("variables.toml"))["cache"])
+
+
+@st.cache_resource
+def get_figure_cache() -> ScenarioCache:
+    """
+    Returns the figure cache shared by all sessions, configured from the [cache] section
+    of variables.toml, see cache_funcs.figure_cache_from_config.
+
+    The figures are kept apart from the scenario cache, so they never evict calculated
+    scenarios.
+
+    Returns
+    -------
+    ScenarioCache
+        The shared figure cache.
+    """
+    return figure_cache_from_config(toml.load(project_root.joinpath("variables.toml"))["cache"])
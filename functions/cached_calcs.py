@@ -0,0 +1,196 @@
+import pandas as pd
+import numpy as np
+import toml
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from functions.cache_funcs import scenario_cached  # noqa: E402
+from functions.calc_funcs import (  # noqa: E402
+    electricity_cost_surface,
+    interest_rate_sensitivity,
+    monthly_price_calculator_scenarios,
+)
+
+# Load constants from variables.toml
+variables = toml.load(project_root.joinpath("variables.toml"))
+
+
+@scenario_cached
+def calculate_interest_rate_sensitivity(
+    loan_amount: float,
+    interest_rate_min: float,
+    interest_rate_max: float,
+    interest_rate_step: float,
+    ammortisation_periods: int,
+) -> pd.DataFrame:
+    """
+    Calculate the monthly loan cost for each interest rate between a minimum and maximum, for the loan calculator page.
+
+    Parameters
+    ----------
+    loan_amount : float
+        The amount of the loan in NOK.
+    interest_rate_min : float
+        The lowest interest rate in percent.
+    interest_rate_max : float
+        The highest interest rate in percent.
+    interest_rate_step : float
+        The step between interest rates in percentage points.
+    ammortisation_periods : int
+        The number of monthly payments.
+
+    Returns
+    -------
+    pd.DataFrame
+        The monthly loan cost and the interest rate as a decimal, see interest_rate_sensitivity.
+    """
+    # Convert interest rates from percentages to decimals
+    interest_rate_range = np.arange(
+        interest_rate_min / 100,
+        interest_rate_max / 100 + interest_rate_step / 100,
+        interest_rate_step / 100,
+    )
+    return interest_rate_sensitivity(loan_amount, interest_rate_range, ammortisation_periods)
+
+
+@scenario_cached(
+    steps=dict(
+        kwh_usage_range=variables["electricity"]["KWH_USAGE_RANGE_STEP"],
+        kwh_price_range=variables["electricity"]["KWH_PRICE_RANGE_STEP"],
+    )
+)
+def calculate_electricity_costs(
+    kwh_usage_range: tuple[float, float],
+    kwh_price_range: tuple[float, float],
+    markup_nok: float,
+    fixed_cost_nok: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculate the electricity cost surface for the electricity calculator page.
+
+    Parameters
+    ----------
+    kwh_usage_range : tuple[float, float]
+        The lowest and highest monthly usage in kWh.
+    kwh_price_range : tuple[float, float]
+        The lowest and highest spot price in NOK per kWh.
+    markup_nok : float
+        The markup per kWh in NOK.
+    fixed_cost_nok : float
+        The fixed monthly cost in NOK.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        The usages and prices along each axis, GRID_RESOLUTION of each, and the cost
+        surface with one row per usage and one column per price.
+    """
+    kwh_usages = np.linspace(
+        kwh_usage_range[0], kwh_usage_range[1], variables["electricity"]["GRID_RESOLUTION"]
+    )
+    kwh_prices = np.linspace(
+        kwh_price_range[0], kwh_price_range[1], variables["electricity"]["GRID_RESOLUTION"]
+    )
+    surface = electricity_cost_surface(
+        kwh_usage_range=kwh_usages,
+        kwh_price_range=kwh_prices,
+        markup_nok=markup_nok,
+        fixed_cost_nok=fixed_cost_nok,
+    )
+    return kwh_usages, kwh_prices, surface
+
+
+# The slider values are quantized to their steps, so the cache key does not depend on
+# floating point noise in the slider values
+@scenario_cached(
+    steps=dict(
+        houseprice_range=variables["house_price"]["HOUSEPRICE_STEP"],
+        interest_rate_range=variables["interest_rate"]["INTEREST_RATE_STEP"],
+        kwh_usage_range=variables["electricity"]["KWH_USAGE_RANGE_STEP"],
+        kwh_price_range=variables["electricity"]["KWH_PRICE_RANGE_STEP"],
+    )
+)
+def calculate_scenarios(
+    houseprice_range,
+    interest_rate_range,
+    fixed_cost_house,
+    kwh_usage_range,
+    kwh_price_range,
+    markup_nok,
+    fixed_cost_electricity,
+    ammortisation_periods,
+    person_a_fixed_costs,
+    person_b_fixed_costs,
+    transaction_costs,
+    ek,
+    ownership_fraq,
+) -> pd.DataFrame:
+    """
+    Calculate the scenarios of the scenario builder page.
+
+    Every house price in houseprice_range, in steps of 100 000 NOK, is combined with every
+    interest rate in interest_rate_range, in steps of 0.25 percentage points. The other
+    inputs are single values.
+
+    Parameters
+    ----------
+    houseprice_range : tuple[int, int]
+        The lowest and highest house price in NOK.
+    interest_rate_range : tuple[float, float]
+        The lowest and highest interest rate in percent.
+    fixed_cost_house : float
+        The fixed monthly cost of the house in NOK.
+    kwh_usage_range : float
+        The monthly electricity usage in kWh.
+    kwh_price_range : float
+        The spot price of electricity in NOK per kWh.
+    markup_nok : float
+        The markup per kWh in NOK.
+    fixed_cost_electricity : float
+        The fixed monthly cost of electricity in NOK.
+    ammortisation_periods : int
+        The number of monthly loan payments.
+    person_a_fixed_costs : float
+        The fixed monthly costs of person A in NOK.
+    person_b_fixed_costs : float
+        The fixed monthly costs of person B in NOK.
+    transaction_costs : float
+        The transaction costs of the purchase in NOK.
+    ek : float
+        The equity in NOK.
+    ownership_fraq : int
+        The ownership share of person A in percent.
+
+    Returns
+    -------
+    pd.DataFrame
+        The scenarios, see monthly_price_calculator_scenarios, with interest rates
+        rounded to 5 decimals.
+    """
+    # Convert interest rates from percentages to decimals
+    interest_rates_decimal = np.arange(
+        interest_rate_range[0] / 100, interest_rate_range[1] / 100 + 0.005, 0.0025
+    )
+
+    df = monthly_price_calculator_scenarios(
+        houseprice_range=np.arange(*houseprice_range, step=100000),
+        interest_rate_range=interest_rates_decimal,
+        fixed_cost_house_range=[fixed_cost_house],
+        kwh_usage_range=[kwh_usage_range],
+        kwh_price_range=[kwh_price_range],
+        markup_nok_range=[markup_nok],
+        fixed_cost_electricity_range=[fixed_cost_electricity],
+        ammortisation_periods_range=[ammortisation_periods],
+        person_a_fixed_costs_range=[person_a_fixed_costs],
+        person_b_fixed_costs_range=[person_b_fixed_costs],
+        transaction_costs_range=[transaction_costs],
+        ek_range=[ek],
+        ownership_fraq_range=[ownership_fraq / 100],  # Convert percentage to fraction
+    )
+    df["interest_rate"] = df["interest_rate"].round(5)
+    return df
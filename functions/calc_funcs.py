@@ -6,15 +6,200 @@ Created on Mon Sep  2 2024
 """
 
 from pathlib import Path
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from functools import lru_cache
+from multiprocessing import shared_memory
+import os
 import sys
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
-from itertools import product
 
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from classes.scenario_grid import ScenarioGrid  # noqa: E402
+
+
+# Columns of an amortization schedule, in the order they are stored in schedule arrays
+AMORTIZATION_COLUMNS = ("Principal", "Interest", "Remaining Balance", "Total Paid")
+
+
+def amortization_schedule_arrays(
+    loan_amounts: np.ndarray | float,
+    annual_interest_rates: np.ndarray | float,
+    loan_term_months: np.ndarray | int,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Calculate the amortization schedules for many loans at once as a NumPy array.
+
+    The monthly payment of each loan is computed once, and the remaining balance after
+    month k is derived in closed form from the geometric series of the annuity,
+    ``B_k = L * g**k - P * (g**k - 1) / r`` with ``g = 1 + r``. Cumulative principal and
+    interest follow directly from the balance, so no per-period payments are summed.
+
+    Parameters
+    ----------
+    loan_amounts : np.ndarray or float
+        The initial amount of each loan.
+    annual_interest_rates : np.ndarray or float
+        The annual interest rate of each loan, expressed as a decimal (e.g., 0.05 for 5%).
+    loan_term_months : np.ndarray or int
+        The total number of months for each loan term.
+    out : np.ndarray, optional
+        A preallocated array of shape (n_loans, max(loan_term_months) + 1, 4) to write the
+        schedules to.
+
+    Returns
+    -------
+    np.ndarray
+        An array of shape (n_loans, max(loan_term_months) + 1, 4), with one row per month
+        including the initial state (t=0), and columns as in AMORTIZATION_COLUMNS. The
+        inputs are broadcast against each other to give n_loans. Loans with a shorter term
+        keep their final state for the remaining months. Cumulative principal and interest
+        are rounded to the nearest whole number, as in calculate_amortization_schedule.
+
+    Examples
+    --------
+    >>> schedules = amortization_schedule_arrays([200000, 300000], 0.05, [240, 360])
+    >>> schedules.shape
+    (2, 361, 4)
+    """
+    loan_amounts, annual_interest_rates, loan_term_months = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(loan_amounts, dtype=np.float64)),
+        np.atleast_1d(np.asarray(annual_interest_rates, dtype=np.float64)),
+        np.atleast_1d(np.asarray(loan_term_months)),
+    )
+    if loan_amounts.ndim != 1:
+        raise ValueError("Loan amounts, interest rates and terms must be 1-D")
+    if np.any(loan_term_months < 1):
+        raise ValueError("Loan terms must be at least one month")
+
+    loan_term_months = loan_term_months.astype(np.int64)
+    n_months = int(loan_term_months.max()) + 1
+
+    if out is None:
+        out = np.empty((len(loan_amounts), n_months, 4))
+    principal, interest, balance, total = np.moveaxis(out, -1, 0)
+
+    loan = loan_amounts[:, np.newaxis]
+    monthly_interest_rate = annual_interest_rates[:, np.newaxis] / 12
+    zero_rate = monthly_interest_rate == 0
+    # Avoid dividing by zero for interest free loans, which are handled separately below
+    safe_rate = np.where(zero_rate, 1.0, monthly_interest_rate)
+
+    # Payments made up to each month, starting with the initial state and holding at the
+    # final state after the end of each loan's term
+    months = np.minimum(
+        np.arange(n_months, dtype=np.float64), loan_term_months[:, np.newaxis]
+    )
+
+    # Growth factor (1 + r)**k for every loan and month, computed in a single pass
+    np.power(1 + monthly_interest_rate, months, out=balance)
+    payment = loan * annuity_factor(
+        annual_interest_rates[:, np.newaxis], loan_term_months[:, np.newaxis]
+    )
+
+    np.multiply(months, payment, out=total)
+    # B_k = L * g**k - P * (g**k - 1) / r, rearranged to reuse the growth buffer. Interest
+    # free loans are paid down linearly.
+    balance *= loan - payment / safe_rate
+    balance += payment / safe_rate
+    np.subtract(loan, total, out=balance, where=zero_rate)
+
+    # Cumulative principal is what has been paid off the loan, and the rest is interest
+    np.subtract(loan, balance, out=principal)
+    np.subtract(total, principal, out=interest)
+
+    principal.round(0, out=principal)
+    interest.round(0, out=interest)
+    np.add(principal, interest, out=total)
+    np.subtract(loan, principal, out=balance)
+
+    return out
+
+
+def amortization_schedule_array(
+    loan_amount: int | float,
+    annual_interest_rate: int | float,
+    loan_term_months: int,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Calculate the amortization schedule for a single loan as a NumPy array.
+
+    Parameters
+    ----------
+    loan_amount : int or float
+        The initial amount of the loan.
+    annual_interest_rate : int or float
+        The annual interest rate of the loan, expressed as a decimal (e.g., 0.05 for 5%).
+    loan_term_months : int
+        The total number of months for the loan term.
+    out : np.ndarray, optional
+        A preallocated array of shape (loan_term_months + 1, 4) to write the schedule to.
+
+    Returns
+    -------
+    np.ndarray
+        An array of shape (loan_term_months + 1, 4), with columns as in
+        AMORTIZATION_COLUMNS. See amortization_schedule_arrays.
+    """
+    return amortization_schedule_arrays(
+        loan_amount,
+        annual_interest_rate,
+        loan_term_months,
+        out=None if out is None else out[np.newaxis],
+    )[0]
+
+
+def calculate_amortization_schedules(
+    loan_amounts: np.ndarray | float,
+    annual_interest_rates: np.ndarray | float,
+    loan_term_months: np.ndarray | int,
+    as_frame: bool = False,
+) -> np.ndarray | pd.DataFrame:
+    """
+    Calculate the amortization schedules for many loans in one call.
+
+    Parameters
+    ----------
+    loan_amounts : np.ndarray or float
+        The initial amount of each loan.
+    annual_interest_rates : np.ndarray or float
+        The annual interest rate of each loan, expressed as a decimal (e.g., 0.05 for 5%).
+    loan_term_months : np.ndarray or int
+        The total number of months for each loan term.
+    as_frame : bool, optional
+        Whether to return a long-form DataFrame instead of an array, by default False.
+
+    Returns
+    -------
+    np.ndarray or pd.DataFrame
+        By default, an array of shape (n_loans, max(loan_term_months) + 1, 4) as returned
+        by amortization_schedule_arrays. With ``as_frame=True``, a DataFrame with the same
+        columns as calculate_amortization_schedule except Month, indexed by a
+        (Loan, Month) MultiIndex and containing only the months within each loan's term.
+    """
+    schedules = amortization_schedule_arrays(
+        loan_amounts, annual_interest_rates, loan_term_months
+    )
+    if not as_frame:
+        return schedules
+
+    n_loans, n_months, _ = schedules.shape
+    loan_term_months = np.broadcast_to(np.asarray(loan_term_months), (n_loans,))
+
+    # Drop the months after the end of each loan's term
+    within_term = np.arange(n_months) <= loan_term_months[:, np.newaxis]
+    loans, months = np.nonzero(within_term)
+
+    return pd.DataFrame(
+        schedules[within_term],
+        columns=list(AMORTIZATION_COLUMNS),
+        index=pd.MultiIndex.from_arrays([loans, months], names=["Loan", "Month"]),
+    )
+
 
 def calculate_amortization_schedule(
     loan_amount: int | float, annual_interest_rate: int | float, loan_term_months: int
@@ -46,8 +231,9 @@ def calculate_amortization_schedule(
 
     Notes
     -----
-    - The function uses NumPy financial functions (npf) for calculations.
-    - All monetary values in the returned DataFrame are rounded to the nearest whole number.
+    - The schedule is calculated in closed form by amortization_schedule_arrays. Use
+      calculate_amortization_schedules to calculate schedules for many loans at once.
+    - Cumulative principal and interest are rounded to the nearest whole number.
     - The initial state (t=0) is included, where no payments have been made.
 
     Examples
@@ -58,123 +244,201 @@ def calculate_amortization_schedule(
     >>> schedule = calculate_amortization_schedule(loan_amount, annual_interest_rate, loan_term_months)
     >>> print(schedule.head())
        Month  Principal  Interest  Remaining Balance  Total Paid
-    0      0         0         0            200000           0
-    1      1       279       833            199721        1112
-    2      2       558      1665            199442        2223
-    3      3       838      2495            199162        3333
-    4      4      1119      3324            198881        4443
-    """
-    monthly_interest_rate = annual_interest_rate / 12
-    per = np.arange(loan_term_months) + 1
-    
-    # Calculates interest and principal per period
-    interest_pmt = npf.ipmt(monthly_interest_rate, per, loan_term_months, loan_amount) * -1
-    principal_pmt = npf.ppmt(monthly_interest_rate, per, loan_term_months, loan_amount) * -1
-    
-    # Prepend zeros for the initial state
-    cumulative_interest = np.insert(interest_pmt.cumsum(), 0, 0).round(0)
-    cumulative_principal = np.insert(principal_pmt.cumsum(), 0, 0).round(0)
-    cumulative_total = cumulative_principal + cumulative_interest
-    
-    # Calculate remaining balance including initial state
-    remaining_balance = np.insert(np.repeat(loan_amount, loan_term_months) - cumulative_principal[1:], 0, loan_amount)
-    
-    df = pd.DataFrame(
-        {
-            "Month": np.arange(loan_term_months + 1),
-            "Principal": cumulative_principal,
-            "Interest": cumulative_interest,
-            "Remaining Balance": remaining_balance,
-            "Total Paid": cumulative_total,
-        }
+    0      0        0.0       0.0           200000.0         0.0
+    1      1      240.0     833.0           199760.0      1073.0
+    2      2      482.0    1666.0           199518.0      2148.0
+    3      3      724.0    2497.0           199276.0      3221.0
+    4      4      967.0    3327.0           199033.0      4294.0
+    """
+    schedule = amortization_schedule_array(
+        loan_amount, annual_interest_rate, loan_term_months
     )
+
+    df = pd.DataFrame(schedule, columns=list(AMORTIZATION_COLUMNS))
+    df.insert(0, "Month", np.arange(len(schedule)))
     return df
 
 
 def calculate_govt_support(
-    kwh_usage: int | float,
-    kwh_price_incl_vat_nok: int | float,
+    kwh_usage: int | float | np.ndarray,
+    kwh_price_incl_vat_nok: int | float | np.ndarray,
     govt_support_limit_nok: float = 0.9125,
 ):
     """
     Calculate the government support for electricity usage based on usage, price, and the support limit.
 
+    Supports broadcasting between usages and prices, so a whole grid of scenarios can be
+    calculated in one call.
+
     Parameters
     ----------
-    kwh_usage : float
+    kwh_usage : float or np.ndarray
         The electricity usage in kWh.
-    kwh_price_incl_vat_nok : float
+    kwh_price_incl_vat_nok : float or np.ndarray
         The price of electricity per kWh, including VAT, in Norwegian Kroner (NOK).
     govt_support_limit_nok : float
         The government support limit price per kWh in Norwegian Kroner (NOK).
 
     Returns
     -------
-    float
-        The calculated government support amount in Norwegian Kroner (NOK).
+    float or np.ndarray
+        The calculated government support amount in Norwegian Kroner (NOK). A float is
+        returned if both inputs are scalars.
 
     Examples
     --------
     >>> calculate_govt_support(100, 1.5, 0.9125)
-    4.725
-    """
-    if kwh_usage <= 5000:
-        govt_support = (
-            kwh_usage * (kwh_price_incl_vat_nok - govt_support_limit_nok)
-        ) * 0.9
-    else:
-        govt_support = 0
+    52.875
+    >>> calculate_govt_support(np.array([100, 6000]), 1.5, 0.9125)
+    array([52.875,  0.   ])
+    """
+    # No support is given for usage above 5000 kWh
+    govt_support = np.where(
+        np.asarray(kwh_usage) <= 5000,
+        (kwh_usage * (kwh_price_incl_vat_nok - govt_support_limit_nok)) * 0.9,
+        0.0,
+    )
+
+    # If both inputs were scalars, return a scalar
+    if govt_support.ndim == 0:
+        return govt_support.item()
+
     return govt_support
 
 
 def calculate_electricity_costs(
-    kwh_usage: int,
-    kwh_price_incl_vat_nok: int | float,
-    markup_nok: int | float,
-    fixed_cost_nok: float | int,
+    kwh_usage: int | float | np.ndarray,
+    kwh_price_incl_vat_nok: int | float | np.ndarray,
+    markup_nok: int | float | np.ndarray,
+    fixed_cost_nok: float | int | np.ndarray,
     govt_support_limit_nok: float = 0.9125,
 ):
     """
     Calculate the total cost of electricity usage, including fixed costs and government support.
 
+    Supports broadcasting between all inputs, so a whole grid of scenarios can be
+    calculated in one call.
+
     Parameters
     ----------
-    kwh_usage : int | float
+    kwh_usage : int | float | np.ndarray
         The amount of electricity usage in kilowatt-hours (kWh).
-    kwh_price_incl_vat_nok : int | float
+    kwh_price_incl_vat_nok : int | float | np.ndarray
         The price of electricity per kWh, including value-added tax (VAT) in Norwegian kroner (NOK).
-    markup_nok : int | float
+    markup_nok : int | float | np.ndarray
         The additional markup cost per kWh in NOK.
-    fixed_cost_nok : int | float
+    fixed_cost_nok : int | float | np.ndarray
         The fixed cost of electricity in NOK.
     govt_support_limit_nok : float, optional
         The government support limit price per kWh in NOK, by default 0.9125.
 
     Returns
     -------
-    float
-        The total cost of electricity usage in NOK.
+    float or np.ndarray
+        The total cost of electricity usage in NOK. A float is returned if all inputs are
+        scalars.
 
     Examples
     --------
     >>> calculate_electricity_costs(1000, 1.2, 0.1, 100)
-    1410.0
-    >>> calculate_electricity_costs(1000, 1.5, 0.1, 100)
-    1592.5
+    1141.25
+    >>> calculate_electricity_costs(1000, np.array([0.8, 1.5]), 0.1, 100)
+    array([1000.  , 1171.25])
     """
     # Calculates cost without any govt support
     costs = fixed_cost_nok + (kwh_usage * (kwh_price_incl_vat_nok + markup_nok))
 
-    if kwh_price_incl_vat_nok <= govt_support_limit_nok:
-        return costs
-
     # Calculates amount of support, which is 0.9 times the difference between the support limit
-    # and price
-    govt_support_amount = calculate_govt_support(
-        kwh_usage, kwh_price_incl_vat_nok, govt_support_limit_nok
+    # and price. Prices at or below the limit get no support.
+    govt_support_amount = np.where(
+        np.asarray(kwh_price_incl_vat_nok) > govt_support_limit_nok,
+        calculate_govt_support(
+            kwh_usage, kwh_price_incl_vat_nok, govt_support_limit_nok
+        ),
+        0.0,
     )
 
-    return costs - govt_support_amount
+    costs = costs - govt_support_amount
+
+    # If all inputs were scalars, return a scalar
+    if np.ndim(costs) == 0:
+        return float(costs)
+
+    return costs
+
+
+def electricity_cost_surface(
+    kwh_usage_range: np.ndarray,
+    kwh_price_range: np.ndarray,
+    markup_nok: float,
+    fixed_cost_nok: float,
+    govt_support_limit_nok: float = 0.9125,
+) -> np.ndarray:
+    """
+    Calculate the total cost of electricity for every combination of usage and price.
+
+    Parameters
+    ----------
+    kwh_usage_range : np.ndarray
+        Range of kilowatt-hours (kWh) usages to analyze.
+    kwh_price_range : np.ndarray
+        Range of prices per kWh in NOK to analyze.
+    markup_nok : float
+        The additional markup cost per kWh in NOK.
+    fixed_cost_nok : float
+        The fixed cost of electricity in NOK.
+    govt_support_limit_nok : float, optional
+        The government support limit price per kWh in NOK.
+
+    Returns
+    -------
+    np.ndarray
+        A 2-D array of total costs in NOK with one row per kWh usage and one column per
+        kWh price.
+    """
+    return np.atleast_2d(
+        calculate_electricity_costs(
+            np.asarray(kwh_usage_range)[:, np.newaxis],
+            np.asarray(kwh_price_range)[np.newaxis, :],
+            markup_nok,
+            fixed_cost_nok,
+            govt_support_limit_nok,
+        )
+    )
+
+
+def electricity_surface_to_frame(
+    kwh_usage_range: np.ndarray,
+    kwh_price_range: np.ndarray,
+    surface: np.ndarray,
+) -> pd.DataFrame:
+    """
+    Convert an electricity cost surface to long form, with one row per usage and price.
+
+    Parameters
+    ----------
+    kwh_usage_range : np.ndarray
+        The kWh usages along the rows of the surface.
+    kwh_price_range : np.ndarray
+        The kWh prices along the columns of the surface.
+    surface : np.ndarray
+        The total costs, as returned by electricity_cost_surface.
+
+    Returns
+    -------
+    pd.DataFrame
+        A DataFrame with columns for kWh usage, kWh price, and the total cost of electricity.
+    """
+    kwh_usage_range = np.asarray(kwh_usage_range)
+    kwh_price_range = np.asarray(kwh_price_range)
+
+    return pd.DataFrame(
+        {
+            "kWh Usage": np.repeat(kwh_usage_range, len(kwh_price_range)),
+            "kWh Price (NOK)": np.tile(kwh_price_range, len(kwh_usage_range)),
+            "Total Cost (NOK)": surface.ravel(),
+        }
+    )
 
 
 def scenario_analysis_electricity_costs(
@@ -205,27 +469,70 @@ def scenario_analysis_electricity_costs(
     pd.DataFrame
         A DataFrame with columns for kWh usage, kWh price, and the total cost of electricity.
     """
-    # Prepare the result list
-    scenarios = []
+    surface = electricity_cost_surface(
+        kwh_usage_range, kwh_price_range, markup_nok, fixed_cost_nok, govt_support_limit_nok
+    )
+
+    return electricity_surface_to_frame(kwh_usage_range, kwh_price_range, surface)
+
+
+# Maximum number of (rate, months) pairs kept by the scalar annuity factor cache
+ANNUITY_FACTOR_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=ANNUITY_FACTOR_CACHE_SIZE)
+def _annuity_factor_cached(rate: float, months: int) -> float:
+    """Calculate the annuity factor for one (rate, months) pair, memoized."""
+    monthly_rate = rate / 12
+    if monthly_rate == 0:
+        return 1 / months
+
+    growth = (1 + monthly_rate) ** months
+    return monthly_rate * growth / (growth - 1)
 
-    # Iterate over all combinations of kWh usage and kWh price
-    for kwh_usage in kwh_usage_range:
-        for kwh_price in kwh_price_range:
-            # Calculate total cost using the function
-            total_cost = calculate_electricity_costs(
-                kwh_usage, kwh_price, markup_nok, fixed_cost_nok, govt_support_limit_nok
-            )
-            # Append each scenario's result to the list
-            scenarios.append(
-                {
-                    "kWh Usage": kwh_usage,
-                    "kWh Price (NOK)": kwh_price,
-                    "Total Cost (NOK)": total_cost,
-                }
-            )
 
-    # Convert the list of dictionaries to a DataFrame for easier analysis and visualization
-    return pd.DataFrame(scenarios)
+def annuity_factor(
+    rate: np.ndarray | float, months: np.ndarray | int
+) -> np.ndarray | float:
+    """
+    Calculate the fraction of a loan that is paid each month for given rates and terms.
+
+    Multiplying the annuity factor by a loan amount gives the monthly payment, so the
+    factor can be calculated once per unique (rate, months) pair and reused for any
+    number of loans. Scalar calls are memoized in a bounded LRU cache, and array inputs
+    are broadcast against each other.
+
+    Parameters
+    ----------
+    rate : np.ndarray or float
+        The annual interest rate(s).
+    months : np.ndarray or int
+        The number of months over which the loan(s) will be amortized.
+
+    Returns
+    -------
+    np.ndarray or float
+        The annuity factor(s). A float is returned if both inputs are scalars.
+
+    Examples
+    --------
+    >>> annuity_factor(0.035, 360)
+    0.004490446878...
+    >>> annuity_factor(np.array([0.0, 0.035]), 360)
+    array([0.00277778, 0.00449045])
+    """
+    if np.ndim(rate) == 0 and np.ndim(months) == 0:
+        return _annuity_factor_cached(float(rate), int(months))
+
+    monthly_rate = np.asarray(rate, dtype=np.float64) / 12
+    zero_rate = monthly_rate == 0
+    growth = (1 + monthly_rate) ** months
+
+    # Interest free loans are paid down linearly
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            zero_rate, 1 / np.asarray(months), monthly_rate * growth / (growth - 1)
+        )
 
 
 def loan_calc(
@@ -259,14 +566,14 @@ def loan_calc(
     >>> loan_calc(np.array([100000, 200000, 300000]), 0.035, 360)
     array([448.64, 897.28, 1345.92])
     """
+    # Scalar inputs use the memoized annuity factor of the interactive app
+    if np.ndim(loan) == 0 and np.ndim(rate) == 0 and np.ndim(months) == 0:
+        return annuity_factor(float(rate), int(months)) * float(loan)
+
     loan = np.atleast_1d(loan)[:, np.newaxis]
     rate = np.atleast_1d(rate)[np.newaxis, :]
 
-    monthly_rate = rate / 12
-    numerator = monthly_rate * (1 + monthly_rate) ** months
-    denominator = (1 + monthly_rate) ** months - 1
-
-    result = (numerator / denominator) * loan
+    result = annuity_factor(rate, months) * loan
 
     # If both inputs were scalars, return a scalar
     if result.size == 1:
@@ -422,6 +729,395 @@ def monthly_price_calculator(
     return df
 
 
+# Names of the scenario grid axes, in the order they are combined
+SCENARIO_AXES = (
+    "house_price",
+    "interest_rate",
+    "fixed_cost_house",
+    "kwh_usage",
+    "kwh_price",
+    "markup_nok",
+    "fixed_cost_electricity",
+    "ammortisation_periods",
+    "person_a_fixed_costs",
+    "person_b_fixed_costs",
+    "transaction_costs",
+    "ek",
+    "ownership_fraq",
+)
+
+# Column order of the scenario results
+SCENARIO_COLUMNS = (
+    "house_price",
+    "interest_rate",
+    "fixed_cost_house",
+    "kwh_usage",
+    "kwh_price",
+    "markup_nok",
+    "fixed_cost_electricity",
+    "el_cost",
+    "ammortisation_periods",
+    "person_a_fixed_costs",
+    "person_b_fixed_costs",
+    "transaction_costs",
+    "ek",
+    "ownership_fraq",
+    "monthly_loan_payment",
+    "a_total",
+    "b_total",
+)
+
+
+def _scenario_axes(*ranges) -> tuple[np.ndarray, ...]:
+    """Convert the scenario input ranges to 1-D arrays, one per name in SCENARIO_AXES."""
+    return tuple(np.atleast_1d(np.asarray(axis)) for axis in ranges)
+
+
+def _grid_size(axes: tuple[np.ndarray, ...]) -> int:
+    """Return the number of scenarios in the grid spanned by ``axes``."""
+    return int(np.prod([len(axis) for axis in axes], dtype=np.int64))
+
+
+# Columns of the scenario results that are calculated rather than taken from the axes
+SCENARIO_METRICS = ("el_cost", "monthly_loan_payment", "a_total", "b_total")
+
+# The independent sub-results of a scenario and the axes each of them depends on
+SCENARIO_TABLE_AXES = {
+    "loan": ("house_price", "transaction_costs", "ek"),
+    "annuity_factor": ("interest_rate", "ammortisation_periods"),
+    "el_cost": ("kwh_usage", "kwh_price", "markup_nok", "fixed_cost_electricity"),
+}
+
+
+def _scenario_tables(
+    axes: tuple[np.ndarray, ...], govt_support_limit_nok: float = 0.9125
+) -> dict[str, np.ndarray]:
+    """
+    Calculate the independent sub-results of a scenario grid on their own sub-grids.
+
+    The loan amount, annuity factor and electricity cost each depend on only a few of the
+    axes, so they are calculated once per combination of those axes (see
+    SCENARIO_TABLE_AXES) instead of once per scenario. The cost of this scales with the
+    size of each sub-grid rather than the size of the full grid.
+
+    Parameters
+    ----------
+    axes : tuple[np.ndarray, ...]
+        One 1-D array per name in SCENARIO_AXES.
+    govt_support_limit_nok : float, optional
+        The government support limit price per kWh in NOK, by default 0.9125.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One array per name in SCENARIO_TABLE_AXES, with one dimension per axis it depends on.
+    """
+    axes = dict(zip(SCENARIO_AXES, axes))
+
+    # Calculate loan amount after subtracting effective equity (equity minus transaction costs)
+    house_price, transaction_costs, ek = np.ix_(
+        *(axes[name] for name in SCENARIO_TABLE_AXES["loan"])
+    )
+    loan = house_price - (ek - transaction_costs)
+
+    # Calculate the annuity factor once per (interest rate, amortisation period) pair, so
+    # the loan payment is a single multiply per scenario
+    factors = annuity_factor(
+        *np.ix_(*(axes[name] for name in SCENARIO_TABLE_AXES["annuity_factor"]))
+    )
+
+    # Calculate electricity costs including govt support
+    el_cost = calculate_electricity_costs(
+        *np.ix_(*(axes[name] for name in SCENARIO_TABLE_AXES["el_cost"])),
+        govt_support_limit_nok,
+    )
+
+    return {"loan": loan, "annuity_factor": factors, "el_cost": el_cost}
+
+
+def _evaluate_scenario_values(
+    axes: tuple[np.ndarray, ...],
+    tables: dict[str, np.ndarray],
+    start: int,
+    stop: int,
+    dtype: type = np.float64,
+) -> dict[str, np.ndarray]:
+    """
+    Evaluate the scenarios with flat grid positions ``start`` up to ``stop``.
+
+    The flat position of a scenario is its index in ``itertools.product(*axes)``. The
+    input values and the precalculated sub-results are gathered by unravelling the
+    positions into per-axis codes, so only the requested block of the grid is ever
+    materialized and the remaining per-scenario work is plain arithmetic.
+
+    Parameters
+    ----------
+    axes : tuple[np.ndarray, ...]
+        One 1-D array per name in SCENARIO_AXES.
+    tables : dict[str, np.ndarray]
+        The sub-results of the grid, as returned by _scenario_tables.
+    start : int
+        The first flat grid position to evaluate.
+    stop : int
+        The flat grid position to stop before.
+    dtype : type, optional
+        The dtype of the calculated result columns, by default np.float64.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One array of scenario results per name in SCENARIO_COLUMNS.
+    """
+    axes = dict(zip(SCENARIO_AXES, axes))
+    codes = dict(
+        zip(
+            SCENARIO_AXES,
+            np.unravel_index(
+                np.arange(start, stop), tuple(len(axis) for axis in axes.values())
+            ),
+        )
+    )
+    values = {name: axes[name][codes[name]] for name in SCENARIO_AXES}
+
+    # Look up each sub-result by the codes of the axes it depends on
+    for table, table_axes in SCENARIO_TABLE_AXES.items():
+        values[table] = tables[table][tuple(codes[name] for name in table_axes)]
+
+    values.update(_combine_scenario_results(values, dtype))
+
+    return {column: values[column] for column in SCENARIO_COLUMNS}
+
+
+def _evaluate_scenarios(
+    axes: tuple[np.ndarray, ...],
+    tables: dict[str, np.ndarray],
+    start: int,
+    stop: int,
+    dtype: type = np.float64,
+) -> pd.DataFrame:
+    """
+    Evaluate the scenarios with flat grid positions ``start`` up to ``stop`` as a DataFrame.
+
+    See _evaluate_scenario_values for the parameters.
+
+    Returns
+    -------
+    pd.DataFrame
+        The scenario results with columns SCENARIO_COLUMNS, indexed by flat grid position.
+    """
+    return pd.DataFrame(
+        _evaluate_scenario_values(axes, tables, start, stop, dtype),
+        index=pd.RangeIndex(start, stop),
+    )
+
+
+# Number of shards per worker when scenarios are evaluated in parallel, so that workers
+# that finish early pick up more of the grid
+SHARDS_PER_WORKER = 4
+
+
+def _shared_column_layout(
+    axes: tuple[np.ndarray, ...], n_scenarios: int, dtype: type
+) -> tuple[list[tuple[str, str, int]], int]:
+    """
+    Return the (column, dtype, byte offset) of each result column in a shared buffer, and the buffer size.
+
+    Each column is stored contiguously for all scenarios, at an offset aligned to 8 bytes.
+    """
+    column_dtypes = {name: axis.dtype for name, axis in zip(SCENARIO_AXES, axes)}
+    column_dtypes.update({name: np.dtype(dtype) for name in SCENARIO_METRICS})
+
+    layout = []
+    offset = 0
+    for column in SCENARIO_COLUMNS:
+        column_dtype = np.dtype(column_dtypes[column])
+        layout.append((column, column_dtype.str, offset))
+        offset += -(-n_scenarios * column_dtype.itemsize // 8) * 8
+    return layout, offset
+
+
+def _shared_columns(buffer, layout: list, n_scenarios: int) -> dict[str, np.ndarray]:
+    """Return the result columns described by layout as views of a shared buffer."""
+    return {
+        column: np.ndarray((n_scenarios,), dtype=column_dtype, buffer=buffer, offset=offset)
+        for column, column_dtype, offset in layout
+    }
+
+
+def _evaluate_scenarios_into_shared_memory(
+    name: str,
+    layout: list,
+    n_scenarios: int,
+    axes: tuple[np.ndarray, ...],
+    tables: dict[str, np.ndarray],
+    start: int,
+    stop: int,
+    dtype: type,
+):
+    """Evaluate a shard of the grid and write its results into the shared memory block name."""
+    values = _evaluate_scenario_values(axes, tables, start, stop, dtype)
+
+    block = shared_memory.SharedMemory(name=name)
+    columns = _shared_columns(block.buf, layout, n_scenarios)
+    try:
+        for column in columns:
+            columns[column][start:stop] = values[column]
+    finally:
+        # The views must be released before the block is closed, also when a write fails,
+        # so the original error is raised rather than a BufferError from close
+        del columns
+        block.close()
+
+
+def _evaluate_scenarios_parallel(
+    axes: tuple[np.ndarray, ...],
+    tables: dict[str, np.ndarray],
+    n_scenarios: int,
+    dtype: type,
+    executor: Executor,
+    n_shards: int,
+) -> pd.DataFrame:
+    """
+    Evaluate every scenario by sharding the flat grid positions across an executor.
+
+    Each shard is a contiguous block of grid positions, so the shards follow the outer
+    axes of the grid. The workers write their results into one shared memory block at
+    the positions of their shard, so no results are pickled back and the rows are in
+    the same order as in the serial evaluation.
+    """
+    layout, size = _shared_column_layout(axes, n_scenarios, dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    futures = []
+    try:
+        bounds = np.linspace(0, n_scenarios, min(n_shards, n_scenarios) + 1).astype(np.int64)
+        futures = [
+            executor.submit(
+                _evaluate_scenarios_into_shared_memory,
+                block.name,
+                layout,
+                n_scenarios,
+                axes,
+                tables,
+                int(start),
+                int(stop),
+                dtype,
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for future in futures:
+            future.result()
+
+        # Copy the results out of the shared block, which is freed below
+        columns = _shared_columns(block.buf, layout, n_scenarios)
+        df = pd.DataFrame(
+            {column: values.copy() for column, values in columns.items()},
+            index=pd.RangeIndex(0, n_scenarios),
+        )
+    finally:
+        # If a shard failed, the other shards may still be writing to the block, so the
+        # pending shards are cancelled and the running ones finish before it is freed
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        columns = None
+        block.close()
+        block.unlink()
+
+    return df
+
+
+def _evaluate_scenario_grid(
+    axes: tuple[np.ndarray, ...],
+    tables: dict[str, np.ndarray],
+    dtype: type = np.float64,
+) -> ScenarioGrid:
+    """
+    Evaluate every scenario in the grid, keeping one dimension per axis.
+
+    The sub-results are broadcast against the axes they do not depend on, so no
+    per-scenario copies of the inputs are made.
+
+    Parameters
+    ----------
+    axes : tuple[np.ndarray, ...]
+        One 1-D array per name in SCENARIO_AXES.
+    tables : dict[str, np.ndarray]
+        The sub-results of the grid, as returned by _scenario_tables.
+    dtype : type, optional
+        The dtype to store the results in, by default np.float64.
+
+    Returns
+    -------
+    ScenarioGrid
+        The scenario results, with one coordinate per name in SCENARIO_AXES.
+    """
+    shape = tuple(len(axis) for axis in axes)
+    axes = dict(zip(SCENARIO_AXES, axes))
+
+    def expand(values, value_axes):
+        # Reshape so that each dimension of values lines up with its axis in the grid
+        expanded_shape = [
+            len(axes[name]) if name in value_axes else 1 for name in SCENARIO_AXES
+        ]
+        return np.reshape(values, expanded_shape)
+
+    values = {name: expand(axes[name], (name,)) for name in SCENARIO_AXES}
+    for table, table_axes in SCENARIO_TABLE_AXES.items():
+        values[table] = expand(tables[table], table_axes)
+
+    results = _combine_scenario_results(values, dtype)
+
+    return ScenarioGrid(
+        coords=axes,
+        data={
+            name: np.ascontiguousarray(np.broadcast_to(results[name], shape))
+            for name in SCENARIO_METRICS
+        },
+        columns=SCENARIO_COLUMNS,
+    )
+
+
+def _combine_scenario_results(
+    values: dict[str, np.ndarray], dtype: type = np.float64
+) -> dict[str, np.ndarray]:
+    """
+    Combine the sub-results of scenarios into the monthly costs for each person.
+
+    Parameters
+    ----------
+    values : dict[str, np.ndarray]
+        Mutually broadcastable arrays for each name in SCENARIO_TABLE_AXES and for
+        fixed_cost_house, ownership_fraq, person_a_fixed_costs and person_b_fixed_costs.
+    dtype : type, optional
+        The dtype to return the results in, by default np.float64.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One array per name in SCENARIO_METRICS.
+    """
+    el_cost = values["el_cost"]
+    monthly_loan_payment = values["loan"] * values["annuity_factor"]
+
+    # Calculate ownership shares
+    ownership_fraq = values["ownership_fraq"]
+    shared_costs = (el_cost / 2) + (values["fixed_cost_house"] / 2)
+    a_share = (monthly_loan_payment * ownership_fraq) + shared_costs
+    b_share = (monthly_loan_payment * (1 - ownership_fraq)) + shared_costs
+
+    # Sum up total costs per person
+    results = {
+        "el_cost": el_cost,
+        "monthly_loan_payment": monthly_loan_payment,
+        "a_total": a_share + values["person_a_fixed_costs"],
+        "b_total": b_share + values["person_b_fixed_costs"],
+    }
+    return {
+        name: np.asarray(result).astype(dtype, copy=False)
+        for name, result in results.items()
+    }
+
+
 def monthly_price_calculator_scenarios(
     houseprice_range: list,
     interest_rate_range: list,
@@ -436,10 +1132,21 @@ def monthly_price_calculator_scenarios(
     transaction_costs_range: list,
     ek_range: list,
     ownership_fraq_range: list,
+    govt_support_limit_nok: float = 0.9125,
+    as_grid: bool = False,
+    dtype: type = np.float64,
+    n_workers: int | None = None,
+    executor: Executor | None = None,
 ):
     """
     Generate scenarios for varying parameters of house ownership costs.
 
+    All scenarios are computed at once by broadcasting the input ranges against each
+    other, so no Python-level work is done per combination. The loan amount, annuity
+    factor and electricity cost are only calculated once per combination of the axes
+    they depend on. Use iter_monthly_price_calculator_scenarios to evaluate grids that
+    are too large to hold in memory.
+
     Parameters
     ----------
     houseprice_range : list
@@ -468,103 +1175,169 @@ def monthly_price_calculator_scenarios(
         Range of equity amounts to analyze.
     ownership_fraq_range : list
         Range of ownership fractions to analyze.
-    govt_support_limit_nok_range : list
-        Range of government support limit prices per kWh in NOK to analyze.
+    govt_support_limit_nok : float, optional
+        The government support limit price per kWh in NOK, by default 0.9125.
+    as_grid : bool, optional
+        Whether to return a compact ScenarioGrid, which stores the ranges once and only
+        the calculated results densely, instead of a DataFrame, by default False. The
+        grid is labeled by the ranges, so scenarios and 2-D surfaces can be selected by
+        value with ScenarioGrid.sel and ScenarioGrid.surface without scanning.
+    dtype : type, optional
+        The dtype of the calculated results, by default np.float64. Use np.float32 to
+        halve their memory use.
+    n_workers : int, optional
+        The number of processes to evaluate the scenarios in, by default None, which
+        evaluates them in this process. The grid is split into contiguous shards that
+        the workers write into shared memory, and the result is identical to the serial
+        result. Only worthwhile for grids of millions of scenarios.
+    executor : concurrent.futures.Executor, optional
+        An existing executor to evaluate the shards in instead of starting a process pool
+        of n_workers, by default None.
 
     Returns
     -------
-    pd.DataFrame
-        A DataFrame containing all the scenarios and their respective calculations.
-    """
-    # Generate all combinations of input parameters
-    all_combinations = list(
-        product(
-            houseprice_range,
-            interest_rate_range,
-            fixed_cost_house_range,
-            kwh_usage_range,
-            kwh_price_range,
-            markup_nok_range,
-            fixed_cost_electricity_range,
-            ammortisation_periods_range,
-            person_a_fixed_costs_range,
-            person_b_fixed_costs_range,
-            transaction_costs_range,
-            ek_range,
-            ownership_fraq_range,
-        )
+    pd.DataFrame or ScenarioGrid
+        A DataFrame containing all the scenarios and their respective calculations, one row
+        per combination in the same order as ``itertools.product`` over the ranges. With
+        ``as_grid=True``, a ScenarioGrid whose ``to_frame()`` gives the same DataFrame.
+    """
+    axes = _scenario_axes(
+        houseprice_range,
+        interest_rate_range,
+        fixed_cost_house_range,
+        kwh_usage_range,
+        kwh_price_range,
+        markup_nok_range,
+        fixed_cost_electricity_range,
+        ammortisation_periods_range,
+        person_a_fixed_costs_range,
+        person_b_fixed_costs_range,
+        transaction_costs_range,
+        ek_range,
+        ownership_fraq_range,
     )
+    n_scenarios = _grid_size(axes)
 
-    results = []
-
-    # Process each combination of parameters
-    for (
-        house_price,
-        interest_rate,
-        fixed_cost_house,
-        kwh_usage,
-        kwh_price,
-        markup_nok,
-        fixed_cost_electricity,
-        ammortisation_periods,
-        person_a_fixed_costs,
-        person_b_fixed_costs,
-        transaction_costs,
-        ek,
-        ownership_fraq,
-    ) in all_combinations:
-        # Calculate effective equity after transaction costs
-        eff_ek = ek - transaction_costs
-        # Calculate loan amount
-        loan = house_price - eff_ek
-
-        # Calculate monthly loan payment using loan_calc function
-        monthly_loan_payment = loan_calc(loan, interest_rate, ammortisation_periods)
-
-        # Calculate electricity costs using calculate_electricity_costs function
-        el_cost = calculate_electricity_costs(
-            kwh_usage, kwh_price, markup_nok, fixed_cost_electricity
-        )
+    tables = _scenario_tables(axes, govt_support_limit_nok)
 
-        # Calculate ownership shares
-        a_share = (
-            (monthly_loan_payment * ownership_fraq)
-            + (el_cost / 2)
-            + (fixed_cost_house / 2)
-        )
-        b_share = (
-            (monthly_loan_payment * (1 - ownership_fraq))
-            + (el_cost / 2)
-            + (fixed_cost_house / 2)
-        )
+    if as_grid:
+        if n_workers is not None or executor is not None:
+            raise ValueError("as_grid cannot be combined with n_workers or executor")
+        return _evaluate_scenario_grid(axes, tables, dtype)
 
-        # Sum up total costs per person
-        a_total = a_share + person_a_fixed_costs
-        b_total = b_share + person_b_fixed_costs
-
-        # Append the results to the list
-        results.append(
-            {
-                "house_price": house_price,
-                "interest_rate": interest_rate,
-                "fixed_cost_house": fixed_cost_house,
-                "kwh_usage": kwh_usage,
-                "kwh_price": kwh_price,
-                "markup_nok": markup_nok,
-                "fixed_cost_electricity": fixed_cost_electricity,
-                "el_cost": el_cost,
-                "ammortisation_periods": ammortisation_periods,
-                "person_a_fixed_costs": person_a_fixed_costs,
-                "person_b_fixed_costs": person_b_fixed_costs,
-                "transaction_costs": transaction_costs,
-                "ek": ek,
-                "ownership_fraq": ownership_fraq,
-                "monthly_loan_payment": monthly_loan_payment,
-                "a_total": a_total,
-                "b_total": b_total,
-            }
+    if n_scenarios > 0 and executor is not None:
+        n_shards = (n_workers or os.cpu_count() or 1) * SHARDS_PER_WORKER
+        return _evaluate_scenarios_parallel(
+            axes, tables, n_scenarios, dtype, executor, n_shards
         )
 
-    # Convert the list of dictionaries to a DataFrame
-    results_df = pd.DataFrame(results)
-    return results_df
+    if n_scenarios > 0 and n_workers is not None and n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            return _evaluate_scenarios_parallel(
+                axes, tables, n_scenarios, dtype, pool, n_workers * SHARDS_PER_WORKER
+            )
+
+    return _evaluate_scenarios(axes, tables, 0, n_scenarios, dtype)
+
+
+def iter_monthly_price_calculator_scenarios(
+    houseprice_range: list,
+    interest_rate_range: list,
+    fixed_cost_house_range: list,
+    kwh_usage_range: list,
+    kwh_price_range: list,
+    markup_nok_range: list,
+    fixed_cost_electricity_range: list,
+    ammortisation_periods_range: list,
+    person_a_fixed_costs_range: list,
+    person_b_fixed_costs_range: list,
+    transaction_costs_range: list,
+    ek_range: list,
+    ownership_fraq_range: list,
+    govt_support_limit_nok: float = 0.9125,
+    chunk_size: int = 100_000,
+    start: int = 0,
+    stop: int | None = None,
+):
+    """
+    Lazily generate scenarios for varying parameters of house ownership costs in chunks.
+
+    Walks the same grid as monthly_price_calculator_scenarios in flat index space and
+    yields at most ``chunk_size`` rows at a time, so memory use is bounded by the chunk
+    size rather than the grid size. Concatenating the chunks gives the same DataFrame
+    as monthly_price_calculator_scenarios.
+
+    ``start`` and ``stop`` restrict the walk to the rows at those flat positions, so
+    disjoint parts of the grid can be calculated independently, e.g. by different
+    processes.
+
+    Parameters
+    ----------
+    houseprice_range, interest_rate_range, ..., ownership_fraq_range : list
+        The ranges to analyze, as for monthly_price_calculator_scenarios.
+    govt_support_limit_nok : float, optional
+        The government support limit price per kWh in NOK, by default 0.9125.
+    chunk_size : int, optional
+        The maximum number of scenarios per chunk, by default 100 000.
+    start : int, optional
+        The position of the first scenario to generate, by default 0.
+    stop : int, optional
+        The position after the last scenario to generate, by default the grid size.
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        Consecutive blocks of scenario results, indexed by their position in the full
+        grid. The arguments are checked when the function is called, and the chunks are
+        calculated as they are iterated over.
+
+    Examples
+    --------
+    >>> chunks = iter_monthly_price_calculator_scenarios(
+    ...     np.arange(3000000, 5000000, 100000), np.arange(0.01, 0.06, 0.0025),
+    ...     [5000], [500], [1.5], [0.1], [39], [360], [10000], [10000], [200000],
+    ...     [1500000], [0.5], chunk_size=100,
+    ... )
+    >>> sum(len(chunk) for chunk in chunks)
+    400
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+
+    axes = _scenario_axes(
+        houseprice_range,
+        interest_rate_range,
+        fixed_cost_house_range,
+        kwh_usage_range,
+        kwh_price_range,
+        markup_nok_range,
+        fixed_cost_electricity_range,
+        ammortisation_periods_range,
+        person_a_fixed_costs_range,
+        person_b_fixed_costs_range,
+        transaction_costs_range,
+        ek_range,
+        ownership_fraq_range,
+    )
+    n_scenarios = _grid_size(axes)
+    stop = n_scenarios if stop is None else min(stop, n_scenarios)
+    if not 0 <= start <= stop:
+        raise ValueError(f"start must be within [0, {stop}], got {start}")
+
+    return _iter_scenario_chunks(axes, govt_support_limit_nok, chunk_size, start, stop)
+
+
+def _iter_scenario_chunks(
+    axes: tuple[np.ndarray, ...],
+    govt_support_limit_nok: float,
+    chunk_size: int,
+    start: int,
+    stop: int,
+):
+    """Yield the scenarios from start to stop in chunks, see iter_monthly_price_calculator_scenarios."""
+    tables = _scenario_tables(axes, govt_support_limit_nok)
+
+    for chunk_start in range(start, stop, chunk_size):
+        yield _evaluate_scenarios(
+            axes, tables, chunk_start, min(chunk_start + chunk_size, stop)
+        )
@@ -0,0 +1,413 @@
+import hashlib
+import io
+import os
+import tempfile
+
+import pandas as pd
+import numpy as np
+
+from pathlib import Path
+from typing import BinaryIO, TextIO
+import sys
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from functions.calc_funcs import (  # noqa: E402
+    iter_monthly_price_calculator_scenarios,
+    monthly_price_calculator_scenarios,
+)
+
+
+# Number of rows converted and written at a time, which bounds the extra memory used
+EXPORT_CHUNK_SIZE = 100_000
+
+# Mime type and file suffix of each export format
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+}
+
+# Directory of the export files served by the pages, and the number of files kept there
+EXPORT_DIR = Path(tempfile.gettempdir()) / "boligkostnadskalkulatoren_exports"
+MAX_EXPORT_FILES = 20
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as err:
+        raise ImportError("Parquet and Arrow exports require the pyarrow package to be installed") from err
+    return pa, pq
+
+
+def available_export_formats() -> list[str]:
+    """
+    Returns the export formats that can be written, CSV first.
+
+    Parquet and Arrow IPC require the optional pyarrow package.
+
+    Returns
+    -------
+    list[str]
+        The available keys of EXPORT_FORMATS.
+    """
+    try:
+        _import_pyarrow()
+    except ImportError:
+        return ["csv"]
+    return list(EXPORT_FORMATS)
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yields consecutive row slices of a DataFrame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The DataFrame to slice.
+    chunk_size : int, optional
+        The number of rows in each slice, by default EXPORT_CHUNK_SIZE.
+
+    Yields
+    ------
+    pd.DataFrame
+        The slices, which are views of df where possible.
+    """
+    for start in range(0, max(len(df), 1), chunk_size):
+        yield df.iloc[start : start + chunk_size]
+
+
+def _chunks_or_empty(chunks, empty: pd.DataFrame | None, required: bool):
+    """
+    Yield the chunks, or empty if there are none, so the file still gets its columns.
+
+    If there are no chunks and no empty DataFrame, a ValueError is raised if a chunk is
+    required to write a valid file.
+    """
+    has_chunks = False
+    for chunk in chunks:
+        has_chunks = True
+        yield chunk
+
+    if not has_chunks:
+        if empty is not None:
+            yield empty
+        elif required:
+            raise ValueError("There are no chunks to write and no empty DataFrame to take the columns from")
+
+
+def write_csv(
+    chunks,
+    file: str | Path | BinaryIO | TextIO,
+    header: bool = True,
+    empty: pd.DataFrame | None = None,
+):
+    """
+    Writes DataFrame chunks to a CSV file, one chunk at a time.
+
+    Only the text of one chunk is held in memory at a time, unlike df.to_csv() without
+    a path, which builds the text of the whole DataFrame.
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        The chunks to write, all with the same columns.
+    file : str, Path or file-like object
+        The file to write to. Paths are overwritten, file objects are written from their
+        current position and left open. Binary files are written as UTF-8.
+    header : bool, optional
+        Whether to write the column names before the first chunk, by default True.
+    empty : pd.DataFrame, optional
+        A DataFrame without rows whose columns are written if there are no chunks. By
+        default None, an empty file is written.
+    """
+    if isinstance(file, (str, Path)):
+        with open(file, "wb") as binary_file:
+            write_csv(chunks, binary_file, header=header, empty=empty)
+        return
+
+    chunks = _chunks_or_empty(chunks, empty, required=False)
+
+    if isinstance(file, io.TextIOBase):
+        for chunk in chunks:
+            chunk.to_csv(file, index=False, header=header)
+            header = False
+        return
+
+    text_file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    try:
+        for chunk in chunks:
+            chunk.to_csv(text_file, index=False, header=header)
+            header = False
+        text_file.flush()
+    finally:
+        # Keep the underlying file open for the caller
+        text_file.detach()
+
+
+def write_parquet(chunks, file: str | Path | BinaryIO, empty: pd.DataFrame | None = None):
+    """
+    Writes DataFrame chunks to a Parquet file, with one row group per chunk.
+
+    Requires the optional pyarrow package.
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        The chunks to write, all with the same columns and dtypes.
+    file : str, Path or binary file-like object
+        The file to write to.
+    empty : pd.DataFrame, optional
+        A DataFrame without rows whose schema is written if there are no chunks. By
+        default None, in which case there must be at least one chunk.
+    """
+    pa, pq = _import_pyarrow()
+
+    writer = None
+    try:
+        for chunk in _chunks_or_empty(chunks, empty, required=True):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(file, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_arrow(chunks, file: str | Path | BinaryIO, empty: pd.DataFrame | None = None):
+    """
+    Writes DataFrame chunks to an Arrow IPC file, with one record batch per chunk.
+
+    Arrow IPC files can be memory mapped when read, e.g. with pyarrow.memory_map.
+    Requires the optional pyarrow package.
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        The chunks to write, all with the same columns and dtypes.
+    file : str, Path or binary file-like object
+        The file to write to.
+    empty : pd.DataFrame, optional
+        A DataFrame without rows whose schema is written if there are no chunks. By
+        default None, in which case there must be at least one chunk.
+    """
+    pa, _ = _import_pyarrow()
+
+    sink = str(file) if isinstance(file, Path) else file
+    writer = None
+    try:
+        for chunk in _chunks_or_empty(chunks, empty, required=True):
+            batch = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pa.ipc.new_file(sink, batch.schema)
+            writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+EXPORT_WRITERS = {
+    "csv": write_csv,
+    "parquet": write_parquet,
+    "arrow": write_arrow,
+}
+
+
+def export_frame(
+    df: pd.DataFrame,
+    file: str | Path | BinaryIO,
+    export_format: str = "csv",
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+):
+    """
+    Writes a DataFrame to a file in chunks, without an index.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The DataFrame to export.
+    file : str, Path or binary file-like object
+        The file to write to.
+    export_format : str, optional
+        One of EXPORT_FORMATS, by default "csv".
+    chunk_size : int, optional
+        The number of rows written at a time, by default EXPORT_CHUNK_SIZE.
+    """
+    if export_format not in EXPORT_WRITERS:
+        raise ValueError(f"Unknown export format {export_format}, expected one of {list(EXPORT_WRITERS)}")
+
+    EXPORT_WRITERS[export_format](iter_frame_chunks(df, chunk_size), file)
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Returns a digest of the columns and values of a DataFrame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The DataFrame to fingerprint.
+
+    Returns
+    -------
+    str
+        A hex digest, equal for DataFrames with equal columns and values.
+    """
+    digest = hashlib.sha256(repr(list(df.columns)).encode("utf-8"))
+    digest.update(np.ascontiguousarray(pd.util.hash_pandas_object(df, index=False).to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+def export_to_file(
+    df: pd.DataFrame,
+    export_format: str = "csv",
+    directory: str | Path = EXPORT_DIR,
+    max_files: int = MAX_EXPORT_FILES,
+) -> Path:
+    """
+    Exports a DataFrame to a file named by its fingerprint, reusing the file if it exists.
+
+    The file is written under a temporary name and renamed when complete, so sessions
+    exporting the same data share one file. Only the max_files most recently used files
+    are kept in directory.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The DataFrame to export.
+    export_format : str, optional
+        One of EXPORT_FORMATS, by default "csv".
+    directory : str or Path, optional
+        The directory of the export files, by default EXPORT_DIR.
+    max_files : int, optional
+        The number of files to keep in directory, by default MAX_EXPORT_FILES.
+
+    Returns
+    -------
+    Path
+        The path of the export file.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{frame_fingerprint(df)}{EXPORT_FORMATS[export_format][1]}"
+
+    if path.exists():
+        os.utime(path)
+        return path
+
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as file:
+        try:
+            export_frame(df, file, export_format)
+        except BaseException:
+            file.close()
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+
+    # Remove the least recently used export files. Other sessions may remove files from
+    # the same directory at the same time, so missing files are skipped
+    files = []
+    for candidate in directory.iterdir():
+        if candidate.suffix == ".tmp":
+            continue
+        try:
+            files.append((candidate.stat().st_mtime, candidate))
+        except OSError:
+            continue
+    files.sort()
+    for _, old_file in files[:-max_files]:
+        old_file.unlink(missing_ok=True)
+
+    return path
+
+
+def empty_scenario_frame(scenario_ranges: dict) -> pd.DataFrame:
+    """
+    Returns a DataFrame without rows with the columns and dtypes of calculated scenarios.
+
+    Parameters
+    ----------
+    scenario_ranges : dict
+        The ranges of the scenario grid and optionally govt_support_limit_nok, as for
+        iter_monthly_price_calculator_scenarios.
+
+    Returns
+    -------
+    pd.DataFrame
+        The empty scenarios.
+    """
+    return monthly_price_calculator_scenarios(
+        **{
+            name: np.atleast_1d(value)[:0] if name.endswith("_range") else value
+            for name, value in scenario_ranges.items()
+        }
+    )
+
+
+def export_scenarios(
+    file: str | Path | BinaryIO | TextIO,
+    export_format: str = "csv",
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    **scenario_ranges,
+) -> int:
+    """
+    Calculates scenarios chunk by chunk and writes each chunk to a file as it is calculated.
+
+    Only one chunk of scenarios is held in memory at a time, so grids that are too large
+    for a single DataFrame can be exported. The file has the same rows and columns as
+    monthly_price_calculator_scenarios would return, without the index.
+
+    Parameters
+    ----------
+    file : str, Path or file-like object
+        The file to write to. Parquet and Arrow exports need a path or a binary file.
+    export_format : str, optional
+        One of EXPORT_FORMATS, by default "csv".
+    chunk_size : int, optional
+        The number of scenarios calculated and written at a time, by default EXPORT_CHUNK_SIZE.
+    **scenario_ranges
+        The ranges of the scenario grid and optionally govt_support_limit_nok, as for
+        iter_monthly_price_calculator_scenarios.
+
+    Returns
+    -------
+    int
+        The number of scenarios written.
+
+    Examples
+    --------
+    >>> export_scenarios(
+    ...     "scenarios.parquet", "parquet",
+    ...     houseprice_range=np.arange(3000000, 5000000, 100000),
+    ...     interest_rate_range=np.arange(0.01, 0.06, 0.0025),
+    ...     fixed_cost_house_range=[5000], kwh_usage_range=[500], kwh_price_range=[1.5],
+    ...     markup_nok_range=[0.1], fixed_cost_electricity_range=[39],
+    ...     ammortisation_periods_range=[360], person_a_fixed_costs_range=[10000],
+    ...     person_b_fixed_costs_range=[10000], transaction_costs_range=[200000],
+    ...     ek_range=np.arange(1000000, 2000000, 50000), ownership_fraq_range=[0.3, 0.5, 0.7],
+    ... )
+    24000
+    """
+    if export_format not in EXPORT_WRITERS:
+        raise ValueError(f"Unknown export format {export_format}, expected one of {list(EXPORT_WRITERS)}")
+
+    n_rows = 0
+
+    def counted(chunks):
+        nonlocal n_rows
+        for chunk in chunks:
+            n_rows += len(chunk)
+            yield chunk
+
+    EXPORT_WRITERS[export_format](
+        counted(iter_monthly_price_calculator_scenarios(**scenario_ranges, chunk_size=chunk_size)),
+        file,
+        empty=empty_scenario_frame(scenario_ranges),
+    )
+    return n_rows
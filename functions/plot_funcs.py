@@ -6,22 +6,312 @@ Created on Mon Sep  2 2024
 """
 
 import plotly.graph_objects as go
-import plotly.express as px
+import plotly.io as pio
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import os
 import sys
+import threading
 
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from classes.scenario_cache import ScenarioCache  # noqa: E402
+from functions.cache_funcs import normalize_cache_key  # noqa: E402
 from functions.calc_funcs import loan_calc  # noqa: E402
 
 
 # Set the default theme for all charts
 template = 'seaborn'
 
-def create_interest_rate_sensitivity_chart(loan_amount: float, periods: int, interest_rate_range: tuple[float, float]) -> go.Figure:
+# Maximum number of threads used by build_figures, capped by the number of CPUs
+FIGURE_BUILDER_THREADS = min(6, os.cpu_count() or 1)
+
+_figure_executor = None
+_figure_executor_lock = threading.Lock()
+
+
+def _get_figure_executor() -> ThreadPoolExecutor:
+   """Return the thread pool shared by all calls to build_figures, creating it on first use."""
+   global _figure_executor
+   with _figure_executor_lock:
+      if _figure_executor is None:
+         _figure_executor = ThreadPoolExecutor(
+            max_workers=FIGURE_BUILDER_THREADS, thread_name_prefix="figure_builder"
+         )
+   return _figure_executor
+
+
+def figure_cache_key(function, args: tuple, kwargs: dict) -> tuple:
+   """
+   Return the key of a figure in a figure cache: the name of the figure function and a
+   fingerprint of its arguments, with arrays and DataFrames identified by digests of
+   their contents.
+   """
+   return (
+      f"{function.__module__}.{function.__qualname__}",
+      normalize_cache_key(tuple(args)),
+      normalize_cache_key(dict(kwargs)),
+   )
+
+
+def figure_from_json(figure_json: str) -> go.Figure:
+   """Return the figure serialized in figure_json by Figure.to_json."""
+   # The figures come from the disk tier and other sessions, so they are validated again
+   return pio.from_json(figure_json, skip_invalid=False)
+
+def _figures_to_json(figures):
+   """Serialize a figure, or a dict of figures by name, with Figure.to_json."""
+   if isinstance(figures, dict):
+      return {name: fig.to_json() for name, fig in figures.items()}
+   return figures.to_json()
+
+def _figures_from_json(figures_json):
+   """Rebuild a figure, or a dict of figures by name, serialized by _figures_to_json."""
+   if isinstance(figures_json, dict):
+      return {name: figure_from_json(figure_json) for name, figure_json in figures_json.items()}
+   return figure_from_json(figures_json)
+
+
+def build_figures(figure_specs: dict[str, tuple], as_json: bool = False,
+                  cache: ScenarioCache | None = None) -> dict:
+   """
+   Build independent figures concurrently in a shared thread pool.
+
+   Each figure is built, and optionally serialized to JSON, in its own task, so a batch
+   of figures takes roughly as long as the slowest of them where the work runs in
+   parallel. With a single CPU the figures are built one by one in the calling thread,
+   as threads only add overhead there.
+
+   Parameters
+   ----------
+   figure_specs : dict[str, tuple]
+       The figures to build, by name, as (function, args) or (function, args, kwargs)
+       tuples of a figure function and its arguments. A function may also return a dict
+       of figures by name, e.g. create_cost_breakdown_sunbursts, which is then returned
+       as a dict.
+   as_json : bool, optional
+       Whether to return the figures serialized with Figure.to_json, by default False.
+   cache : ScenarioCache, optional
+       A cache of serialized figures, e.g. cache_resources.get_figure_cache(). Figures whose
+       function and arguments are cached are rebuilt from their JSON instead of built
+       from scratch, and new figures are added to it. By default None, no caching.
+
+   Returns
+   -------
+   dict
+       The figures, or their JSON, by name in the order of figure_specs.
+
+   Examples
+   --------
+   >>> figures = build_figures({
+   ...     "amortization_a": (create_amortization_chart, (schedule_a, "Person A")),
+   ...     "amortization_b": (create_amortization_chart, (schedule_b, "Person B")),
+   ...     "sunbursts": (create_cost_breakdown_sunbursts, (df,)),
+   ... })
+   """
+   def build(spec):
+      function, args, *kwargs = spec
+      kwargs = kwargs[0] if kwargs else {}
+      if cache is None:
+         figures = function(*args, **kwargs)
+         return _figures_to_json(figures) if as_json else figures
+
+      figures_json = cache.get_or_compute(
+         figure_cache_key(function, args, kwargs),
+         lambda: _figures_to_json(function(*args, **kwargs)),
+      )
+      return figures_json if as_json else _figures_from_json(figures_json)
+
+   if FIGURE_BUILDER_THREADS < 2 or len(figure_specs) < 2:
+      return {name: build(spec) for name, spec in figure_specs.items()}
+
+   executor = _get_figure_executor()
+   futures = {name: executor.submit(build, spec) for name, spec in figure_specs.items()}
+   return {name: future.result() for name, future in futures.items()}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+   """
+   Select the points of a series to keep with the largest-triangle-three-buckets algorithm.
+
+   The first and last points are kept, and the points in between are split into
+   max_points - 2 buckets. From each bucket the point is kept that forms the largest
+   triangle with the point kept from the previous bucket and the mean of the next
+   bucket, which preserves the peaks and overall shape of the series.
+
+   Parameters
+   ----------
+   x : np.ndarray
+       The x values of the series, in increasing order.
+   y : np.ndarray
+       The y values of the series.
+   max_points : int
+       The maximum number of points to keep, at least 3.
+
+   Returns
+   -------
+   np.ndarray
+       The indices of the points to keep, in increasing order.
+   """
+   x = np.asarray(x, dtype=np.float64)
+   y = np.asarray(y, dtype=np.float64)
+   n = len(x)
+   if max_points < 3:
+      raise ValueError("max_points must be at least 3")
+   if n <= max_points:
+      return np.arange(n)
+
+   # Bucket i holds the points edges[i]:edges[i + 1], and the last point is its own bucket
+   edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+   edges = np.append(edges, n)
+
+   # The mean of every bucket, from cumulative sums
+   cum_x = np.concatenate(([0.0], np.cumsum(x)))
+   cum_y = np.concatenate(([0.0], np.cumsum(y)))
+   sizes = np.diff(edges)
+   mean_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / sizes
+   mean_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / sizes
+
+   indices = np.empty(max_points, dtype=np.int64)
+   indices[0], indices[-1] = 0, n - 1
+   selected = 0
+   for bucket in range(max_points - 2):
+      start, stop = edges[bucket], edges[bucket + 1]
+      next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+      # Twice the area of the triangles, which does not change the largest one
+      areas = np.abs(
+         (x[selected] - next_x) * (y[start:stop] - y[selected])
+         - (x[selected] - x[start:stop]) * (next_y - y[selected])
+      )
+      selected = start + int(np.argmax(areas))
+      indices[bucket + 1] = selected
+   return indices
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+   """
+   Select the points of a series to keep by keeping the minimum and maximum of each bucket.
+
+   The first and last points are kept, and the series is split into (max_points - 2) // 2
+   buckets of consecutive points, of which the smallest and largest points are kept. This
+   keeps every extreme of the series, and is faster than lttb_indices on long series.
+
+   Parameters
+   ----------
+   y : np.ndarray
+       The y values of the series.
+   max_points : int
+       The maximum number of points to keep, at least 4.
+
+   Returns
+   -------
+   np.ndarray
+       The indices of the points to keep, in increasing order.
+   """
+   y = np.asarray(y, dtype=np.float64)
+   n = len(y)
+   if max_points < 4:
+      raise ValueError("max_points must be at least 4")
+   if n <= max_points:
+      return np.arange(n)
+
+   n_buckets = (max_points - 2) // 2
+   edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+   buckets = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+   # Sort the points by value within each bucket, so each bucket starts with its
+   # minimum and ends with its maximum
+   order = np.lexsort((y, buckets))
+   return np.unique(np.concatenate(([0, n - 1], order[edges[:-1]], order[edges[1:] - 1])))
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int | None,
+               method: str = 'lttb') -> tuple[np.ndarray, np.ndarray]:
+   """
+   Reduce a series to at most max_points points while preserving its shape.
+
+   Parameters
+   ----------
+   x : np.ndarray
+       The x values of the series, in increasing order.
+   y : np.ndarray
+       The y values of the series.
+   max_points : int or None
+       The maximum number of points to keep, e.g. the width of the chart in pixels.
+       None keeps every point.
+   method : str, optional
+       One of DOWNSAMPLING_METHODS: 'lttb' for lttb_indices or 'minmax' for
+       minmax_indices, by default 'lttb'.
+
+   Returns
+   -------
+   tuple[np.ndarray, np.ndarray]
+       The x and y values of the points kept.
+   """
+   x = np.asarray(x)
+   y = np.asarray(y)
+   if max_points is None or len(x) <= max_points:
+      return x, y
+
+   if method == 'lttb':
+      indices = lttb_indices(x, y, max_points)
+   elif method == 'minmax':
+      indices = minmax_indices(y, max_points)
+   else:
+      raise ValueError(f"Unknown downsampling method {method!r}, expected one of {DOWNSAMPLING_METHODS}")
+   return x[indices], y[indices]
+
+# Rendering modes of line charts: SVG go.Scatter, WebGL go.Scattergl, or chosen by point count
+RENDER_MODES = ('auto', 'svg', 'webgl')
+
+# Line charts with more points than this in total are rendered with WebGL in 'auto' mode
+WEBGL_POINT_THRESHOLD = 5000
+
+def scatter_trace_class(n_points: int, render_mode: str = 'auto') -> type:
+   """
+   Choose the trace class of a line chart from the number of points it plots.
+
+   SVG traces render slowly beyond a few thousand points, while WebGL traces stay fast
+   but are limited in number per page by the browser, so 'auto' only switches to WebGL
+   for charts with more than WEBGL_POINT_THRESHOLD points.
+
+   Parameters
+   ----------
+   n_points : int
+       The total number of points in the chart.
+   render_mode : str, optional
+       One of RENDER_MODES, by default 'auto'.
+
+   Returns
+   -------
+   type
+       go.Scatter or go.Scattergl.
+   """
+   if render_mode not in RENDER_MODES:
+      raise ValueError(f"Unknown render mode {render_mode!r}, expected one of {RENDER_MODES}")
+   if render_mode == 'webgl' or (render_mode == 'auto' and n_points > WEBGL_POINT_THRESHOLD):
+      return go.Scattergl
+   return go.Scatter
+
+def _line_traces(x, series: dict, max_points: int | None, render_mode: str, **kwargs) -> list:
+   """
+   Return a line trace per named y series, each reduced to max_points points with downsample.
+
+   All traces of a chart get the same class from scatter_trace_class, so they are drawn
+   in the same layer.
+   """
+   downsampled = {name: downsample(x, y, max_points) for name, y in series.items()}
+   trace_class = scatter_trace_class(sum(len(y) for _, y in downsampled.values()), render_mode)
+   return [trace_class(x=x, y=y, name=name, **kwargs) for name, (x, y) in downsampled.items()]
+
+
+def create_interest_rate_sensitivity_chart(loan_amount: float, periods: int, interest_rate_range: tuple[float, float],
+                                           title: str = 'Rentesensitivitetsanalyse',
+                                           max_points: int | None = None,
+                                           render_mode: str = 'auto') -> go.Figure:
    """
    Create a line chart that shows the monthly payment for a loan based on a range of interest rates.
 
@@ -33,6 +323,12 @@ def create_interest_rate_sensitivity_chart(loan_amount: float, periods: int, int
        The number of months the loan will be amortized over.
    interest_rate_range : tuple[float, float]
        The range of interest rates to include in the chart.
+   title : str, optional
+       The title of the chart, by default 'Rentesensitivitetsanalyse'.
+   max_points : int, optional
+       The maximum number of points to plot, see downsample. By default None, every rate.
+   render_mode : str, optional
+       One of RENDER_MODES, see scatter_trace_class, by default 'auto'.
 
    Returns
    -------
@@ -41,15 +337,18 @@ def create_interest_rate_sensitivity_chart(loan_amount: float, periods: int, int
    """
    interest_rates = np.arange(interest_rate_range[0], interest_rate_range[1] + 0.1, 0.25)
    monthly_payments = loan_calc(loan_amount, interest_rates/100, periods)
+   interest_rates, monthly_payments = downsample(interest_rates, monthly_payments, max_points)
   
+   trace_class = scatter_trace_class(len(interest_rates), render_mode)
+
    fig = go.Figure()
-   fig.add_trace(go.Scatter(
+   fig.add_trace(trace_class(
        x=interest_rates,
        y=monthly_payments,
        mode='lines+markers',
    ))
    fig.update_layout(
-       title='Rentesensitivitetsanalyse',
+       title=title,
        xaxis_title='Rentesats (%)',
        yaxis_title='Månedlig betaling (NOK)',
        hovermode='x unified',
@@ -58,6 +357,113 @@ def create_interest_rate_sensitivity_chart(loan_amount: float, periods: int, int
    )
    return fig
 
+# Subcategories of each category in the cost breakdown sunburst, in display order
+COST_BREAKDOWN_CATEGORIES = {
+   'Boligkostnader': ['Lånebetaling', 'Faste boligkostnader', 'Strøm'],
+   'Personlige kostnader': ['Andre faste kostnader'],
+}
+
+# The ids, labels and parents of the sunburst sectors: the subcategories followed by the categories
+_SUNBURST_LABELS = [sub for subs in COST_BREAKDOWN_CATEGORIES.values() for sub in subs] + list(COST_BREAKDOWN_CATEGORIES)
+_SUNBURST_PARENTS = [cat for cat, subs in COST_BREAKDOWN_CATEGORIES.items() for _ in subs] + [''] * len(COST_BREAKDOWN_CATEGORIES)
+_SUNBURST_IDS = [f"{parent}/{label}" if parent else label for label, parent in zip(_SUNBURST_LABELS, _SUNBURST_PARENTS)]
+
+
+def cost_breakdown_values(df: pd.DataFrame) -> dict[str, np.ndarray]:
+   """
+   Calculate the values of the cost breakdown sunburst sectors of both persons.
+
+   The house and electricity costs are split equally, while the loan payment is split
+   by ownership. The values are ordered as the ids of the sunburst sectors, with the
+   subcategories first and the totals of the categories last.
+
+   Parameters
+   ----------
+   df : pd.DataFrame
+       The DataFrame containing the scenario, of which the first row is used.
+
+   Returns
+   -------
+   dict[str, np.ndarray]
+       The sector values of person 'A' and 'B'.
+   """
+   def first(column):
+      return df[column].iloc[0]
+
+   ownership = np.array([first('ownership_fraq'), 1 - first('ownership_fraq')])
+   n_persons = len(ownership)
+
+   # One row of subcategory values per person
+   subcategories = np.column_stack([
+      first('monthly_loan_payment') * ownership,
+      np.full(n_persons, first('fixed_cost_house') / 2),  # Assuming equal split
+      np.full(n_persons, first('el_cost') / 2),  # Assuming equal split
+      [first('person_a_fixed_costs'), first('person_b_fixed_costs')],
+   ])
+
+   # Sum the subcategories of each category to get the category totals
+   bounds = np.cumsum([0] + [len(subs) for subs in COST_BREAKDOWN_CATEGORIES.values()])
+   categories = np.add.reduceat(subcategories, bounds[:-1], axis=1)
+
+   values = np.hstack([subcategories, categories])
+   return {'A': values[0], 'B': values[1]}
+
+
+def create_cost_breakdown_sunbursts(df: pd.DataFrame, persons: tuple[str, ...] = ('A', 'B')) -> dict[str, go.Figure]:
+   """
+   Create Plotly Sunburst charts that show the breakdown of monthly costs for both persons.
+
+   The sectors are built directly with go.Sunburst from the values of cost_breakdown_values,
+   which are calculated for both persons at once.
+
+   Parameters
+   ----------
+   df : pd.DataFrame
+       The DataFrame containing the relevant data for the cost breakdown.
+   persons : tuple[str, ...], optional
+       The persons to create charts for, by default ('A', 'B').
+
+   Returns
+   -------
+   dict[str, go.Figure]
+       A Plotly figure object representing the cost breakdown sunburst chart of each person.
+   """
+   values = cost_breakdown_values(df)
+
+   # Each subcategory has its own color, as does a category with several subcategories,
+   # while a category with one subcategory has the color of that subcategory
+   colorway = pio.templates[template].layout.colorway
+   n_subcategories = len(_SUNBURST_LABELS) - len(COST_BREAKDOWN_CATEGORIES)
+   colors = list(colorway[:n_subcategories])
+   for subs in COST_BREAKDOWN_CATEGORIES.values():
+      if len(subs) == 1:
+         colors.append(colors[_SUNBURST_LABELS.index(subs[0])])
+      else:
+         colors.append(colorway[len(colors) % len(colorway)])
+
+   figures = {}
+   for person in persons:
+      fig = go.Figure(go.Sunburst(
+         ids=_SUNBURST_IDS,
+         labels=_SUNBURST_LABELS,
+         parents=_SUNBURST_PARENTS,
+         values=values['A' if person == 'A' else 'B'],
+         branchvalues='total',
+         marker=dict(colors=colors),
+         textinfo='label+value+percent parent',
+         hovertemplate='<b>%{label}</b><br>Beløp: kr %{value:.2f}<br>Andel: %{percentParent:.1%}<extra></extra>',
+      ))
+      fig.update_layout(
+         title="Kostnadsfordeling",
+         template=template,
+         height=600,
+         width=600,
+         margin=dict(t=30, l=0, r=0, b=0)
+      )
+      figures[person] = fig
+
+   return figures
+
 def create_cost_breakdown_sunburst(df: pd.DataFrame, person: str) -> go.Figure:
    """
    Create a Plotly Sunburst chart that shows the breakdown of monthly costs for a given person.
@@ -74,90 +480,174 @@ def create_cost_breakdown_sunburst(df: pd.DataFrame, person: str) -> go.Figure:
    go.Figure
        A Plotly figure object representing the cost breakdown sunburst chart.
    """
-   if person == 'A':
-       loan_payment = df['monthly_loan_payment'] * df['ownership_fraq']
-       fixed_costs = df['person_a_fixed_costs']
-   else:
-       loan_payment = df['monthly_loan_payment'] * (1 - df['ownership_fraq'])
-       fixed_costs = df['person_b_fixed_costs']
-  
-   sunburst_data = pd.DataFrame({
-       'kategori': ['Boligkostnader', 'Boligkostnader', 'Boligkostnader', 'Personlige kostnader'],
-       'underkategori': ['Lånebetaling', 'Faste boligkostnader', 'Strøm', 'Andre faste kostnader'],
-       'verdi': [
-           loan_payment.iloc[0],
-           df['fixed_cost_house'].iloc[0] / 2,  # Assuming equal split
-           df['el_cost'].iloc[0] / 2,  # Assuming equal split
-           fixed_costs.iloc[0]
-       ]
-   })
-  
-   # Sort the dataframe so that 'Boligkostnader' come first
-   sunburst_data['sort_order'] = sunburst_data['kategori'].map({'Boligkostnader': 0, 'Personlige kostnader': 1})
-   sunburst_data = sunburst_data.sort_values('sort_order')
-  
-   fig = px.sunburst(
-       sunburst_data,
-       path=['kategori', 'underkategori'],
-       values='verdi',
-       color='underkategori',
-       title="Kostnadsfordeling",
-       template=template
-   )
-   fig.update_traces(textinfo='label+value+percent parent')
-   fig.update_layout(
-       height=600,
-       width=600,
-       margin=dict(t=30, l=0, r=0, b=0)
-   )
-   
-   fig.update_traces(
-       hovertemplate='<b>%{label}</b><br>Beløp: kr %{value:.2f}<br>Andel: %{percentParent:.1%}<extra></extra>'
-   )
-   
-   return fig
+   return create_cost_breakdown_sunbursts(df, (person,))[person]
+
+# Keyword arguments of create_amortization_chart_optimized and the schedule columns they are taken from
+AMORTIZATION_CHART_COLUMNS = {
+   'months': 'Month',
+   'remaining_balance': 'Remaining Balance',
+   'principal': 'Principal',
+   'interest': 'Interest',
+   'total_paid': 'Total Paid',
+}
 
-def create_amortization_chart(schedule: pd.DataFrame, title: str) -> go.Figure:
+def amortization_chart_arrays(schedule: pd.DataFrame) -> dict[str, np.ndarray]:
    """
-   Create a Plotly line chart that shows the amortization schedule for a loan.
+   Take the arrays of create_amortization_chart_optimized from an amortization schedule.
 
    Parameters
    ----------
    schedule : pd.DataFrame
-       The DataFrame containing the amortization schedule data.
+       The amortization schedule, e.g. from calculate_amortization_schedule, with every
+       column in AMORTIZATION_CHART_COLUMNS.
+
+   Returns
+   -------
+   dict[str, np.ndarray]
+       The columns of the schedule by keyword argument of create_amortization_chart_optimized.
+   """
+   missing = [column for column in AMORTIZATION_CHART_COLUMNS.values() if column not in schedule]
+   if missing:
+      raise KeyError(f"The amortization schedule is missing the columns {missing}")
+
+   return {name: schedule[column].to_numpy() for name, column in AMORTIZATION_CHART_COLUMNS.items()}
+
+def create_amortization_chart_optimized(months: np.ndarray, remaining_balance: np.ndarray,
+                                        principal: np.ndarray, interest: np.ndarray,
+                                        total_paid: np.ndarray, title: str,
+                                        max_points: int | None = None,
+                                        render_mode: str = 'auto') -> go.Figure:
+   """
+   Create a Plotly line chart that shows the amortization schedule for a loan from NumPy arrays.
+
+   The principal and interest are plotted as given, so they must already be cumulative,
+   as in calculate_amortization_schedule and amortization_schedule_arrays. The figure
+   is built with all of its traces and layout in a single call.
+
+   Parameters
+   ----------
+   months : np.ndarray
+       The month of each row of the schedule.
+   remaining_balance : np.ndarray
+       The remaining balance of the loan after each month.
+   principal : np.ndarray
+       The cumulative principal paid up to each month.
+   interest : np.ndarray
+       The cumulative interest paid up to each month.
+   total_paid : np.ndarray
+       The cumulative total paid up to each month.
    title : str
        The title to be displayed on the chart.
+   max_points : int, optional
+       The maximum number of points to plot per trace, see downsample. By default None,
+       every month.
+   render_mode : str, optional
+       One of RENDER_MODES, see scatter_trace_class, by default 'auto'.
 
    Returns
    -------
    go.Figure
        A Plotly figure object representing the amortization chart.
+
+   Examples
+   --------
+   >>> schedule = amortization_schedule_array(200000, 0.05, 360)
+   >>> principal, interest, remaining_balance, total_paid = schedule.T
+   >>> fig = create_amortization_chart_optimized(
+   ...     np.arange(len(schedule)), remaining_balance, principal, interest, total_paid, "Lån"
+   ... )
    """
-   
-   fig = go.Figure()
+   series = {
+      "Gjenstående saldo": remaining_balance,
+      "Kumulativt avdrag": principal,
+      "Kumulative renter": interest,
+      "Kumulativ total": total_paid,
+   }
 
-   fig.add_trace(
-       go.Scatter(x=schedule['Month'], y=schedule['Remaining Balance'], name="Gjenstående saldo")
-   )
-   fig.add_trace(
-       go.Scatter(x=schedule['Month'], y=schedule['Principal'], name="Kumulativt avdrag")
+   return go.Figure(
+      data=_line_traces(months, series, max_points, render_mode),
+      layout=dict(
+         title=dict(text=title),
+         xaxis=dict(title=dict(text="Måned")),
+         yaxis=dict(title=dict(text="Beløp (NOK)")),
+         legend=dict(x=0, y=1, traceorder="normal"),
+         template=template,
+         hovermode="x unified"
+      ),
    )
-   fig.add_trace(
-       go.Scatter(x=schedule['Month'], y=schedule['Interest'], name="Kumulative renter")
-   )
-   
-   fig.add_trace(
-       go.Scatter(x=schedule['Month'], y=schedule['Total Paid'], name="Kumulativ total")
+
+def create_amortization_chart(schedule: pd.DataFrame, title: str, max_points: int | None = None,
+                              render_mode: str = 'auto') -> go.Figure:
+   """
+   Create a Plotly line chart that shows the amortization schedule for a loan.
+
+   Parameters
+   ----------
+   schedule : pd.DataFrame
+       The DataFrame containing the amortization schedule data, with every column in
+       AMORTIZATION_CHART_COLUMNS.
+   title : str
+       The title to be displayed on the chart.
+   max_points : int, optional
+       The maximum number of points to plot per trace, see downsample. By default None,
+       every month.
+   render_mode : str, optional
+       One of RENDER_MODES, see scatter_trace_class, by default 'auto'.
+
+   Returns
+   -------
+   go.Figure
+       A Plotly figure object representing the amortization chart.
+   """
+   return create_amortization_chart_optimized(
+      **amortization_chart_arrays(schedule),
+      title=title,
+      max_points=max_points,
+      render_mode=render_mode,
    )
 
+def create_scenario_lines_chart(x: np.ndarray, series: dict[str, np.ndarray], title: str,
+                                x_axis_title: str, y_axis_title: str,
+                                max_points: int | None = None,
+                                render_mode: str = 'auto') -> go.Figure:
+   """
+   Create a Plotly line chart that overlays one line per scenario, e.g. the remaining
+   balance of many loans from calculate_amortization_schedules.
+
+   Charts with many scenarios are rendered with WebGL, see scatter_trace_class.
+
+   Parameters
+   ----------
+   x : np.ndarray
+       The x values shared by all scenarios.
+   series : dict[str, np.ndarray]
+       The y values of each scenario, by the name shown in the legend.
+   title : str
+       The title to be displayed on the chart.
+   x_axis_title : str
+       The title to be displayed on the x-axis.
+   y_axis_title : str
+       The title to be displayed on the y-axis.
+   max_points : int, optional
+       The maximum number of points to plot per scenario, see downsample. By default
+       None, every point.
+   render_mode : str, optional
+       One of RENDER_MODES, see scatter_trace_class, by default 'auto'.
+
+   Returns
+   -------
+   go.Figure
+       A Plotly figure object representing the scenario lines chart.
+   """
+   fig = go.Figure()
+   fig.add_traces(_line_traces(x, series, max_points, render_mode, mode='lines'))
    fig.update_layout(
        title=title,
-       xaxis_title="Måned",
-       yaxis_title="Beløp (NOK)",
-       legend=dict(x=0, y=1, traceorder="normal"),
+       xaxis_title=x_axis_title,
+       yaxis_title=y_axis_title,
+       hovermode='x unified',
        template=template
    )
-
    return fig
 
 def create_heatmap_divergent_hover(df: pd.DataFrame, x_column: str, y_column: str, z_column: str, 
@@ -194,20 +684,63 @@ def create_heatmap_divergent_hover(df: pd.DataFrame, x_column: str, y_column: st
    """
    # Pivot the dataframe
    pivot_df = df.pivot(index=y_column, columns=x_column, values=z_column)
-   
+
+   return create_surface_heatmap(
+       pivot_df.values,
+       x=pivot_df.columns,
+       y=pivot_df.index,
+       title=title,
+       x_axis_title=x_axis_title,
+       y_axis_title=y_axis_title,
+       colorbar_title=colorbar_title,
+   )
+
+def create_surface_heatmap(z: np.ndarray, x: np.ndarray, y: np.ndarray,
+                           title: str = 'Heatmap',
+                           x_axis_title: str = 'X Axis',
+                           y_axis_title: str = 'Y Axis',
+                           colorbar_title: str = 'Value') -> go.Figure:
+   """
+   Create a Plotly Heatmap chart with a divergent color scale from a 2-D array of values.
+
+   Use this instead of create_heatmap_divergent_hover when the values are already laid
+   out as a grid, as it skips the pivot of the long-form DataFrame.
+
+   Parameters
+   ----------
+   z : np.ndarray
+       The 2-D array of values, with one row per y value and one column per x value.
+   x : np.ndarray
+       The x-axis values along the columns of z.
+   y : np.ndarray
+       The y-axis values along the rows of z.
+   title : str, optional
+       The title to be displayed on the chart, by default 'Heatmap'.
+   x_axis_title : str, optional
+       The title to be displayed on the x-axis, by default 'X Axis'.
+   y_axis_title : str, optional
+       The title to be displayed on the y-axis, by default 'Y Axis'.
+   colorbar_title : str, optional
+       The title to be displayed on the color bar, by default 'Value'.
+
+   Returns
+   -------
+   go.Figure
+       A Plotly figure object representing the heatmap chart.
+   """
    # Calculate the median for the divergent color scale
-   median_value = np.median(pivot_df.values)
+   median_value = np.median(z)
    
    # Create the heatmap
    fig = go.Figure(data=go.Heatmap(
-       z=pivot_df.values,
-       x=pivot_df.columns,
-       y=pivot_df.index,
+       z=z,
+       x=x,
+       y=y,
        colorscale='turbo',
        colorbar=dict(title=colorbar_title),
        zmid=median_value,
-       zmin=df[z_column].min(),
-       zmax=df[z_column].max(),
+       zmin=np.nanmin(z),
+       zmax=np.nanmax(z),
        hovertemplate=(
            f"<b>{x_axis_title}</b>: %{{x:.2f}}<br>"
            f"<b>{y_axis_title}</b>: %{{y}}<br>"
@@ -228,45 +761,3 @@ def create_heatmap_divergent_hover(df: pd.DataFrame, x_column: str, y_column: st
    )
 
    return fig
-
-
-def create_amortization_chart_optimized(schedule: pd.DataFrame, title: str) -> go.Figure:
-    """
-    Create an optimized amortization chart using Plotly.
-
-    Args:
-    schedule (Dict[str, Any]): A dictionary containing the amortization schedule data.
-    title (str): The title of the chart.
-
-    Returns:
-    go.Figure: A Plotly figure object representing the amortization chart.
-    """
-    # Convert schedule data to numpy arrays for faster operations
-    months = np.array(schedule['Month'])
-    remaining_balance = np.array(schedule['Remaining Balance'])
-    principal = np.array(schedule['Principal'])
-    interest = np.array(schedule['Interest'])
-
-    # Pre-compute cumulative sums
-    cumulative_principal = np.cumsum(principal)
-    cumulative_interest = np.cumsum(interest)
-
-    # Create figure with all traces at once
-    fig = go.Figure()
-    fig.add_traces([
-        go.Scatter(x=months, y=remaining_balance, name="Gjenstående saldo"),
-        go.Scatter(x=months, y=cumulative_principal, name="Kumulativt avdrag"),
-        go.Scatter(x=months, y=cumulative_interest, name="Kumulative renter")
-    ])
-
-    # Set layout parameters all at once
-    fig.update_layout(
-        title=title,
-        xaxis_title="Måned",
-        yaxis_title="Beløp (NOK)",
-        legend=dict(x=0, y=1, traceorder="normal"),
-        template=template,  # Assuming you're using a template
-        hovermode="x unified"
-    )
-
-    return fig
\ No newline at end of file
@@ -0,0 +1,110 @@
+import json
+
+import pandas as pd
+import numpy as np
+
+from pathlib import Path
+
+
+# Name of the file listing the precomputed tables and their cache keys
+MANIFEST_NAME = "manifest.json"
+
+
+def _key_from_json(value):
+    """Convert the lists of a cache key loaded from JSON back to tuples."""
+    if isinstance(value, list):
+        return tuple(_key_from_json(item) for item in value)
+    return value
+
+
+def _save_value(value, directory: Path, name: str) -> dict:
+    """Save a cached value as .npy files and return its manifest entry."""
+    if isinstance(value, pd.DataFrame):
+        arrays = [value[column].to_numpy() for column in value.columns]
+        entry = dict(kind="frame", columns=list(value.columns))
+    elif isinstance(value, np.ndarray):
+        arrays = [value]
+        entry = dict(kind="array")
+    elif isinstance(value, tuple) and all(isinstance(item, np.ndarray) for item in value):
+        arrays = list(value)
+        entry = dict(kind="tuple")
+    else:
+        raise TypeError(f"Cannot precompute values of type {type(value).__name__}")
+
+    entry["files"] = []
+    for i, array in enumerate(arrays):
+        if array.dtype == object:
+            raise TypeError(f"Cannot save {name} array {i} with object dtype as .npy")
+        file = f"{name}_{i}.npy"
+        np.save(directory / file, array, allow_pickle=False)
+        entry["files"].append(file)
+    return entry
+
+
+def _load_value(entry: dict, directory: Path):
+    """Load a value saved by _save_value, memory mapping its arrays."""
+    arrays = [np.load(directory / file, mmap_mode="r") for file in entry["files"]]
+    if entry["kind"] == "frame":
+        return pd.DataFrame(dict(zip(entry["columns"], arrays)), copy=False)
+    if entry["kind"] == "array":
+        return arrays[0]
+    return tuple(arrays)
+
+
+def save_precomputed_tables(tables: list[tuple], directory: str | Path) -> Path:
+    """
+    Save precomputed results as .npy files, with a manifest mapping their cache keys to the files.
+
+    Parameters
+    ----------
+    tables : list[tuple]
+        The (cache key, value) pairs to save. Values can be DataFrames with numeric
+        columns, arrays or tuples of arrays, and keys must be normalized cache keys, see
+        normalize_cache_key.
+    directory : str or Path
+        The directory to save the tables in. Existing tables are replaced.
+
+    Returns
+    -------
+    Path
+        The path of the manifest.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.npy"):
+        path.unlink()
+
+    entries = [
+        dict(key=key, **_save_value(value, directory, f"table_{i}"))
+        for i, (key, value) in enumerate(tables)
+    ]
+
+    manifest = directory / MANIFEST_NAME
+    manifest.write_text(json.dumps(dict(tables=entries), indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifest
+
+
+def load_precomputed_tables(directory: str | Path) -> list[tuple]:
+    """
+    Load the tables saved by save_precomputed_tables.
+
+    Arrays are memory mapped read-only, so loading is cheap and the data is only read
+    from disk when used. DataFrames are assembled from their memory-mapped columns.
+
+    Parameters
+    ----------
+    directory : str or Path
+        The directory the tables were saved in.
+
+    Returns
+    -------
+    list[tuple]
+        The (cache key, value) pairs, or an empty list if the directory has no manifest.
+    """
+    directory = Path(directory)
+    manifest = directory / MANIFEST_NAME
+    if not manifest.exists():
+        return []
+
+    entries = json.loads(manifest.read_text(encoding="utf-8"))["tables"]
+    return [(_key_from_json(entry["key"]), _load_value(entry, directory)) for entry in entries]
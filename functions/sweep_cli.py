@@ -0,0 +1,287 @@
+"""
+Command-line entry point for running scenario sweeps without the Streamlit app.
+
+The sweep is described by a TOML spec in the same shape as variables.toml. Each input
+is read from the section and key prefix it has in variables.toml, e.g. the house prices
+from HOUSEPRICE_* in [house_price], and can be given as
+
+- a list of values, e.g. ``EK_VALUES = [1000000, 1500000]``,
+- an inclusive grid, e.g. ``HOUSEPRICE_MIN``, ``HOUSEPRICE_MAX`` and ``HOUSEPRICE_STEP``,
+- a single value or [min, max] pair in ``*_DEFAULT``, where a pair is expanded to an
+  inclusive grid with ``*_STEP``.
+
+Inputs that are not in the spec are taken from the defaults in variables.toml. As in
+variables.toml, interest rates and ownership fractions are given in percent. The
+optional [sweep] section sets OUTPUT, FORMAT, WORKERS and PARTITION_SIZE.
+
+The grid is split into partitions of consecutive scenarios, which are calculated in a
+process pool and written to the output in grid order as they complete:
+
+    python -m functions.sweep_cli sweep.toml --output sweep.parquet --workers 8
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+import numpy as np
+import toml
+
+from pathlib import Path
+import sys
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from functions.calc_funcs import iter_monthly_price_calculator_scenarios  # noqa: E402
+from functions.export_funcs import EXPORT_FORMATS, EXPORT_WRITERS, empty_scenario_frame  # noqa: E402
+
+
+# Section, key prefix and unit divisor in variables.toml of each scenario range
+SWEEP_INPUTS = {
+    "houseprice_range": ("house_price", "HOUSEPRICE", 1),
+    "interest_rate_range": ("interest_rate", "INTEREST_RATE", 100),
+    "fixed_cost_house_range": ("fixed_costs", "FIXED_COST_HOUSE", 1),
+    "kwh_usage_range": ("electricity", "KWH_USAGE_RANGE", 1),
+    "kwh_price_range": ("electricity", "KWH_PRICE_RANGE", 1),
+    "markup_nok_range": ("electricity", "MARKUP_NOK", 1),
+    "fixed_cost_electricity_range": ("electricity", "FIXED_COST_ELECTRICITY", 1),
+    "ammortisation_periods_range": ("loan", "AMMORTISATION_PERIOD", 1),
+    "person_a_fixed_costs_range": ("fixed_costs", "PERSON_A_FIXED_COSTS", 1),
+    "person_b_fixed_costs_range": ("fixed_costs", "PERSON_B_FIXED_COSTS", 1),
+    "transaction_costs_range": ("transaction_costs", "TRANSACTION_COSTS", 1),
+    "ek_range": ("loan", "EK", 1),
+    "ownership_fraq_range": ("ownership", "OWNERSHIP_FRAQ", 100),
+}
+
+DEFAULT_PARTITION_SIZE = 100_000
+
+
+def _inclusive_grid(lower: float, upper: float, step: float) -> np.ndarray:
+    """Return the values from lower to upper, both included, in steps of step."""
+    if step <= 0:
+        raise ValueError(f"Step must be positive, got {step}")
+    n_steps = int(np.floor((upper - lower) / step + 1e-9))
+    return lower + step * np.arange(n_steps + 1)
+
+
+def _sweep_values(spec_section: dict, defaults_section: dict, prefix: str) -> np.ndarray:
+    """Return the values of one input from its spec section, falling back to the defaults."""
+    if f"{prefix}_VALUES" in spec_section:
+        return np.asarray(spec_section[f"{prefix}_VALUES"])
+
+    if all(f"{prefix}_{key}" in spec_section for key in ("MIN", "MAX", "STEP")):
+        return _inclusive_grid(
+            spec_section[f"{prefix}_MIN"],
+            spec_section[f"{prefix}_MAX"],
+            spec_section[f"{prefix}_STEP"],
+        )
+
+    section = {**defaults_section, **spec_section}
+    if f"{prefix}_DEFAULT" not in section:
+        raise KeyError(f"No values, grid or default given for {prefix}")
+
+    default = section[f"{prefix}_DEFAULT"]
+    if isinstance(default, list):
+        if len(default) != 2 or f"{prefix}_STEP" not in section:
+            raise ValueError(f"{prefix}_DEFAULT must be a single value or a [min, max] pair with a {prefix}_STEP")
+        return _inclusive_grid(default[0], default[1], section[f"{prefix}_STEP"])
+    return np.asarray([default])
+
+
+def load_sweep_spec(spec: dict, defaults: dict | None = None) -> dict:
+    """
+    Converts a sweep spec to the keyword arguments of iter_monthly_price_calculator_scenarios.
+
+    Parameters
+    ----------
+    spec : dict
+        The parsed TOML spec, in the shape of variables.toml.
+    defaults : dict, optional
+        The variables to take inputs missing from the spec from, by default variables.toml.
+
+    Returns
+    -------
+    dict
+        The scenario ranges, with interest rates and ownership fractions as decimals, and
+        govt_support_limit_nok if given as GOVT_SUPPORT_LIMIT_NOK in [electricity].
+    """
+    if defaults is None:
+        defaults = toml.load(project_root.joinpath("variables.toml"))
+
+    scenario_ranges = {}
+    for name, (section, prefix, divisor) in SWEEP_INPUTS.items():
+        values = _sweep_values(spec.get(section, {}), defaults.get(section, {}), prefix)
+        scenario_ranges[name] = values / divisor if divisor != 1 else values
+
+    if "GOVT_SUPPORT_LIMIT_NOK" in spec.get("electricity", {}):
+        scenario_ranges["govt_support_limit_nok"] = spec["electricity"]["GOVT_SUPPORT_LIMIT_NOK"]
+    return scenario_ranges
+
+
+def partition_grid(n_scenarios: int, partition_size: int) -> list[tuple[int, int]]:
+    """
+    Splits the flat positions of a scenario grid into consecutive (start, stop) partitions.
+
+    Parameters
+    ----------
+    n_scenarios : int
+        The number of scenarios in the grid.
+    partition_size : int
+        The maximum number of scenarios in a partition.
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        The partitions, in grid order.
+    """
+    if partition_size < 1:
+        raise ValueError("partition_size must be a positive integer")
+    return [
+        (start, min(start + partition_size, n_scenarios))
+        for start in range(0, n_scenarios, partition_size)
+    ]
+
+
+def evaluate_partition(scenario_ranges: dict, start: int, stop: int) -> pd.DataFrame:
+    """Calculate the scenarios at flat positions [start, stop) of the grid."""
+    return pd.concat(
+        iter_monthly_price_calculator_scenarios(
+            **scenario_ranges, chunk_size=max(stop - start, 1), start=start, stop=stop
+        )
+    )
+
+
+def _ordered_results(executor, scenario_ranges: dict, partitions: list, window: int):
+    """
+    Yield the results of the partitions in order, with at most window partitions in flight.
+
+    Bounding the partitions in flight keeps memory bounded when the workers calculate
+    faster than the results are written.
+    """
+    pending = deque()
+    for start, stop in partitions:
+        pending.append(executor.submit(evaluate_partition, scenario_ranges, start, stop))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_sweep(
+    scenario_ranges: dict,
+    output: str | Path,
+    export_format: str | None = None,
+    workers: int | None = None,
+    partition_size: int = DEFAULT_PARTITION_SIZE,
+) -> int:
+    """
+    Calculates a scenario sweep in a process pool and writes the results to a file.
+
+    Parameters
+    ----------
+    scenario_ranges : dict
+        The keyword arguments of iter_monthly_price_calculator_scenarios, see load_sweep_spec.
+    output : str or Path
+        The file to write the results to, in grid order and without an index.
+    export_format : str, optional
+        One of EXPORT_FORMATS, by default inferred from the suffix of output.
+    workers : int, optional
+        The number of worker processes, at least one, by default the number of CPUs. With
+        one worker the partitions are calculated in this process.
+    partition_size : int, optional
+        The number of scenarios calculated by a worker at a time, by default 100 000.
+
+    Returns
+    -------
+    int
+        The number of scenarios written.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    elif workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+
+    output = Path(output)
+    if export_format is None:
+        suffixes = {suffix: name for name, (_, suffix) in EXPORT_FORMATS.items()}
+        if output.suffix not in suffixes:
+            raise ValueError(f"Cannot infer the export format of {output}, give it explicitly")
+        export_format = suffixes[output.suffix]
+
+    n_scenarios = int(
+        np.prod(
+            [len(np.atleast_1d(scenario_ranges[name])) for name in SWEEP_INPUTS],
+            dtype=np.int64,
+        )
+    )
+    partitions = partition_grid(n_scenarios, partition_size)
+
+    n_rows = 0
+
+    def counted(results):
+        nonlocal n_rows
+        for result in results:
+            n_rows += len(result)
+            yield result
+
+    # Empty sweeps are written with the columns of the scenarios
+    empty = empty_scenario_frame(scenario_ranges)
+
+    # Write to a temporary file first, so a failed sweep does not leave a partial output
+    with tempfile.NamedTemporaryFile(dir=output.parent, suffix=".tmp", delete=False) as file:
+        try:
+            if workers == 1:
+                results = (evaluate_partition(scenario_ranges, start, stop) for start, stop in partitions)
+                EXPORT_WRITERS[export_format](counted(results), file, empty=empty)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = _ordered_results(executor, scenario_ranges, partitions, window=2 * workers)
+                    EXPORT_WRITERS[export_format](counted(results), file, empty=empty)
+        except BaseException:
+            file.close()
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, output)
+
+    return n_rows
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Run a scenario sweep described by a TOML spec.")
+    parser.add_argument("spec", type=Path, help="TOML spec in the shape of variables.toml")
+    parser.add_argument("--output", type=Path, help="output file, overrides OUTPUT in [sweep]")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), help="overrides FORMAT in [sweep]")
+    parser.add_argument("--workers", type=int, help="overrides WORKERS in [sweep]")
+    parser.add_argument("--partition-size", type=int, help="overrides PARTITION_SIZE in [sweep]")
+    args = parser.parse_args(argv)
+
+    spec = toml.load(args.spec)
+    settings = spec.get("sweep", {})
+    output = args.output or settings.get("OUTPUT")
+    if output is None:
+        parser.error("an output file must be given with --output or OUTPUT in [sweep]")
+
+    workers = args.workers if args.workers is not None else settings.get("WORKERS")
+    if workers is not None and workers < 1:
+        parser.error(f"the number of workers must be at least 1, got {workers}")
+
+    scenario_ranges = load_sweep_spec(spec)
+    start = time.perf_counter()
+    n_rows = run_sweep(
+        scenario_ranges,
+        output,
+        export_format=args.format or settings.get("FORMAT"),
+        workers=workers,
+        partition_size=args.partition_size or settings.get("PARTITION_SIZE", DEFAULT_PARTITION_SIZE),
+    )
+    print(f"Wrote {n_rows} scenarios to {output} in {time.perf_counter() - start:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
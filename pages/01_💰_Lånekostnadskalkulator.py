@@ -6,7 +6,7 @@ Created on Mon Sep  2 2024
 """
 
 import streamlit as st
-import numpy as np
+import toml
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -18,10 +18,10 @@ project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
 
-from functions.calc_funcs import (  # noqa: E402
-    loan_calc,
-    interest_rate_sensitivity,
-)
+from functions.cached_calcs import calculate_interest_rate_sensitivity  # noqa: E402
+
+# Load constants from variables.toml
+variables = toml.load(project_root.joinpath("variables.toml"))
 
 
 st.set_page_config(layout="centered")
@@ -37,50 +37,55 @@ st.write("""
 Husk: Selv små renteendringer kan ha stor effekt på lommeboken din! 💰
 """)
 
-# Cache functions that should be used
-loan_calc_cached = st.cache_data(loan_calc)  # noqa: F841
-interest_rate_sensitivity_cached = st.cache_data(interest_rate_sensitivity)
-
 # User inputs
 houseprice_nok = st.number_input(
-    "Hvor mye låner du?:", min_value=100000, value=2500000, step=100000
+    "Hvor mye låner du?:",
+    min_value=100000,
+    value=variables["loan_calculator"]["LOAN_AMOUNT_DEFAULT"],
+    step=100000,
 )
 interest_rate_min = st.number_input(
-    "Hva er minste rentesats? (%):", min_value=0.0, value=1.0, step=0.1, format="%.2f"
+    "Hva er minste rentesats? (%):",
+    min_value=0.0,
+    value=variables["loan_calculator"]["INTEREST_RATE_MIN_DEFAULT"],
+    step=0.1,
+    format="%.2f",
 )
 interest_rate_max = st.number_input(
-    "Hva er største rentsats (%):", min_value=0.0, value=5.0, step=0.1, format="%.2f"
+    "Hva er største rentsats (%):",
+    min_value=0.0,
+    value=variables["loan_calculator"]["INTEREST_RATE_MAX_DEFAULT"],
+    step=0.1,
+    format="%.2f",
 )
 interest_rate_step = st.number_input(
     "Intervallbredde på renteendringer (%):",
     min_value=0.25,
-    value=0.25,
+    value=variables["loan_calculator"]["INTEREST_RATE_STEP_DEFAULT"],
     step=0.25,
     format="%.2f",
 )
 ammortisation_periods = st.number_input(
     "Hva er tilbakebetalingstiden på lånet? (i antall måneder):",
     min_value=1,
-    value=360,
+    value=variables["loan"]["AMMORTISATION_PERIOD_DEFAULT"],
     step=1,
 )
 
-# Convert interest rates from percentages to decimals
-interest_rate_range = np.arange(
-    interest_rate_min / 100,
-    interest_rate_max / 100 + interest_rate_step / 100,
-    interest_rate_step / 100,
-)
-
 # Button to perform calculation
 if st.button("Beregn kostnader"):
     if interest_rate_min >= interest_rate_max:
         st.error("Minste rentesats må være mindre enn største rentesats")
     else:
         # Call the function and generate the dataframe
-        df = interest_rate_sensitivity_cached(
-            houseprice_nok, interest_rate_range, ammortisation_periods
-        )
+        # Copy the cached result, as it is shared between sessions
+        df = calculate_interest_rate_sensitivity(
+            houseprice_nok,
+            interest_rate_min,
+            interest_rate_max,
+            interest_rate_step,
+            ammortisation_periods,
+        ).copy()
 
         # Format the dataframe
         df["Rentesats"] = df["Rentesats"] * 100  # Convert to percentage
@@ -6,7 +6,6 @@ Created on Mon Sep  2 2024
 """
 
 import streamlit as st
-import numpy as np
 import toml
 import sys
 from pathlib import Path
@@ -15,8 +14,9 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
-from functions.calc_funcs import scenario_analysis_electricity_costs  # noqa: E402
-from functions.plot_funcs import create_heatmap_divergent_hover  # noqa: E402
+from functions.calc_funcs import electricity_surface_to_frame  # noqa: E402
+from functions.cached_calcs import calculate_electricity_costs  # noqa: E402
+from functions.plot_funcs import create_surface_heatmap  # noqa: E402
 from functions.metric_cards import electricity_metric_cards  # noqa: E402
 from functions import util_funcs  # noqa: E402
 
@@ -24,18 +24,6 @@ from functions import util_funcs  # noqa: E402
 variables = toml.load(project_root.joinpath("variables.toml"))["electricity"]
 
 
-@st.cache_data
-def calculate_electricity_costs(
-    kwh_usage_range, kwh_price_range, markup_nok, fixed_cost_nok
-):
-    return scenario_analysis_electricity_costs(
-        kwh_usage_range=np.linspace(kwh_usage_range[0], kwh_usage_range[1], 50),
-        kwh_price_range=np.linspace(kwh_price_range[0], kwh_price_range[1], 50),
-        markup_nok=markup_nok,
-        fixed_cost_nok=fixed_cost_nok,
-    )
-
-
 st.set_page_config(layout="centered")
 st.title("Beregning av månedlige strømkostnader")
 
@@ -99,19 +87,20 @@ fixed_cost_nok = st.number_input(
 
 # Add a button to trigger the calculation
 if st.button("Beregn kostnader"):
-    df = calculate_electricity_costs(
+    kwh_usages, kwh_prices, surface = calculate_electricity_costs(
         kwh_usage_range, kwh_price_range, markup_nok, fixed_cost_nok
     )
 
     st.subheader("Oppsummert kostnadsbilde")
-    electricity_metric_cards(df)
+    electricity_metric_cards(
+        electricity_surface_to_frame(kwh_usages, kwh_prices, surface)
+    )
 
     st.plotly_chart(
-        create_heatmap_divergent_hover(
-            df,
-            x_column="kWh Price (NOK)",
-            y_column="kWh Usage",
-            z_column="Total Cost (NOK)",
+        create_surface_heatmap(
+            surface,
+            x=kwh_prices,
+            y=kwh_usages,
             title="Strømkostnader",
             x_axis_title="Pris per kWh (NOK)",
             y_axis_title="Strømforbruk (kWh)",
@@ -9,7 +9,6 @@ import streamlit as st
 from pathlib import Path
 import sys
 import toml
-import numpy as np
 
 
 # Add the project root to the Python path
@@ -18,17 +17,23 @@ sys.path.append(str(project_root))
 
 from classes.state_manager import ScenarioState
 
-from functions.calc_funcs import (  # noqa: E402
-    monthly_price_calculator_scenarios,
-    calculate_amortization_schedule,
-)
+from functions.cached_calcs import calculate_scenarios  # noqa: E402
+from functions.cache_resources import get_figure_cache  # noqa: E402
 
 from functions.formatters import format_interest_rate  # noqa: E402
 
+from functions.export_funcs import (  # noqa: E402
+    EXPORT_FORMATS,
+    available_export_formats,
+    export_to_file,
+)
+
 from functions.plot_funcs import (  # noqa: E402
-    create_cost_breakdown_sunburst,
+    create_cost_breakdown_sunbursts,
     create_interest_rate_sensitivity_chart,
-    create_amortization_chart,
+    create_amortization_chart_optimized,
+    amortization_chart_arrays,
+    build_figures,
 )
 
 # Initialize session state
@@ -179,64 +184,19 @@ with st.container():
         step=variables["fixed_costs"]["PERSON_B_FIXED_COSTS_STEP"],
     )
 
-# Convert interest rates from percentages to decimals
-interest_rates_decimal = np.arange(
-    interest_rate_range[0] / 100, interest_rate_range[1] / 100 + 0.005, 0.0025
-)
-
-
-# Calculate scenarios
-@st.cache_data
-def calculate_scenarios(
-    houseprice_range,
-    interest_rates_decimal,
-    fixed_cost_house,
-    kwh_usage_range,
-    kwh_price_range,
-    markup_nok,
-    fixed_cost_electricity,
-    ammortisation_periods,
-    person_a_fixed_costs,
-    person_b_fixed_costs,
-    transaction_costs,
-    ek,
-    ownership_fraq,
-):
-    df = monthly_price_calculator_scenarios(
-        houseprice_range=np.arange(*houseprice_range, step=100000),
-        interest_rate_range=interest_rates_decimal,
-        fixed_cost_house_range=[fixed_cost_house],
-        kwh_usage_range=[kwh_usage_range],
-        kwh_price_range=[kwh_price_range],
-        markup_nok_range=[markup_nok],
-        fixed_cost_electricity_range=[fixed_cost_electricity],
-        ammortisation_periods_range=[ammortisation_periods],
-        person_a_fixed_costs_range=[person_a_fixed_costs],
-        person_b_fixed_costs_range=[person_b_fixed_costs],
-        transaction_costs_range=[transaction_costs],
-        ek_range=[ek],
-        ownership_fraq_range=[ownership_fraq / 100],  # Convert percentage to fraction
-    )
-    df["interest_rate"] = df["interest_rate"].round(5)
-    return df
-
-
 # Button to perform calculation
 if st.button('Beregn scenario'):
     df = calculate_scenarios(
-        houseprice_range, interest_rates_decimal, fixed_cost_house, kwh_usage_range, kwh_price_range, 
+        houseprice_range, interest_rate_range, fixed_cost_house, kwh_usage_range, kwh_price_range, 
         markup_nok, fixed_cost_electricity, ammortisation_periods, person_a_fixed_costs, 
         person_b_fixed_costs, transaction_costs, ek, ownership_fraq
     )
     if df is not None:
         st.session_state.scenario_state.df = df
-        st.session_state.scenario_state.selected_house_price = df["house_price"].unique()[0]
-        st.session_state.scenario_state.selected_interest_rate = df["interest_rate"].unique()[0]
-        
-        filtered_df = df[
-            (df["house_price"] == st.session_state.scenario_state.selected_house_price)
-            & (df["interest_rate"] == st.session_state.scenario_state.selected_interest_rate)
-        ]
+        filtered_df = st.session_state.scenario_state.select(
+            st.session_state.scenario_state.house_prices[0],
+            st.session_state.scenario_state.interest_rates[0],
+        )
         st.session_state.scenario_state.update(filtered_df, st.session_state.scenario_state.selected_house_price, ek, ammortisation_periods)
 
 
@@ -247,27 +207,52 @@ if st.session_state.scenario_state.calculation_done:
     # Filters for sunburst charts
     col1, col2 = st.columns(2)
     with col1:
-        st.session_state.scenario_state.selected_house_price = st.selectbox(
+        house_prices = list(st.session_state.scenario_state.house_prices)
+        selected_house_price = st.selectbox(
             "Velg boligpris",
-            st.session_state.scenario_state.df["house_price"].unique(),
-            index=list(st.session_state.scenario_state.df["house_price"].unique()).index(st.session_state.scenario_state.selected_house_price)
+            house_prices,
+            index=house_prices.index(st.session_state.scenario_state.selected_house_price)
         )
     with col2:
-        formatted_rates = [format_interest_rate(rate) for rate in st.session_state.scenario_state.df["interest_rate"].unique()]
+        formatted_rates = [format_interest_rate(rate) for rate in st.session_state.scenario_state.interest_rates]
         selected_interest_rate_str = st.selectbox(
             "Velg rentesats",
             formatted_rates,
             index=formatted_rates.index(format_interest_rate(st.session_state.scenario_state.selected_interest_rate))
         )
-        st.session_state.scenario_state.selected_interest_rate = round(float(selected_interest_rate_str.strip('%')) / 100, 5)
+        selected_interest_rate = float(selected_interest_rate_str.strip('%')) / 100
 
-    # Re-filter the DataFrame and update state based on new selections
-    filtered_df = st.session_state.scenario_state.df[
-        (st.session_state.scenario_state.df["house_price"] == st.session_state.scenario_state.selected_house_price)
-        & (st.session_state.scenario_state.df["interest_rate"] == st.session_state.scenario_state.selected_interest_rate)
-    ]
+    # Look up the selected scenario and update state based on new selections
+    filtered_df = st.session_state.scenario_state.select(selected_house_price, selected_interest_rate)
     st.session_state.scenario_state.update(filtered_df, st.session_state.scenario_state.selected_house_price, ek, ammortisation_periods)
 
+    # Build the figures of the results concurrently rather than one by one between the sections,
+    # with the cost breakdowns of both persons built in one pass over the selected scenario
+    scenario_state = st.session_state.scenario_state
+    figures = build_figures({
+        "sunbursts": (create_cost_breakdown_sunbursts, (filtered_df,)),
+        "sensitivity_a": (
+            create_interest_rate_sensitivity_chart,
+            (scenario_state.loan_amount_a, ammortisation_periods, interest_rate_range),
+            {"title": 'Person A: Månedlig lånekostnad vs. Rentesats'},
+        ),
+        "sensitivity_b": (
+            create_interest_rate_sensitivity_chart,
+            (scenario_state.loan_amount_b, ammortisation_periods, interest_rate_range),
+            {"title": 'Person B: Månedlig lånekostnad vs. Rentesats'},
+        ),
+        "amortization_a": (
+            create_amortization_chart_optimized,
+            (),
+            {**amortization_chart_arrays(scenario_state.schedule_a), "title": "Person A"},
+        ),
+        "amortization_b": (
+            create_amortization_chart_optimized,
+            (),
+            {**amortization_chart_arrays(scenario_state.schedule_b), "title": "Person B"},
+        ),
+    }, cache=get_figure_cache())
+
     # Summary Dashboard
     st.subheader("Sammendrag")
     col1, col2, col3, col4 = st.columns(4)
@@ -310,8 +295,7 @@ if st.session_state.scenario_state.calculation_done:
             help="Den totale månedlige kostnaden for Person A, inkludert lån, strøm, og andre faste kostnader"
         )
         
-        fig_a = create_cost_breakdown_sunburst(filtered_df, 'A')
-        st.plotly_chart(fig_a, use_container_width=True)
+        st.plotly_chart(figures["sunbursts"]["A"], use_container_width=True, key="sunburst_a")
 
     with col2:
         st.metric(
@@ -320,8 +304,7 @@ if st.session_state.scenario_state.calculation_done:
             help="Den totale månedlige kostnaden for Person B, inkludert lån, strøm, og andre faste kostnader"
         )
         
-        fig_b = create_cost_breakdown_sunburst(filtered_df, 'B')
-        st.plotly_chart(fig_b, use_container_width=True)
+        st.plotly_chart(figures["sunbursts"]["B"], use_container_width=True, key="sunburst_b")
 
     # Interest Rate Sensitivity
     st.subheader("Rentesensitivitetsanalyse")
@@ -333,14 +316,10 @@ if st.session_state.scenario_state.calculation_done:
     
     col1, col2 = st.columns(2)
     with col1:
-        fig_sensitivity_a = create_interest_rate_sensitivity_chart(st.session_state.scenario_state.loan_amount_a, ammortisation_periods, interest_rate_range)
-        fig_sensitivity_a.update_layout(title='Person A: Månedlig lånekostnad vs. Rentesats')
-        st.plotly_chart(fig_sensitivity_a, use_container_width=True)
+        st.plotly_chart(figures["sensitivity_a"], use_container_width=True, key="sensitivity_a")
 
     with col2:
-        fig_sensitivity_b = create_interest_rate_sensitivity_chart(st.session_state.scenario_state.loan_amount_b, ammortisation_periods, interest_rate_range)
-        fig_sensitivity_b.update_layout(title='Person B: Månedlig lånekostnad vs. Rentesats')
-        st.plotly_chart(fig_sensitivity_b, use_container_width=True)
+        st.plotly_chart(figures["sensitivity_b"], use_container_width=True, key="sensitivity_b")
     
     # Amortization Schedule
     st.subheader("Nedbetalingsplan")
@@ -353,22 +332,10 @@ if st.session_state.scenario_state.calculation_done:
     col1, col2 = st.columns(2)
     
     with col1:
-        schedule_a = calculate_amortization_schedule(
-            st.session_state.scenario_state.loan_amount_a,
-            st.session_state.scenario_state.selected_interest_rate,
-            ammortisation_periods,
-            )
-        fig_a = create_amortization_chart(schedule_a, "Person A")
-        st.plotly_chart(fig_a, use_container_width=True)
+        st.plotly_chart(figures["amortization_a"], use_container_width=True, key="amortization_a")
 
     with col2:
-        schedule_b = calculate_amortization_schedule(
-            st.session_state.scenario_state.loan_amount_b,
-            st.session_state.scenario_state.selected_interest_rate,
-            ammortisation_periods,
-            )
-        fig_b = create_amortization_chart(schedule_b, "Person B")
-        st.plotly_chart(fig_b, use_container_width=True)
+        st.plotly_chart(figures["amortization_b"], use_container_width=True, key="amortization_b")
 
     # Data display and download options
     st.subheader("Data og eksport")
@@ -377,10 +344,32 @@ if st.session_state.scenario_state.calculation_done:
     if data_option == "Vis data":
         st.dataframe(st.session_state.scenario_state.df)
     elif data_option == "Last ned data":
-        csv = st.session_state.scenario_state.df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Last ned CSV",
-            data=csv,
-            file_name="kostnadsscenario_data.csv",
-            mime="text/csv",
+        export_format = st.selectbox(
+            "Velg filformat", available_export_formats(), format_func=str.upper
         )
+        mime, suffix = EXPORT_FORMATS[export_format]
+
+        # Only write the file when asked, rather than on every rerun of the page. The file
+        # is written in chunks and the download is served from it
+        df = st.session_state.scenario_state.df
+        if st.button("Lag eksportfil"):
+            st.session_state.export = {
+                "df": df,
+                "format": export_format,
+                "path": export_to_file(df, export_format),
+            }
+
+        export = st.session_state.get("export")
+        if (
+            export is not None
+            and export["df"] is df
+            and export["format"] == export_format
+            and export["path"].exists()
+        ):
+            with open(export["path"], "rb") as export_file:
+                st.download_button(
+                    label=f"Last ned {export_format.upper()}",
+                    data=export_file,
+                    file_name=f"kostnadsscenario_data{suffix}",
+                    mime=mime,
+                )
@@ -0,0 +1,59 @@
+import timeit
+import plotly.graph_objects as go
+from pathlib import Path
+import sys
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from functions.plot_funcs import (
+    template,
+    create_amortization_chart,
+    create_amortization_chart_optimized,
+    amortization_chart_arrays,
+)
+from functions.calc_funcs import calculate_amortization_schedule
+
+
+def previous_amortization_chart(schedule, title):
+    # The amortization chart as built before create_amortization_chart_optimized, with
+    # one add_trace call per column and the template set by name
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=schedule['Month'], y=schedule['Remaining Balance'], name="Gjenstående saldo"))
+    fig.add_trace(go.Scatter(x=schedule['Month'], y=schedule['Principal'], name="Kumulativt avdrag"))
+    fig.add_trace(go.Scatter(x=schedule['Month'], y=schedule['Interest'], name="Kumulative renter"))
+    fig.add_trace(go.Scatter(x=schedule['Month'], y=schedule['Total Paid'], name="Kumulativ total"))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Måned",
+        yaxis_title="Beløp (NOK)",
+        legend=dict(x=0, y=1, traceorder="normal"),
+        template=template,
+        hovermode="x unified"
+    )
+    return fig
+
+
+def benchmark(name, func, number=20, repeat=5):
+    func()  # Warm up
+    seconds = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    print(f"{name:<45} {seconds * 1000:8.2f} ms")
+    return seconds
+
+
+def main():
+    schedule = calculate_amortization_schedule(3500000, 0.05, 480)
+    arrays = amortization_chart_arrays(schedule)
+
+    # The charts must be identical for the comparison to be fair
+    assert previous_amortization_chart(schedule, "Person A") == create_amortization_chart_optimized(**arrays, title="Person A")
+
+    previous = benchmark("Previous chart, DataFrame", lambda: previous_amortization_chart(schedule, "Person A"))
+    benchmark("create_amortization_chart, DataFrame", lambda: create_amortization_chart(schedule, "Person A"))
+    optimized = benchmark("create_amortization_chart_optimized, arrays", lambda: create_amortization_chart_optimized(**arrays, title="Person A"))
+    print(f"Speedup: {previous / optimized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ sys.path.append(str(project_root))
 
 from functions.plot_funcs import (
     create_cost_breakdown_sunburst,
+    create_cost_breakdown_sunbursts,
     create_interest_rate_sensitivity_chart,
     create_amortization_chart
 )
@@ -56,14 +57,14 @@ def create_sample_data():
     )
     
     # Data for interest rate sensitivity chart
-    loan_amount = sunburst_data['house_price'] - 1500000  # Assuming ek is 1500000
+    loan_amount = sunburst_data['house_price'].iloc[0] - 1500000  # Assuming ek is 1500000
     amortization_periods = 360
     interest_rate_range = sunburst_data['interest_rate'].unique()
     
     # Data for amortization chart
     amortization_schedule = calculate_amortization_schedule(
         loan_amount, 
-        sunburst_data['interest_rate'], 
+        sunburst_data['interest_rate'].iloc[0], 
         amortization_periods
     )
     
@@ -74,9 +75,12 @@ def main():
     
     # Profile create_cost_breakdown_sunburst
     profile_function(create_cost_breakdown_sunburst, sunburst_data, 'A')
+
+    # Profile create_cost_breakdown_sunbursts for both persons
+    profile_function(create_cost_breakdown_sunbursts, sunburst_data)
     
     # Profile create_interest_rate_sensitivity_chart
-    profile_function(create_interest_rate_sensitivity_chart, loan_amount, amortization_periods, (0.01, 0.1))
+    profile_function(create_interest_rate_sensitivity_chart, loan_amount, amortization_periods, (1.0, 10.0))
     
     # Profile create_amortization_chart
     profile_function(create_amortization_chart, amortization_schedule, "Person A")
@@ -57,45 +57,35 @@ def run_initial_scenario():
     # Initialize ScenarioState
     state = ScenarioState()
     state.df = df
-    state.selected_house_price = df["house_price"].unique()[0]
-    state.selected_interest_rate = df["interest_rate"].unique()[0]
 
-    # Filter data and update state
-    filtered_df = state.df[
-        (state.df["house_price"] == state.selected_house_price)
-        & (state.df["interest_rate"] == state.selected_interest_rate)
-    ]
+    # Select data and update state
+    filtered_df = state.select(state.house_prices[0], state.interest_rates[0])
     state.update(filtered_df, state.selected_house_price, ek, ammortisation_periods)
 
     # Generate initial charts
     create_cost_breakdown_sunburst(state.df, 'A')
     create_cost_breakdown_sunburst(state.df, 'B')
-    create_interest_rate_sensitivity_chart(state.loan_amount_a, ammortisation_periods, interest_rates_decimal)
-    create_interest_rate_sensitivity_chart(state.loan_amount_b, ammortisation_periods, interest_rates_decimal)
+    interest_rate_range = (interest_rates_decimal[0] * 100, interest_rates_decimal[-1] * 100)
+    create_interest_rate_sensitivity_chart(state.loan_amount_a, ammortisation_periods, interest_rate_range)
+    create_interest_rate_sensitivity_chart(state.loan_amount_b, ammortisation_periods, interest_rate_range)
     create_amortization_chart(state.schedule_a, "Person A")
     create_amortization_chart(state.schedule_b, "Person B")
 
     return state, ek, ammortisation_periods
 
 def simulate_user_interaction(state, ek, ammortisation_periods):
-    # Simulate changing house price
-    state.selected_house_price = state.df["house_price"].unique()[1]  # Select second house price
+    # Simulate changing house price and interest rate to the second of each
+    filtered_df = state.select(state.house_prices[1], state.interest_rates[1])
 
-    # Simulate changing interest rate
-    state.selected_interest_rate = state.df["interest_rate"].unique()[1]  # Select second interest rate
-    
-    # Re-filter data and update state
-    filtered_df = state.df[
-        (state.df["house_price"] == state.selected_house_price)
-        & (state.df["interest_rate"] == state.selected_interest_rate)
-    ]
+    # Update state
     state.update(filtered_df, state.selected_house_price, ek, ammortisation_periods)
 
     # Regenerate charts
     create_cost_breakdown_sunburst(state.df, 'A')
     create_cost_breakdown_sunburst(state.df, 'B')
-    create_interest_rate_sensitivity_chart(state.loan_amount_a, ammortisation_periods, state.df["interest_rate"].unique())
-    create_interest_rate_sensitivity_chart(state.loan_amount_b, ammortisation_periods, state.df["interest_rate"].unique())
+    interest_rate_range = (state.interest_rates[0] * 100, state.interest_rates[-1] * 100)
+    create_interest_rate_sensitivity_chart(state.loan_amount_a, ammortisation_periods, interest_rate_range)
+    create_interest_rate_sensitivity_chart(state.loan_amount_b, ammortisation_periods, interest_rate_range)
     create_amortization_chart(state.schedule_a, "Person A")
     create_amortization_chart(state.schedule_b, "Person B")
 
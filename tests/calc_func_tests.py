@@ -5,9 +5,13 @@ Created on Mon Sep  2 2024
 @author: Benedikt Goodman
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import time
+
 import pytest
 import numpy as np
 import pandas as pd
+import numpy_financial as npf
 
 import sys
 from pathlib import Path
@@ -16,14 +20,21 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+import functions.calc_funcs as calc_funcs  # noqa: E402
 from functions.calc_funcs import (  # noqa: E402
+    calculate_amortization_schedule,
+    calculate_amortization_schedules,
     loan_calc,
+    annuity_factor,
+    _annuity_factor_cached,
     calculate_govt_support,
     calculate_electricity_costs,
     scenario_analysis_electricity_costs,
+    electricity_cost_surface,
     interest_rate_sensitivity,
     monthly_price_calculator,
     monthly_price_calculator_scenarios,
+    iter_monthly_price_calculator_scenarios,
 )
 
 
@@ -32,6 +43,77 @@ def test_loan_calc():
     assert pytest.approx(loan_calc(200000, 0.03, 240), 0.01) == 1108.86
 
 
+@pytest.mark.parametrize(
+    "loan_amount, annual_interest_rate, loan_term_months",
+    [(200000, 0.05, 360), (1234567.89, 0.0725, 480), (3000000, 0.2, 12)],
+)
+def test_calculate_amortization_schedule_matches_numpy_financial(
+    loan_amount, annual_interest_rate, loan_term_months
+):
+    schedule = calculate_amortization_schedule(
+        loan_amount, annual_interest_rate, loan_term_months
+    )
+    per = np.arange(loan_term_months) + 1
+    interest = -npf.ipmt(annual_interest_rate / 12, per, loan_term_months, loan_amount)
+    principal = -npf.ppmt(annual_interest_rate / 12, per, loan_term_months, loan_amount)
+
+    assert list(schedule.columns) == [
+        "Month", "Principal", "Interest", "Remaining Balance", "Total Paid"
+    ]
+    assert len(schedule) == loan_term_months + 1
+    assert schedule.iloc[0].tolist() == [0, 0, 0, loan_amount, 0]
+    np.testing.assert_allclose(schedule["Principal"].iloc[1:], principal.cumsum(), atol=1)
+    np.testing.assert_allclose(schedule["Interest"].iloc[1:], interest.cumsum(), atol=1)
+    assert abs(schedule["Remaining Balance"].iloc[-1]) <= 1
+
+
+def test_calculate_amortization_schedule_zero_interest():
+    schedule = calculate_amortization_schedule(120000, 0, 12)
+    assert schedule["Interest"].eq(0).all()
+    assert schedule["Principal"].iloc[6] == 60000
+    assert schedule["Remaining Balance"].iloc[-1] == 0
+
+
+def test_calculate_amortization_schedules_matches_single_loans():
+    loan_amounts = np.array([200000, 1500000, 3000000])
+    rates = np.array([0.05, 0.0, 0.035])
+    terms = np.array([240, 120, 360])
+    schedules = calculate_amortization_schedules(loan_amounts, rates, terms)
+    assert schedules.shape == (3, 361, 4)
+    for i in range(3):
+        expected = calculate_amortization_schedule(loan_amounts[i], rates[i], terms[i])
+        np.testing.assert_array_equal(
+            schedules[i, : terms[i] + 1], expected.drop(columns="Month").to_numpy()
+        )
+        # Shorter loans hold their final state after the end of the term
+        assert (schedules[i, terms[i]:] == schedules[i, terms[i]]).all()
+
+    df = calculate_amortization_schedules(loan_amounts, rates, terms, as_frame=True)
+    assert len(df) == terms.sum() + 3
+    assert df.index.names == ["Loan", "Month"]
+    assert df.loc[(1, 120), "Remaining Balance"] == 0
+
+
+def test_annuity_factor():
+    assert pytest.approx(annuity_factor(0.05, 360) * 100000, 0.01) == 536.82
+    assert annuity_factor(0.0, 12) == pytest.approx(1 / 12)
+    factors = annuity_factor(np.array([[0.0], [0.05]]), np.array([[240, 360]]))
+    assert factors.shape == (2, 2)
+    assert factors[0, 1] == pytest.approx(1 / 360)
+    assert factors[1, 1] == pytest.approx(annuity_factor(0.05, 360))
+    # Loan payments are the annuity factor times the loan
+    assert loan_calc(200000, 0.03, 240) == pytest.approx(annuity_factor(0.03, 240) * 200000)
+
+
+def test_loan_calc_uses_cached_annuity_factor():
+    _annuity_factor_cached.cache_clear()
+    first = loan_calc(250000, 0.0425, 300)
+    hits = _annuity_factor_cached.cache_info().hits
+    assert loan_calc(np.float64(250000), 0.0425, 300) == first
+    assert isinstance(first, float)
+    assert _annuity_factor_cached.cache_info().hits == hits + 1
+
+
 def test_calculate_govt_support():
     assert pytest.approx(calculate_govt_support(1000, 1.5, 0.9125), 0.01) == 527.25
     assert (
@@ -76,6 +158,33 @@ def test_scenario_analysis_electricity_costs():
     )
 
 
+def test_electricity_costs_broadcast_over_arrays():
+    kwh_usage = np.array([[0], [1000], [6000]])
+    kwh_price = np.array([[0.5, 0.9125, 1.5]])
+    result = calculate_electricity_costs(kwh_usage, kwh_price, 0.1, 100)
+    assert result.shape == (3, 3)
+    for i, usage in enumerate(kwh_usage[:, 0]):
+        for j, price in enumerate(kwh_price[0]):
+            assert pytest.approx(result[i, j]) == calculate_electricity_costs(
+                usage, price, 0.1, 100
+            )
+    # Support is capped at 5000 kWh
+    assert pytest.approx(result[2, 2]) == 100 + 6000 * 1.6
+    assert pytest.approx(result[1, 2]) == 1171.25
+
+
+def test_electricity_cost_surface_matches_long_form():
+    kwh_usage_range = np.linspace(100, 6000, 7)
+    kwh_price_range = np.linspace(0.1, 3.0, 5)
+    surface = electricity_cost_surface(kwh_usage_range, kwh_price_range, 0.1, 39)
+    df = scenario_analysis_electricity_costs(kwh_usage_range, kwh_price_range, 0.1, 39)
+    assert surface.shape == (7, 5)
+    np.testing.assert_allclose(
+        df.pivot(index="kWh Usage", columns="kWh Price (NOK)", values="Total Cost (NOK)").values,
+        surface,
+    )
+
+
 def test_interest_rate_sensitivity():
     result = interest_rate_sensitivity(2500000, np.array([0.01, 0.02, 0.03]), 360)
     assert isinstance(result, pd.DataFrame)
@@ -125,5 +234,215 @@ def test_monthly_price_calculator_scenarios():
     )
 
 
+def test_monthly_price_calculator_scenarios_matches_scalar_functions():
+    result = monthly_price_calculator_scenarios(
+        [2000000, 2500000],
+        [0.02, 0.03, 0.045],
+        [3000],
+        [1000, 6000],
+        [0.5, 1.5],
+        [0.1],
+        [100],
+        [300, 360],
+        [12000],
+        [11000],
+        [200000],
+        [500000],
+        [0.5, 0.25],
+    )
+    assert len(result) == 2 * 3 * 2 * 2 * 2 * 2
+    # Rows are ordered like itertools.product, so the first axis varies slowest
+    assert list(result["house_price"].iloc[[0, -1]]) == [2000000, 2500000]
+    for row in result.itertuples():
+        loan = row.house_price - (row.ek - row.transaction_costs)
+        expected_payment = loan_calc(loan, row.interest_rate, row.ammortisation_periods)
+        expected_el_cost = calculate_electricity_costs(
+            row.kwh_usage, row.kwh_price, row.markup_nok, row.fixed_cost_electricity
+        )
+        assert pytest.approx(row.monthly_loan_payment) == expected_payment
+        assert pytest.approx(row.el_cost) == expected_el_cost
+        assert pytest.approx(row.a_total) == (
+            expected_payment * row.ownership_fraq
+            + expected_el_cost / 2
+            + row.fixed_cost_house / 2
+            + row.person_a_fixed_costs
+        )
+
+
+def test_monthly_price_calculator_scenarios_parallel_matches_serial():
+    ranges = (
+        np.arange(3000000, 5000000, 100000),
+        np.arange(0.01, 0.06, 0.0025),
+        [5000],
+        [500, 1000],
+        [1.5],
+        [0.1],
+        [39],
+        [360],
+        [10000],
+        [10000],
+        [200000],
+        [1500000],
+        [0.5, 0.6],
+    )
+    expected = monthly_price_calculator_scenarios(*ranges)
+
+    pd.testing.assert_frame_equal(
+        monthly_price_calculator_scenarios(*ranges, n_workers=2), expected
+    )
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        pd.testing.assert_frame_equal(
+            monthly_price_calculator_scenarios(
+                *ranges, executor=executor, n_workers=3, dtype=np.float32
+            ),
+            monthly_price_calculator_scenarios(*ranges, dtype=np.float32),
+        )
+
+    with pytest.raises(ValueError):
+        monthly_price_calculator_scenarios(*ranges, as_grid=True, n_workers=2)
+
+
+def test_parallel_scenarios_raise_worker_errors(monkeypatch):
+    evaluate_scenario_values = calc_funcs._evaluate_scenario_values
+
+    def failing_scenario_values(*args):
+        # A result of the wrong length fails halfway through writing the shared columns
+        values = evaluate_scenario_values(*args)
+        column = calc_funcs.SCENARIO_COLUMNS[len(calc_funcs.SCENARIO_COLUMNS) // 2]
+        values[column] = np.append(values[column], 0)
+        return values
+
+    monkeypatch.setattr(calc_funcs, "_evaluate_scenario_values", failing_scenario_values)
+    ranges = ([3000000, 3500000], [0.02, 0.03], [5000], [500], [1.5], [0.1], [39], [360],
+              [10000], [10000], [200000], [1500000], [0.5])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError, match="broadcast"):
+            monthly_price_calculator_scenarios(*ranges, executor=executor, n_workers=2)
+
+
+def test_parallel_scenarios_wait_for_running_shards(monkeypatch):
+    evaluate_scenario_values = calc_funcs._evaluate_scenario_values
+    started, finished = [], []
+
+    def slow_scenario_values(axes, tables, start, stop, dtype):
+        # The first shard fails at once, while the other running shard is still working
+        started.append(start)
+        if start == 0:
+            raise RuntimeError("shard failed")
+        time.sleep(0.2)
+        values = evaluate_scenario_values(axes, tables, start, stop, dtype)
+        finished.append(start)
+        return values
+
+    monkeypatch.setattr(calc_funcs, "_evaluate_scenario_values", slow_scenario_values)
+    ranges = ([3000000, 3500000], [0.02, 0.03], [5000], [500], [1.5], [0.1], [39], [360],
+              [10000], [10000], [200000], [1500000], [0.5])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(RuntimeError, match="shard failed"):
+            monthly_price_calculator_scenarios(*ranges, executor=executor, n_workers=2)
+        # Every shard that started has finished writing before the call returned
+        assert sorted(finished) == sorted(started)[1:]
+
+
+def test_iter_monthly_price_calculator_scenarios_matches_full_grid():
+    ranges = (
+        np.arange(3000000, 5000000, 100000),
+        np.arange(0.01, 0.06, 0.0025),
+        [5000],
+        [500, 1000],
+        [1.5],
+        [0.1],
+        [39],
+        [360],
+        [10000],
+        [10000],
+        [200000],
+        [1500000],
+        [0.5, 0.6],
+    )
+    chunks = list(iter_monthly_price_calculator_scenarios(*ranges, chunk_size=333))
+    assert all(len(chunk) <= 333 for chunk in chunks)
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks), monthly_price_calculator_scenarios(*ranges)
+    )
+
+    # A start and stop select the same rows as slicing the full grid
+    part = pd.concat(
+        iter_monthly_price_calculator_scenarios(*ranges, chunk_size=100, start=250, stop=1234)
+    )
+    pd.testing.assert_frame_equal(part, monthly_price_calculator_scenarios(*ranges).iloc[250:1234])
+
+
+def test_iter_monthly_price_calculator_scenarios_checks_arguments_on_call():
+    ranges = ([3000000], [0.02], [5000], [500], [1.5], [0.1], [39], [360], [10000], [10000],
+              [200000], [1500000], [0.5])
+    # The errors are raised by the call itself, before any chunk is requested
+    with pytest.raises(ValueError):
+        iter_monthly_price_calculator_scenarios(*ranges, chunk_size=0)
+    with pytest.raises(ValueError):
+        iter_monthly_price_calculator_scenarios(*ranges, start=-1)
+    with pytest.raises(ValueError):
+        iter_monthly_price_calculator_scenarios(*ranges, start=2, stop=1)
+
+
+def test_monthly_price_calculator_scenarios_as_grid():
+    ranges = (
+        [2000000, 2500000, 3000000],
+        [0.02, 0.03],
+        [3000],
+        [1000, 6000],
+        [1.0, 1.5],
+        [0.1],
+        [100],
+        [360],
+        [12000],
+        [12000],
+        [200000],
+        [500000],
+        [0.5, 0.3],
+    )
+    df = monthly_price_calculator_scenarios(*ranges)
+    grid = monthly_price_calculator_scenarios(*ranges, as_grid=True)
+    assert grid.shape == (3, 2, 1, 2, 2, 1, 1, 1, 1, 1, 1, 1, 2)
+    assert grid.data["a_total"].shape == grid.shape
+    pd.testing.assert_frame_equal(grid.to_frame(), df)
+
+    categorical = grid.to_frame(categorical=True)
+    assert isinstance(categorical["house_price"].dtype, pd.CategoricalDtype)
+    assert categorical["house_price"].astype(int).tolist() == df["house_price"].tolist()
+
+    compact = monthly_price_calculator_scenarios(*ranges, as_grid=True, dtype=np.float32)
+    assert compact.data["b_total"].dtype == np.float32
+    assert compact.nbytes < grid.nbytes < df.memory_usage().sum()
+    np.testing.assert_allclose(compact.to_frame()["b_total"], df["b_total"], rtol=1e-6)
+
+
+def test_scenario_grid_selection():
+    house_prices = np.arange(3000000, 5000000, 100000)
+    interest_rates = np.arange(0.02, 0.05, 0.0025)
+    ranges = (
+        house_prices, interest_rates, [5000], [500], [1.5], [0.1], [39], [360],
+        [10000], [10000], [200000], [1500000], [0.4],
+    )
+    df = monthly_price_calculator_scenarios(*ranges)
+    grid = monthly_price_calculator_scenarios(*ranges, as_grid=True)
+
+    # Rates from np.arange are matched within floating point tolerance
+    selected = grid.sel(house_price=3200000, interest_rate=0.03)
+    expected = df[(df["house_price"] == 3200000) & np.isclose(df["interest_rate"], 0.03)]
+    pd.testing.assert_frame_equal(selected.to_frame(), expected.reset_index(drop=True))
+    assert np.shares_memory(selected.data["a_total"], grid.data["a_total"])
+
+    surface = grid.surface("a_total", x="interest_rate", y="house_price")
+    assert surface.shape == (len(house_prices), len(interest_rates))
+    assert surface[2, 4] == expected["a_total"].iloc[0]
+    np.testing.assert_array_equal(
+        grid.surface("a_total", x="house_price", y="interest_rate"), surface.T
+    )
+
+    with pytest.raises(KeyError):
+        grid.sel(house_price=3250000)
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,191 @@
+import io
+
+import pytest
+import pandas as pd
+import numpy as np
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from functions.calc_funcs import monthly_price_calculator_scenarios  # noqa: E402
+from functions.export_funcs import (  # noqa: E402
+    EXPORT_WRITERS,
+    available_export_formats,
+    export_frame,
+    export_scenarios,
+    export_to_file,
+    frame_fingerprint,
+    write_arrow,
+    write_parquet,
+)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "house_price": np.repeat(np.arange(3000000, 3500000, 100000), 7),
+            "interest_rate": np.tile(np.arange(0.02, 0.0375, 0.0025), 5),
+            "a_total": np.linspace(20000, 30000, 35),
+        }
+    )
+
+
+def test_csv_export_matches_to_csv(df):
+    buffer = io.BytesIO()
+    export_frame(df, buffer, "csv", chunk_size=4)
+    assert buffer.getvalue() == df.to_csv(index=False).encode("utf-8")
+
+    # Empty frames still get a header
+    buffer = io.BytesIO()
+    export_frame(df.iloc[:0], buffer, "csv")
+    assert buffer.getvalue() == df.iloc[:0].to_csv(index=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_binary_exports_round_trip(df, tmp_path, export_format):
+    if export_format not in available_export_formats():
+        pytest.skip("pyarrow is not installed")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = tmp_path / f"data.{export_format}"
+    export_frame(df, path, export_format, chunk_size=10)
+
+    if export_format == "parquet":
+        assert pq.ParquetFile(path).num_row_groups == 4
+        result = pd.read_parquet(path)
+    else:
+        with pa.memory_map(str(path)) as source:
+            result = pa.ipc.open_file(source).read_all().to_pandas()
+    pd.testing.assert_frame_equal(result, df)
+
+
+def test_export_to_file_reuses_and_prunes_files(df, tmp_path):
+    path = export_to_file(df, "csv", directory=tmp_path)
+    assert path.read_bytes() == df.to_csv(index=False).encode("utf-8")
+    assert path.stem == frame_fingerprint(df)
+    assert export_to_file(df.copy(), "csv", directory=tmp_path) == path
+
+    for i in range(3):
+        export_to_file(df.assign(a_total=df["a_total"] + i + 1), "csv", directory=tmp_path, max_files=2)
+    assert len(list(tmp_path.iterdir())) == 2
+
+    with pytest.raises(ValueError):
+        export_frame(df, tmp_path / "data.xlsx", "xlsx")
+
+
+def test_export_to_file_skips_files_removed_by_other_sessions(df, tmp_path, monkeypatch):
+    iterdir = Path.iterdir
+
+    def iterdir_with_removed_file(self):
+        # Another session removes a file between the listing and the pruning
+        yield from iterdir(self)
+        yield self / "removed.csv"
+
+    monkeypatch.setattr(Path, "iterdir", iterdir_with_removed_file)
+    for i in range(3):
+        export_to_file(df.assign(a_total=df["a_total"] + i), "csv", directory=tmp_path, max_files=2)
+    assert len(list(iterdir(tmp_path))) == 2
+
+
+def test_export_to_file_removes_partial_file_on_error(df, tmp_path, monkeypatch):
+    def failing_writer(chunks, file):
+        file.write(next(iter(chunks)).to_csv(index=False).encode("utf-8"))
+        raise RuntimeError("disk full")
+
+    monkeypatch.setitem(EXPORT_WRITERS, "csv", failing_writer)
+    with pytest.raises(RuntimeError, match="disk full"):
+        export_to_file(df, "csv", directory=tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("writer", [write_parquet, write_arrow])
+def test_binary_writers_without_chunks(df, tmp_path, writer):
+    if "parquet" not in available_export_formats():
+        pytest.skip("pyarrow is not installed")
+
+    with pytest.raises(ValueError):
+        writer(iter([]), tmp_path / "data")
+
+    # The empty DataFrame gives the schema of the file
+    path = tmp_path / "empty"
+    writer(iter([]), path, empty=df.iloc[:0])
+    if writer is write_parquet:
+        result = pd.read_parquet(path)
+    else:
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            result = pa.ipc.open_file(source).read_all().to_pandas()
+    pd.testing.assert_frame_equal(result, df.iloc[:0])
+
+
+@pytest.fixture
+def scenario_ranges():
+    return dict(
+        houseprice_range=np.arange(3000000, 4000000, 100000),
+        interest_rate_range=np.arange(0.02, 0.05, 0.0025),
+        fixed_cost_house_range=[5000],
+        kwh_usage_range=[500],
+        kwh_price_range=[1.5],
+        markup_nok_range=[0.1],
+        fixed_cost_electricity_range=[39],
+        ammortisation_periods_range=[360],
+        person_a_fixed_costs_range=[10000],
+        person_b_fixed_costs_range=[10000],
+        transaction_costs_range=[200000, 250000],
+        ek_range=[1000000, 1500000],
+        ownership_fraq_range=[0.3, 0.5, 0.7],
+    )
+
+
+def test_export_scenarios_csv(scenario_ranges):
+    expected = monthly_price_calculator_scenarios(**scenario_ranges)
+
+    buffer = io.BytesIO()
+    assert export_scenarios(buffer, chunk_size=100, **scenario_ranges) == len(expected)
+    assert buffer.getvalue() == expected.to_csv(index=False).encode("utf-8")
+
+    # Text files are written directly
+    text = io.StringIO()
+    export_scenarios(text, chunk_size=1000, **scenario_ranges)
+    assert text.getvalue() == expected.to_csv(index=False)
+
+
+def test_export_scenarios_parquet(scenario_ranges, tmp_path):
+    if "parquet" not in available_export_formats():
+        pytest.skip("pyarrow is not installed")
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "scenarios.parquet"
+    n_rows = export_scenarios(path, "parquet", chunk_size=500, **scenario_ranges)
+    assert n_rows == 1440
+    assert pq.ParquetFile(path).num_row_groups == 3
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(path), monthly_price_calculator_scenarios(**scenario_ranges)
+    )
+
+
+@pytest.mark.parametrize("export_format", ["csv", "parquet"])
+def test_export_scenarios_without_scenarios(scenario_ranges, tmp_path, export_format):
+    if export_format not in available_export_formats():
+        pytest.skip("pyarrow is not installed")
+
+    scenario_ranges["houseprice_range"] = []
+    expected = monthly_price_calculator_scenarios(**scenario_ranges)
+    assert expected.empty
+
+    path = tmp_path / f"scenarios.{export_format}"
+    assert export_scenarios(path, export_format, **scenario_ranges) == 0
+    if export_format == "csv":
+        assert path.read_bytes() == expected.to_csv(index=False).encode("utf-8")
+    else:
+        pd.testing.assert_frame_equal(pd.read_parquet(path), expected)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -10,11 +10,23 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from classes.scenario_cache import ScenarioCache, sizeof  # noqa: E402
 from functions.plot_funcs import (  # noqa: E402
     create_interest_rate_sensitivity_chart,
     create_cost_breakdown_sunburst,
+    create_cost_breakdown_sunbursts,
     create_amortization_chart,
-    create_heatmap_divergent_hover
+    create_amortization_chart_optimized,
+    amortization_chart_arrays,
+    create_heatmap_divergent_hover,
+    create_surface_heatmap,
+    build_figures,
+    downsample,
+    lttb_indices,
+    minmax_indices,
+    scatter_trace_class,
+    create_scenario_lines_chart,
+    WEBGL_POINT_THRESHOLD,
 )
 
 @pytest.fixture
@@ -34,7 +46,8 @@ def sample_schedule():
         'Month': range(1, 13),
         'Remaining Balance': [10000 - i*100 for i in range(12)],
         'Principal': [100] * 12,
-        'Interest': [50] * 12
+        'Interest': [50] * 12,
+        'Total Paid': [150] * 12
     })
 
 def test_create_interest_rate_sensitivity_chart():
@@ -53,15 +66,59 @@ def test_create_cost_breakdown_sunburst(sample_df):
     assert fig.data[0].type == 'sunburst'
     assert fig.layout.title.text == 'Kostnadsfordeling'
 
+def test_create_cost_breakdown_sunbursts(sample_df):
+    figures = create_cost_breakdown_sunbursts(sample_df)
+    assert list(figures) == ['A', 'B']
+    trace = figures['B'].data[0]
+    assert trace.type == 'sunburst'
+    assert figures['B'].layout.title.text == 'Kostnadsfordeling'
+
+    values = dict(zip(trace.ids, trace.values))
+    assert values['Boligkostnader/Lånebetaling'] == pytest.approx(400)
+    assert values['Boligkostnader/Faste boligkostnader'] == 200
+    assert values['Boligkostnader/Strøm'] == 100
+    assert values['Personlige kostnader/Andre faste kostnader'] == 600
+    # The categories are the totals of their subcategories
+    assert values['Boligkostnader'] == pytest.approx(700)
+    assert values['Personlige kostnader'] == 600
+    assert dict(zip(trace.ids, trace.parents))['Boligkostnader/Strøm'] == 'Boligkostnader'
+
+    assert figures['A'] == create_cost_breakdown_sunburst(sample_df, 'A')
+    assert dict(zip(figures['A'].data[0].ids, figures['A'].data[0].values))['Boligkostnader/Lånebetaling'] == 600
+
 def test_create_amortization_chart(sample_schedule):
     fig = create_amortization_chart(sample_schedule, 'Test Amortization')
     assert isinstance(fig, go.Figure)
-    assert len(fig.data) == 3
+    assert len(fig.data) == 4
     assert all(trace.type == 'scatter' for trace in fig.data)
     assert fig.layout.title.text == 'Test Amortization'
     assert fig.layout.xaxis.title.text == 'Måned'
     assert fig.layout.yaxis.title.text == 'Beløp (NOK)'
 
+def test_create_amortization_chart_optimized(sample_schedule):
+    arrays = amortization_chart_arrays(sample_schedule)
+    fig = create_amortization_chart_optimized(**arrays, title='Person A')
+    assert [trace.name for trace in fig.data] == [
+        'Gjenstående saldo', 'Kumulativt avdrag', 'Kumulative renter', 'Kumulativ total'
+    ]
+    # The cumulative columns are plotted as given
+    assert np.array_equal(fig.data[1].y, sample_schedule['Principal'])
+    assert fig.layout.title.text == 'Person A'
+    assert fig.layout.template == go.Figure(layout=dict(template='seaborn')).layout.template
+    assert fig == create_amortization_chart(sample_schedule, 'Person A')
+
+    # Schedules without every column are rejected
+    with pytest.raises(KeyError, match='Total Paid'):
+        amortization_chart_arrays(sample_schedule.drop(columns='Total Paid'))
+    with pytest.raises(KeyError):
+        create_amortization_chart(sample_schedule.drop(columns='Total Paid'), 'Person A')
+
+    # The figure is validated as usual after it is built
+    fig.update_layout(title='Changed')
+    assert fig.layout.title.text == 'Changed'
+    with pytest.raises(ValueError):
+        fig.update_layout(not_a_property=1)
+
 def test_create_heatmap_divergent_hover():
     df = pd.DataFrame({
         'x': [1, 2, 3] * 3,
@@ -76,5 +133,153 @@ def test_create_heatmap_divergent_hover():
     assert fig.layout.xaxis.title.text == 'X Axis'
     assert fig.layout.yaxis.title.text == 'Y Axis'
 
+def test_create_surface_heatmap():
+    z = np.arange(12, dtype=float).reshape(3, 4)
+    fig = create_surface_heatmap(z, x=np.arange(4), y=np.arange(3), title='Surface')
+    assert isinstance(fig, go.Figure)
+    assert fig.data[0].type == 'heatmap'
+    assert np.array_equal(fig.data[0].z, z)
+    assert fig.data[0].zmin == 0
+    assert fig.data[0].zmax == 11
+    assert fig.layout.title.text == 'Surface'
+
+@pytest.mark.parametrize('threads', [1, 3])
+def test_build_figures(sample_df, sample_schedule, monkeypatch, threads):
+    monkeypatch.setattr('functions.plot_funcs.FIGURE_BUILDER_THREADS', threads)
+    specs = {
+        'sunburst': (create_cost_breakdown_sunburst, (sample_df, 'B')),
+        'sensitivity': (create_interest_rate_sensitivity_chart, (100000, 360, (1.0, 5.0)), {'title': 'Person A'}),
+        'amortization': (create_amortization_chart, (sample_schedule, 'Person A')),
+    }
+    figures = build_figures(specs)
+    assert list(figures) == list(specs)
+    assert all(isinstance(fig, go.Figure) for fig in figures.values())
+    assert figures['sensitivity'].layout.title.text == 'Person A'
+    assert figures['sunburst'] == create_cost_breakdown_sunburst(sample_df, 'B')
+
+    as_json = build_figures(specs, as_json=True)
+    assert as_json['amortization'] == figures['amortization'].to_json()
+
+def test_build_figures_with_cache(sample_df, sample_schedule):
+    cache = ScenarioCache(max_bytes=10**6)
+    specs = {
+        'sunburst': (create_cost_breakdown_sunburst, (sample_df, 'A')),
+        'sensitivity': (create_interest_rate_sensitivity_chart, (100000, 360, (1.0, 5.0))),
+    }
+    figures = build_figures(specs, cache=cache)
+    assert cache.stats()['misses'] == 2
+
+    cached = build_figures(specs, cache=cache)
+    assert cache.stats()['hits'] == 2
+    assert cached['sunburst'] == figures['sunburst']
+    assert cached['sensitivity'] == figures['sensitivity']
+
+    # Cached figures are rebuilt on every hit, so they can be modified by the caller
+    cached['sensitivity'].update_layout(title='Changed')
+    assert cached['sensitivity'].layout.title.text == 'Changed'
+    with pytest.raises(ValueError):
+        cached['sensitivity'].update_layout(not_a_property=1)
+    assert build_figures(specs, cache=cache)['sensitivity'].layout.title.text == 'Rentesensitivitetsanalyse'
+
+    # Changing the data gives a new fingerprint
+    build_figures({'sunburst': (create_cost_breakdown_sunburst, (sample_df.assign(el_cost=300), 'A'))}, cache=cache)
+    assert cache.stats()['misses'] == 3
+
+    # The cache is bounded by the size of the serialized figures
+    small_cache = ScenarioCache(max_bytes=max(sizeof(fig.to_json()) for fig in figures.values()))
+    build_figures(specs, cache=small_cache)
+    assert len(small_cache) == 1
+    assert small_cache.stats()['evictions'] == 1
+
+def test_build_figures_with_several_figures_per_spec(sample_df):
+    specs = {'sunbursts': (create_cost_breakdown_sunbursts, (sample_df,))}
+    expected = create_cost_breakdown_sunbursts(sample_df)
+    assert build_figures(specs)['sunbursts'] == expected
+
+    # The figures of a spec are cached together under one key
+    cache = ScenarioCache(max_bytes=10**6)
+    build_figures(specs, cache=cache)
+    cached = build_figures(specs, cache=cache)['sunbursts']
+    assert cache.stats()['hits'] == 1
+    assert list(cached) == ['A', 'B']
+    assert all(cached[person] == expected[person] for person in expected)
+    assert build_figures(specs, as_json=True, cache=cache)['sunbursts']['B'] == expected['B'].to_json()
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_preserves_shape(method):
+    rng = np.random.default_rng(0)
+    x = np.arange(10000)
+    y = np.cumsum(rng.normal(size=10000))
+    y[4321] += 1000  # A spike that must survive
+    xs, ys = downsample(x, y, 200, method=method)
+    assert len(xs) <= 200
+    assert xs[0] == 0 and xs[-1] == 9999
+    assert np.all(np.diff(xs) > 0)
+    assert ys.max() == y.max()
+    assert np.array_equal(ys, y[xs])
+
+    # Short series and max_points=None are returned unchanged
+    assert np.array_equal(downsample(x[:100], y[:100], 200, method=method)[1], y[:100])
+    assert len(downsample(x, y, None, method=method)[0]) == 10000
+
+def test_downsampling_indices():
+    assert lttb_indices(np.arange(10), np.arange(10.0) ** 2, 5).tolist() == [0, 2, 5, 7, 9]
+    y = np.array([0, 5, 1, 2, 9, 3, 4, 0, 7, 1.0])
+    assert minmax_indices(y, 6).tolist() == [0, 4, 7, 8, 9]
+    with pytest.raises(ValueError):
+        lttb_indices(np.arange(10), np.arange(10), 2)
+    with pytest.raises(ValueError):
+        downsample(np.arange(10), np.arange(10), 5, method='every_nth')
+
+def test_charts_downsample_traces():
+    schedule = pd.DataFrame({
+        'Month': np.arange(1, 2001),
+        'Remaining Balance': np.linspace(2000000, 0, 2000),
+        'Principal': np.linspace(0, 2000000, 2000),
+        'Interest': np.sqrt(np.arange(2000)) * 1000,
+        'Total Paid': np.linspace(0, 3000000, 2000),
+    })
+    fig = create_amortization_chart(schedule, 'Person A', max_points=100)
+    assert all(len(trace.x) <= 100 for trace in fig.data)
+    assert len(fig.to_json()) < len(create_amortization_chart(schedule, 'Person A').to_json()) / 5
+
+    fig = create_interest_rate_sensitivity_chart(100000, 360, (1.0, 50.0), max_points=20)
+    assert len(fig.data[0].x) == 20
+    assert fig.data[0].x[0] == 1.0
+
+def test_scatter_trace_class():
+    assert scatter_trace_class(WEBGL_POINT_THRESHOLD) is go.Scatter
+    assert scatter_trace_class(WEBGL_POINT_THRESHOLD + 1) is go.Scattergl
+    assert scatter_trace_class(10, 'webgl') is go.Scattergl
+    assert scatter_trace_class(10**6, 'svg') is go.Scatter
+    with pytest.raises(ValueError):
+        scatter_trace_class(10, 'canvas')
+
+def test_charts_switch_to_webgl():
+    n_months = WEBGL_POINT_THRESHOLD // 2
+    schedule = pd.DataFrame({
+        'Month': np.arange(1, n_months + 1),
+        'Remaining Balance': np.linspace(2000000, 0, n_months),
+        'Principal': np.linspace(0, 2000000, n_months),
+        'Interest': np.linspace(0, 500000, n_months),
+        'Total Paid': np.linspace(0, 2500000, n_months),
+    })
+    svg = create_amortization_chart(schedule, 'Person A', render_mode='svg')
+    webgl = create_amortization_chart(schedule, 'Person A')
+    assert all(trace.type == 'scattergl' for trace in webgl.data)
+    assert all(trace.type == 'scatter' for trace in svg.data)
+    assert webgl.layout == svg.layout
+    assert [trace.name for trace in webgl.data] == [trace.name for trace in svg.data]
+
+    # Downsampling below the threshold keeps SVG
+    assert create_amortization_chart(schedule, 'Person A', max_points=500).data[0].type == 'scatter'
+
+    months = np.arange(1, 361)
+    series = {f"Lån {i}": np.linspace(1000000 + i * 10000, 0, 360) for i in range(20)}
+    fig = create_scenario_lines_chart(months, series, 'Lån', 'Måned', 'Beløp (NOK)')
+    assert len(fig.data) == 20
+    assert all(trace.type == 'scattergl' for trace in fig.data)
+    assert fig.layout.title.text == 'Lån'
+
 if __name__ == '__main__':
     pytest.main()
\ No newline at end of file
@@ -0,0 +1,228 @@
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import time
+
+import pytest
+import pandas as pd
+import numpy as np
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from classes.scenario_cache import ScenarioCache, sizeof  # noqa: E402
+from functions.cache_funcs import (  # noqa: E402
+    normalize_cache_key,
+    quantize,
+    scenario_cached,
+)
+from functions.cache_resources import get_scenario_cache  # noqa: E402
+from functions.precompute_funcs import (  # noqa: E402
+    load_precomputed_tables,
+    save_precomputed_tables,
+)
+
+
+def test_sizeof():
+    values = np.zeros(1000)
+    assert sizeof(values) == 8000
+    assert sizeof((values, values[:10])) == 8080
+    assert sizeof(pd.DataFrame({"a": values})) >= 8000
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    cache = ScenarioCache(max_bytes=10_000)
+    calls = []
+
+    def compute(n):
+        calls.append(n)
+        return np.arange(n, dtype=np.float64)
+
+    first = cache.get_or_compute(("arange", 10), compute, 10)
+    second = cache.get_or_compute(("arange", 10), compute, 10)
+    assert first is second
+    assert calls == [10]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["entries"] == 1
+    assert stats["nbytes"] == 80
+    assert stats["hit_rate"] == 0.5
+
+
+def test_evicts_least_recently_used_by_size():
+    cache = ScenarioCache(max_bytes=2000)
+    for key in "abc":
+        cache.put(key, np.zeros(100))  # 800 bytes each
+
+    # Only two values fit, so the first is evicted
+    assert "a" not in cache
+    assert cache.nbytes == 1600
+    assert cache.evictions == 1
+
+    # Using b makes c the least recently used
+    cache.get("b")
+    cache.put("d", np.zeros(100))
+    assert "c" not in cache
+    assert "b" in cache and "d" in cache
+
+    # Values larger than the cache are not kept
+    cache.put("e", np.zeros(1000))
+    assert "e" not in cache
+    assert cache.nbytes == 1600
+
+
+def test_disk_tier(tmp_path):
+    cache = ScenarioCache(max_bytes=1000, disk_dir=tmp_path)
+    cache.put("a", np.arange(100.0))
+    cache.put("b", np.arange(100.0) * 2)
+    assert "a" not in cache
+
+    # Evicted values are loaded from disk, also by other caches using the same directory
+    np.testing.assert_array_equal(cache.get("a"), np.arange(100.0))
+    assert cache.disk_hits == 1
+    other = ScenarioCache(max_bytes=1000, disk_dir=tmp_path)
+    np.testing.assert_array_equal(other.get("b"), np.arange(100.0) * 2)
+    assert other.get("c") is None
+    assert other.misses == 1
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = ScenarioCache(max_bytes=10_000, disk_dir=tmp_path, max_disk_bytes=2000)
+    for key in range(5):
+        cache.put(key, np.zeros(100))
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.pkl")) <= 2000
+
+
+def test_disk_tier_failures_keep_value_in_memory(tmp_path):
+    cache = ScenarioCache(max_bytes=10_000, disk_dir=tmp_path)
+
+    # Values that cannot be pickled leave no temporary files behind
+    class Unpicklable:
+        nbytes = 8
+
+    assert isinstance(cache.get_or_compute("local", Unpicklable), Unpicklable)
+    assert "local" in cache
+    assert list(tmp_path.iterdir()) == []
+
+    # Neither does a disk tier that cannot be written to
+    tmp_path.rmdir()
+    np.testing.assert_array_equal(cache.get_or_compute("a", np.arange, 10), np.arange(10))
+    np.testing.assert_array_equal(cache.get("a"), np.arange(10))
+
+
+def test_normalize_cache_key():
+    rates = np.arange(0.02, 0.05, 0.0025)
+    assert normalize_cache_key(rates) == normalize_cache_key(rates.copy())
+    assert normalize_cache_key(rates) != normalize_cache_key(rates[:-1])
+    assert normalize_cache_key((np.float64(1.5), [1, 2])) == (1.5, (1, 2))
+    hash(normalize_cache_key({"a": rates, "b": [np.int64(3)]}))
+
+    # Values that only differ by floating point noise give the same key
+    assert normalize_cache_key(0.1 + 0.2) == normalize_cache_key(0.3)
+    assert normalize_cache_key(np.array([0.1 + 0.2])) == normalize_cache_key(np.array([0.3]))
+
+    # DataFrames and Series are identified by their contents
+    df = pd.DataFrame({"Month": [1, 2], "Interest": [50.0, 49.5]})
+    assert normalize_cache_key(df) == normalize_cache_key(df.copy())
+    assert normalize_cache_key(df) != normalize_cache_key(df.assign(Interest=[50.0, 49.0]))
+    assert normalize_cache_key(df["Month"]) != normalize_cache_key(df["Month"].rename("Other"))
+    hash(normalize_cache_key((df, df["Interest"])))
+
+
+def test_quantize():
+    assert quantize((0.1 + 0.2, 2.0), 0.1) == (0.3, 2.0)
+    assert quantize(0.30000000000000004, 0.01) == 0.3
+    assert quantize(0.0225, 0.0025) == 0.0225
+    assert quantize([1.5, 2.4999999], 0.1) == [1.5, 2.5]
+
+    # Integers stay integers on integer steps
+    assert quantize((3500000, 5000000), 100000) == (3500000, 5000000)
+    assert isinstance(quantize(3500000, 100000), int)
+    values = quantize(np.array([500, 1000]), 100)
+    assert values.dtype == np.array([500, 1000]).dtype
+
+
+def test_scenario_cached_quantizes_arguments():
+    calls = []
+
+    @scenario_cached(steps={"price_range": 0.1})
+    def calculate(price_range, markup):
+        calls.append(price_range)
+        return np.linspace(*price_range, 5) + markup
+
+    first = calculate((0.1 + 0.2, 2.0), 0.1)
+    second = calculate((0.3, 2.0), markup=0.1)
+    assert first is second
+    # The quantized values are passed to the function
+    assert calls == [(0.3, 2.0)]
+    np.testing.assert_allclose(first, np.linspace(0.3, 2.0, 5) + 0.1)
+
+    get_scenario_cache().clear()
+
+
+def test_get_or_compute_calculates_each_key_once():
+    cache = ScenarioCache(max_bytes=10**6)
+    calls = []
+
+    def calculate(value):
+        calls.append(value)
+        time.sleep(0.05)
+        return np.full(10, value)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: cache.get_or_compute("key", calculate, 1.0), range(4)))
+
+    assert calls == [1.0]
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 3
+    assert not cache._key_locks
+
+
+def test_cache_funcs_does_not_import_streamlit():
+    code = "import sys; import functions.cache_funcs, functions.plot_funcs; print('streamlit' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=project_root, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_pinned_values_are_not_evicted():
+    cache = ScenarioCache(max_bytes=1000)
+    cache.pin("default", np.zeros(1000))
+    cache.put("a", np.zeros(100))
+    cache.clear()
+    assert cache.get("default") is not None
+    assert cache.stats()["pinned"] == 1
+    assert cache.nbytes == 0
+
+
+def test_precomputed_tables_round_trip(tmp_path):
+    frame = pd.DataFrame({"Rentesats": np.arange(0.01, 0.05, 0.01), "n": np.arange(4)})
+    arrays = (np.arange(3.0), np.ones((3, 2)))
+    tables = [
+        (("frame", (2500000, 1.0), ()), frame),
+        (("tuple", ((500, 1000),), ()), arrays),
+    ]
+    save_precomputed_tables(tables, tmp_path)
+
+    loaded = dict(load_precomputed_tables(tmp_path))
+    loaded_frame = loaded[("frame", (2500000, 1.0), ())]
+    assert list(loaded_frame.columns) == list(frame.columns)
+    for column in frame.columns:
+        np.testing.assert_array_equal(loaded_frame[column].to_numpy(), frame[column].to_numpy())
+    for array, expected in zip(loaded[("tuple", ((500, 1000),), ())], arrays):
+        assert isinstance(array, np.memmap)
+        np.testing.assert_array_equal(array, expected)
+
+    assert load_precomputed_tables(tmp_path / "missing") == []
+    with pytest.raises(TypeError):
+        save_precomputed_tables([("key", "not a table")], tmp_path)
+
+
+if __name__ == "__main__":
+    pytest.main()
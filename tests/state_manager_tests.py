@@ -0,0 +1,152 @@
+import pytest
+import numpy as np
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from classes.state_manager import ScenarioState  # noqa: E402
+from functions.calc_funcs import monthly_price_calculator_scenarios  # noqa: E402
+
+
+@pytest.fixture
+def scenario_df():
+    return monthly_price_calculator_scenarios(
+        houseprice_range=np.arange(3000000, 5000000, 100000),
+        interest_rate_range=np.arange(0.02, 0.05, 0.0025),
+        fixed_cost_house_range=[5000],
+        kwh_usage_range=[500],
+        kwh_price_range=[1.5],
+        markup_nok_range=[0.1],
+        fixed_cost_electricity_range=[39],
+        ammortisation_periods_range=[360],
+        person_a_fixed_costs_range=[10000],
+        person_b_fixed_costs_range=[10000],
+        transaction_costs_range=[200000],
+        ek_range=[1500000],
+        ownership_fraq_range=[0.5],
+    )
+
+
+def test_select_matches_boolean_filter(scenario_df):
+    state = ScenarioState()
+    state.df = scenario_df
+
+    np.testing.assert_array_equal(state.house_prices, np.unique(scenario_df["house_price"]))
+    np.testing.assert_array_equal(state.interest_rates, np.unique(scenario_df["interest_rate"]))
+
+    for house_price in state.house_prices[::4]:
+        for interest_rate in state.interest_rates[::3]:
+            expected = scenario_df[
+                (scenario_df["house_price"] == house_price)
+                & (scenario_df["interest_rate"] == interest_rate)
+            ]
+            assert state.select(house_price, interest_rate).equals(expected)
+
+
+def test_select_snaps_to_grid(scenario_df):
+    state = ScenarioState()
+    state.df = scenario_df
+
+    # 0.03 is not exactly representable as a value of the np.arange grid
+    selected = state.select(3210000, 0.03)
+    assert len(selected) == 1
+    assert state.selected_house_price == 3200000
+    assert state.selected_interest_rate == pytest.approx(0.03)
+    assert selected["interest_rate"].iloc[0] == state.selected_interest_rate
+
+
+def test_select_rebuilds_index_when_df_changes(scenario_df):
+    state = ScenarioState()
+    state.df = scenario_df
+    state.select(3000000, 0.02)
+
+    state.df = scenario_df[scenario_df["house_price"] >= 4000000]
+    assert state.house_prices[0] == 4000000
+    assert state.select(4000000, 0.02)["house_price"].iloc[0] == 4000000
+    with pytest.raises(KeyError):
+        state.select(3000000, 0.02)
+
+
+def test_update_only_recalculates_changed_schedules(scenario_df):
+    state = ScenarioState()
+    state.df = scenario_df
+
+    state.update(state.select(3000000, 0.02), state.selected_house_price, 1500000, 360)
+    schedule_a, schedule_b = state.schedule_a, state.schedule_b
+    assert len(schedule_a) == 361
+    assert schedule_a["Remaining Balance"].iloc[0] == state.loan_amount_a
+
+    # Unchanged inputs keep the same schedules
+    state.update(state.select(3000000, 0.02), state.selected_house_price, 1500000, 360)
+    assert state.schedule_a is schedule_a
+    assert state.schedule_b is schedule_b
+
+    # A new interest rate recalculates both schedules
+    state.update(state.select(3000000, 0.03), state.selected_house_price, 1500000, 360)
+    assert state.schedule_a is not schedule_a
+    assert state.schedule_b is not schedule_b
+
+    # A new amortisation period changes the length of the schedules
+    state.update(state.select(3000000, 0.03), state.selected_house_price, 1500000, 240)
+    assert len(state.schedule_a) == 241
+
+
+def test_select_rejects_values_outside_grid(scenario_df):
+    state = ScenarioState()
+    state.df = scenario_df
+
+    # Within half a step of the ends of the grid the values still snap
+    state.select(2960000, 0.0195)
+    assert state.selected_house_price == 3000000
+    with pytest.raises(KeyError):
+        state.select(2900000, 0.03)
+    with pytest.raises(KeyError):
+        state.select(4000000, 0.06)
+
+    state.df = scenario_df[scenario_df["interest_rate"] == scenario_df["interest_rate"].min()]
+    state.select(3000000, 0.02 + 1e-15)
+    with pytest.raises(KeyError):
+        state.select(3000000, 0.021)
+
+
+def test_select_rejects_empty_df(scenario_df):
+    state = ScenarioState()
+    state.df = scenario_df.iloc[:0]
+    with pytest.raises(ValueError):
+        state.select(3000000, 0.02)
+
+
+def test_select_requires_df():
+    with pytest.raises(ValueError):
+        ScenarioState().select(3000000, 0.02)
+
+
+def test_fields_are_validated_on_construction():
+    with pytest.raises(ValueError):
+        ScenarioState(loan_to_value=120)
+    with pytest.raises(ValueError):
+        ScenarioState(df=[1, 2, 3])
+
+
+def test_debug_mode_validates_updates(scenario_df):
+    state = ScenarioState()
+    state.df = scenario_df
+    state.select(3000000, 0.02)
+    # Without debug, update does not validate its arguments
+    with pytest.raises(AttributeError):
+        state.update(None, state.selected_house_price, 1500000, 360)
+
+    state.debug = True
+    with pytest.raises(ValueError):
+        state.update(None, state.selected_house_price, 1500000, 360)
+    # Equity larger than the house price gives a negative loan, which fails validation
+    with pytest.raises(ValueError):
+        state.update(state.select(3000000, 0.02), 3000000, 3500000, 360)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,118 @@
+import pytest
+import pandas as pd
+import numpy as np
+import toml
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from functions.calc_funcs import monthly_price_calculator_scenarios  # noqa: E402
+import functions.sweep_cli as sweep_cli  # noqa: E402
+from functions.sweep_cli import (  # noqa: E402
+    load_sweep_spec,
+    main,
+    partition_grid,
+    run_sweep,
+)
+
+
+SPEC = """
+[sweep]
+PARTITION_SIZE = 500
+
+[house_price]
+HOUSEPRICE_MIN = 3000000
+HOUSEPRICE_MAX = 4000000
+HOUSEPRICE_STEP = 250000
+
+[interest_rate]
+INTEREST_RATE_VALUES = [2.0, 3.5, 5.0]
+
+[loan]
+EK_VALUES = [1000000, 1500000]
+
+[ownership]
+OWNERSHIP_FRAQ_VALUES = [30, 50, 70]
+"""
+
+
+@pytest.fixture
+def spec_path(tmp_path):
+    path = tmp_path / "sweep.toml"
+    path.write_text(SPEC, encoding="utf-8")
+    return path
+
+
+def test_load_sweep_spec(spec_path):
+    scenario_ranges = load_sweep_spec(toml.load(spec_path))
+    np.testing.assert_allclose(
+        scenario_ranges["houseprice_range"], [3000000, 3250000, 3500000, 3750000, 4000000]
+    )
+    # Percentages are converted to decimals
+    np.testing.assert_allclose(scenario_ranges["interest_rate_range"], [0.02, 0.035, 0.05])
+    np.testing.assert_allclose(scenario_ranges["ownership_fraq_range"], [0.3, 0.5, 0.7])
+    # Inputs missing from the spec use the defaults in variables.toml, where [min, max]
+    # defaults are expanded with their step
+    np.testing.assert_array_equal(scenario_ranges["ammortisation_periods_range"], [360])
+    np.testing.assert_allclose(scenario_ranges["kwh_usage_range"], np.arange(500, 1001, 100))
+    assert "govt_support_limit_nok" not in scenario_ranges
+
+
+def test_partition_grid():
+    assert partition_grid(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert partition_grid(0, 4) == []
+    with pytest.raises(ValueError):
+        partition_grid(10, 0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_sweep_matches_serial_calculation(spec_path, tmp_path, workers):
+    scenario_ranges = load_sweep_spec(toml.load(spec_path))
+    output = tmp_path / "sweep.csv"
+    n_rows = run_sweep(scenario_ranges, output, workers=workers, partition_size=700)
+
+    expected = monthly_price_calculator_scenarios(**scenario_ranges)
+    assert n_rows == len(expected) == 5 * 3 * 6 * 11 * 2 * 3
+    assert output.read_bytes() == expected.to_csv(index=False).encode("utf-8")
+
+
+def test_run_sweep_rejects_invalid_workers(spec_path, tmp_path):
+    scenario_ranges = load_sweep_spec(toml.load(spec_path))
+    with pytest.raises(ValueError):
+        run_sweep(scenario_ranges, tmp_path / "sweep.csv", workers=0)
+    with pytest.raises(SystemExit):
+        main([str(spec_path), "--output", str(tmp_path / "sweep.csv"), "--workers", "0"])
+    assert list(tmp_path.iterdir()) == [spec_path]
+
+
+def test_run_sweep_leaves_no_partial_output(spec_path, tmp_path, monkeypatch):
+    evaluate_partition = sweep_cli.evaluate_partition
+
+    def failing_partition(scenario_ranges, start, stop):
+        if start > 0:
+            raise RuntimeError("partition failed")
+        return evaluate_partition(scenario_ranges, start, stop)
+
+    monkeypatch.setattr(sweep_cli, "evaluate_partition", failing_partition)
+    scenario_ranges = load_sweep_spec(toml.load(spec_path))
+    with pytest.raises(RuntimeError, match="partition failed"):
+        run_sweep(scenario_ranges, tmp_path / "sweep.csv", workers=1, partition_size=700)
+    assert list(tmp_path.iterdir()) == [spec_path]
+
+
+def test_main(spec_path, tmp_path, capsys):
+    output = tmp_path / "sweep.csv"
+    main([str(spec_path), "--output", str(output), "--workers", "1"])
+    assert "Wrote 5940 scenarios" in capsys.readouterr().out
+    assert len(pd.read_csv(output)) == 5940
+
+    with pytest.raises(ValueError):
+        main([str(spec_path), "--output", str(tmp_path / "sweep.xlsx"), "--workers", "1"])
+
+
+if __name__ == "__main__":
+    pytest.main()